@@ -0,0 +1,316 @@
+# Indicadores agregados das respostas (eNPS, favorabilidade e médias)
+import operator
+from calendar import monthrange
+from datetime import date
+from functools import reduce
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import (
+    TruncMonth,
+    TruncQuarter,
+    TruncWeek,
+    TruncYear,
+)
+from rest_framework.exceptions import ValidationError
+
+from .importer.parsing import SCORE_COLUMNS
+from .importer.validation import ENPS_RANGE, LIKERT_RANGE
+from .models import (
+    ROLLUP_BUCKETS,
+    SurveyRollup,
+    rollup_bucket_field,
+    rollup_sum_field,
+)
+from .rollups import rollups_current
+
+METRICS = tuple(field for _, field in SCORE_COLUMNS)
+ENPS = 'enps'
+
+
+def thresholds(valid_range):
+    """
+    Menor nota favorável e maior desfavorável. Na escala Likert o ponto
+    médio é neutro (em 1 a 7: 5 a 7 favoráveis, 4 neutro, 1 a 3
+    desfavoráveis); no eNPS são promotores (9 e 10), neutros (7 e 8) e
+    detratores (0 a 6).
+    """
+    if valid_range is ENPS_RANGE:
+        return 9, 6
+    middle = (valid_range.start + valid_range.stop - 1) // 2
+    return middle + 1, middle - 1
+
+
+# Métrica -> (menor favorável, maior desfavorável)
+THRESHOLDS = {
+    metric: thresholds(ENPS_RANGE if metric == ENPS else LIKERT_RANGE)
+    for metric in METRICS
+}
+
+EMPLOYEE = 'employee__'
+AREA = f'{EMPLOYEE}area__'
+# Dimensões de agrupamento e filtro: (caminho da chave, caminho do nome).
+# Níveis da hierarquia, cargo e função agrupam pelo id (nomes se repetem
+# entre empresas) e trazem o nome; as demais agrupam pelo próprio valor.
+# Os níveis acima da área vêm dos ancestrais desnormalizados de Area: o
+# filtro por qualquer nível é uma junção com a área só
+DIMENSIONS = {
+    'empresa': (f'{EMPLOYEE}empresa_id', f'{EMPLOYEE}empresa__nome'),
+    'diretoria': (f'{AREA}diretoria_id', f'{AREA}diretoria__nome'),
+    'gerencia': (f'{AREA}gerencia_id', f'{AREA}gerencia__nome'),
+    'coordenadoria': (f'{AREA}cordenadoria_id', f'{AREA}cordenadoria__nome'),
+    'area': (f'{EMPLOYEE}area_id', f'{AREA}nome'),
+    'cargo': (f'{EMPLOYEE}cargo_id', f'{EMPLOYEE}cargo__cargo'),
+    'funcao': (f'{EMPLOYEE}funcao_id', f'{EMPLOYEE}funcao__funcao'),
+    'estado': (f'{EMPLOYEE}estado', None),
+    'genero': (f'{EMPLOYEE}pessoa__genero', None),
+    'geracao': (f'{EMPLOYEE}pessoa__geracao', None),
+}
+# Períodos da data da resposta, identificados pela data de início
+DATE_BUCKETS = {
+    'dia': None,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+    'trimestre': TruncQuarter,
+    'ano': TruncYear,
+}
+GROUPS = tuple(DIMENSIONS) + tuple(DATE_BUCKETS)
+# O que as agregações (SurveyRollup) respondem: atributos do funcionário
+# guardados nelas (e a hierarquia, a partir da área) e períodos de meses
+ROLLUP_GROUPS = (
+    'empresa',
+    'diretoria',
+    'gerencia',
+    'coordenadoria',
+    'area',
+    'cargo',
+    'funcao',
+    'estado',
+    'mes',
+    'trimestre',
+    'ano',
+)
+
+
+def split_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_group_by(value):
+    group_by = split_param(value or '')
+    unknown = [name for name in group_by if name not in GROUPS]
+    if unknown:
+        raise ValidationError(
+            {
+                'group_by': f'Agrupamentos desconhecidos: {", ".join(unknown)}.'
+                f' Disponíveis: {", ".join(GROUPS)}.'
+            }
+        )
+    if len(set(group_by)) != len(group_by):
+        raise ValidationError({'group_by': 'Agrupamento repetido.'})
+    return group_by
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Data inválida, use AAAA-MM-DD.'})
+
+
+def parse_filters(params):
+    """
+    Filtros da query string: `<dimensão>=v1,v2` (ids para hierarquia, cargo
+    e função; valores para estado, gênero e geração) e o intervalo
+    `data_de`/`data_ate`. Devolve {dimensão: [valores]} e (início, fim).
+    """
+    filters = {}
+    for name, (key, label) in DIMENSIONS.items():
+        if name not in params:
+            continue
+        values = split_param(params[name])
+        if label is not None:
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise ValidationError({name: 'Informe ids numéricos.'})
+        filters[name] = values
+    return filters, (
+        parse_date_param(params, 'data_de'),
+        parse_date_param(params, 'data_ate'),
+    )
+
+
+def dimension_paths(name, rollup=False):
+    """Caminhos da dimensão a partir da resposta ou da agregação"""
+    key, label = DIMENSIONS[name]
+    if rollup:
+        key = key.removeprefix(EMPLOYEE)
+        label = label and label.removeprefix(EMPLOYEE)
+    return key, label
+
+
+def date_field(rollup=False):
+    return 'mes' if rollup else 'data_da_resposta'
+
+
+def filter_responses(queryset, filters, period, rollup=False):
+    for name, values in filters.items():
+        key, _ = dimension_paths(name, rollup)
+        queryset = queryset.filter(**{f'{key}__in': values})
+    start, end = period
+    field = date_field(rollup)
+    if start is not None:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{field}__lte': end})
+    return queryset
+
+
+def covered_by_rollups(group_by, filters, period):
+    """
+    A consulta pode ler as agregações? Agrupamentos e filtros precisam
+    estar nelas e o período deve cobrir meses inteiros.
+    """
+    start, end = period
+    return (
+        all(name in ROLLUP_GROUPS for name in (*group_by, *filters))
+        and (start is None or start.day == 1)
+        and (end is None or end.day == monthrange(end.year, end.month)[1])
+    )
+
+
+def count_aggregates():
+    """
+    Total de respostas e, por métrica, soma e contagens de favoráveis e
+    desfavoráveis: tudo o que os indicadores precisam, em um GROUP BY
+    """
+    aggregates = {'total': Count('pk')}
+    for metric, (favorable, unfavorable) in THRESHOLDS.items():
+        aggregates[f'{metric}__sum'] = Sum(metric)
+        aggregates[f'{metric}__fav'] = Count(
+            'pk', filter=Q(**{f'{metric}__gte': favorable})
+        )
+        aggregates[f'{metric}__unf'] = Count(
+            'pk', filter=Q(**{f'{metric}__lte': unfavorable})
+        )
+    return aggregates
+
+
+def bucket_sum(metric, scores):
+    return Sum(
+        reduce(
+            operator.add,
+            (F(rollup_bucket_field(metric, score)) for score in scores),
+        )
+    )
+
+
+def rollup_aggregates():
+    """
+    Os mesmos contadores de count_aggregates somando as células: as faixas
+    das pontas do histograma acumulam as notas fora de 0 a 10, então as
+    contagens coincidem com as das respostas
+    """
+    aggregates = {'total': Sum('respostas')}
+    for metric, (favorable, unfavorable) in THRESHOLDS.items():
+        aggregates[f'{metric}__sum'] = Sum(rollup_sum_field(metric))
+        aggregates[f'{metric}__fav'] = bucket_sum(
+            metric, range(favorable, ROLLUP_BUCKETS.stop)
+        )
+        aggregates[f'{metric}__unf'] = bucket_sum(
+            metric, range(ROLLUP_BUCKETS.start, unfavorable + 1)
+        )
+    return aggregates
+
+
+def group_expressions(group_by, rollup=False):
+    """Apelidos (g_<grupo> e g_<grupo>_nome) -> expressão, para values()"""
+    expressions = {}
+    for name in group_by:
+        if name in DATE_BUCKETS:
+            trunc = DATE_BUCKETS[name]
+            field = date_field(rollup)
+            expressions[f'g_{name}'] = (
+                F(field) if trunc is None else trunc(field)
+            )
+            continue
+        key, label = dimension_paths(name, rollup)
+        expressions[f'g_{name}'] = F(key)
+        if label is not None:
+            expressions[f'g_{name}_nome'] = F(label)
+    return expressions
+
+
+def grouped_counts(queryset, group_by, rollup=False):
+    """
+    Contagens por grupo em uma única consulta agregada, sobre as respostas
+    ou sobre as agregações. Cada linha tem os apelidos de
+    group_expressions e os de count_aggregates; grupos vazios (só
+    possíveis sem agrupamento) são descartados.
+    """
+    queryset = queryset.order_by()
+    aggregates = rollup_aggregates() if rollup else count_aggregates()
+    if group_by:
+        expressions = group_expressions(group_by, rollup)
+        rows = (
+            queryset.values(**expressions)
+            .annotate(**aggregates)
+            .order_by(*expressions)
+        )
+    else:
+        rows = [queryset.aggregate(**aggregates)]
+    return [row for row in rows if row['total']]
+
+
+def percent(part, total):
+    return round(100 * part / total, 2)
+
+
+def summarize(row, group_by):
+    """Linha de contagens -> grupo, respostas, eNPS e indicadores por métrica"""
+    total = row['total']
+    summary = {}
+    for name in group_by:
+        value = row[f'g_{name}']
+        if f'g_{name}_nome' in row:
+            value = {'id': value, 'nome': row[f'g_{name}_nome']}
+        summary[name] = value
+    metrics = {}
+    for metric in METRICS:
+        favorable, unfavorable = row[f'{metric}__fav'], row[f'{metric}__unf']
+        metrics[metric] = {
+            'media': round(row[f'{metric}__sum'] / total, 2),
+            'favoravel': percent(favorable, total),
+            'neutro': percent(total - favorable - unfavorable, total),
+            'desfavoravel': percent(unfavorable, total),
+        }
+    summary['respostas'] = total
+    summary['enps'] = percent(row[f'{ENPS}__fav'] - row[f'{ENPS}__unf'], total)
+    summary['metricas'] = metrics
+    return summary
+
+
+def survey_analytics(queryset, params, use_rollups=True):
+    """
+    Indicadores das respostas do queryset conforme a query string
+    (`group_by`, filtros por dimensão e período). Lê as agregações em vez
+    das respostas quando elas cobrem a consulta e estão em dia; o
+    resultado é o mesmo.
+    """
+    group_by = parse_group_by(params.get('group_by'))
+    filters, period = parse_filters(params)
+    rollup = (
+        use_rollups
+        and covered_by_rollups(group_by, filters, period)
+        and rollups_current(queryset.db)
+    )
+    if rollup:
+        queryset = SurveyRollup.objects.using(queryset.db).all()
+    queryset = filter_responses(queryset, filters, period, rollup)
+    return [
+        summarize(row, group_by)
+        for row in grouped_counts(queryset, group_by, rollup)
+    ]
@@ -0,0 +1,70 @@
+# Bitmaps (um bit por linha, empacotados em bytes) sobre as linhas da
+# cópia em memória das respostas. A linha i é o bit i % 8 do byte i // 8.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    # Bits ligados de cada byte, para o NumPy sem np.bitwise_count (< 2.0)
+    POPCOUNT = np.array(
+        [bin(byte).count('1') for byte in range(256)], np.uint8
+    )
+
+
+def pack(mask):
+    """Bitmap das posições verdadeiras de uma máscara booleana"""
+    return np.packbits(mask, bitorder='little')
+
+
+def positions(bitmap, size):
+    """Linhas (em ordem) cujo bit está ligado"""
+    return np.flatnonzero(np.unpackbits(bitmap, count=size, bitorder='little'))
+
+
+def count(bitmap):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+    return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def span(size, start, stop):
+    """Bitmap das linhas de start (inclusive) a stop (exclusive)"""
+    bitmap = np.zeros((size + 7) // 8, dtype=np.uint8)
+    if start >= stop:
+        return bitmap
+    first, last = start // 8, stop // 8
+    low, high = 0xFF << start % 8 & 0xFF, (1 << stop % 8) - 1
+    if first == last:
+        bitmap[first] = low & high
+        return bitmap
+    bitmap[first] = low
+    bitmap[first + 1 : last] = 0xFF
+    if high:
+        bitmap[last] = high
+    return bitmap
+
+
+def invert(bitmap, size):
+    """Complemento, sem ligar os bits que sobram no último byte"""
+    return ~bitmap & span(size, 0, size)
+
+
+def bit_slices(values):
+    """
+    Índice por fatias de bits: (menor valor, bitmaps), o k-ésimo com as
+    linhas cujo valor menos o menor tem o bit k ligado. A soma dos valores
+    de um conjunto de linhas sai só de contagens de bits.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    low = int(values.min()) if values.size else 0
+    offsets = values - low
+    width = int(offsets.max()).bit_length() if values.size else 0
+    return low, [pack(offsets >> bit & 1 == 1) for bit in range(width)]
+
+
+def sliced_sum(bitmap, total, low, slices):
+    """Soma dos valores das linhas do bitmap (`total` delas)"""
+    return low * total + sum(
+        count(bitmap & bits) << bit for bit, bits in enumerate(slices)
+    )
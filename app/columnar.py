@@ -0,0 +1,194 @@
+# Exportação colunar (Parquet e Arrow IPC) das respostas de pesquisa
+import io
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from .export import EXPORT_CHUNK_SIZE, encode_json
+from .importer.parsing import COMMENT_COLUMNS, SCORE_COLUMNS
+
+# Linhas por row group (Parquet) ou record batch (Arrow): cada grupo é
+# montado em memória, convertido e enviado antes de ler o próximo
+ROW_GROUP_SIZE = 50000
+COMPRESSION = 'zstd'
+
+# Tipos das colunas: notas (1 a 7, eNPS 0 a 10) cabem em int8 e textos
+# repetidos (hierarquia, cargo, estado...) viram dicionários
+ID, DATE, SCORE, CATEGORY, TEXT = 'id', 'date', 'score', 'category', 'text'
+
+AREA = 'employee__area__'
+# (coluna, caminho a partir de SurveyResponse, tipo)
+COLUMNS = (
+    ('id', 'id', ID),
+    ('data_da_resposta', 'data_da_resposta', DATE),
+    ('empresa', 'employee__empresa__nome', CATEGORY),
+    ('diretoria', f'{AREA}diretoria__nome', CATEGORY),
+    ('gerencia', f'{AREA}gerencia__nome', CATEGORY),
+    ('coordenadoria', f'{AREA}cordenadoria__nome', CATEGORY),
+    ('area', f'{AREA}nome', CATEGORY),
+    ('funcionario_id', 'employee_id', ID),
+    ('nome', 'employee__pessoa__nome', TEXT),
+    ('email', 'employee__pessoa__email', TEXT),
+    ('email_corporativo', 'employee__email_corporativo', TEXT),
+    ('genero', 'employee__pessoa__genero', CATEGORY),
+    ('geracao', 'employee__pessoa__geracao', CATEGORY),
+    ('funcao', 'employee__funcao__funcao', CATEGORY),
+    ('cargo', 'employee__cargo__cargo', CATEGORY),
+    ('estado', 'employee__estado', CATEGORY),
+    ('tempo_de_empresa', 'employee__tempo_de_empresa', CATEGORY),
+    *((field, field, SCORE) for _, field in SCORE_COLUMNS),
+    *((field, field, TEXT) for _, field in COMMENT_COLUMNS),
+)
+
+
+class ColumnarRenderer(BaseRenderer):
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Só as respostas de erro do DRF (filtro inválido, 404) chegam
+        # aqui; não são uma tabela, então vão como JSON
+        return encode_json(data).encode()
+
+
+class ParquetRenderer(ColumnarRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+    extension = 'parquet'
+
+
+class ArrowRenderer(ColumnarRenderer):
+    """Formato de fluxo do Arrow IPC (pyarrow.ipc.open_stream)"""
+
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    extension = 'arrows'
+
+
+FORMATS = {
+    renderer.format: renderer for renderer in (ParquetRenderer, ArrowRenderer)
+}
+
+
+def load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError(
+            'A exportação colunar exige o pacote pyarrow (pip install pyarrow)'
+        )
+    return pyarrow
+
+
+def arrow_schema(pa):
+    types = {
+        ID: pa.int64(),
+        DATE: pa.date32(),
+        SCORE: pa.int8(),
+        CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+        TEXT: pa.string(),
+    }
+    return pa.schema(
+        [pa.field(name, types[kind]) for name, _, kind in COLUMNS]
+    )
+
+
+def record_batch(pa, schema, rows):
+    """Transpõe as tuplas de values_list em um RecordBatch do schema"""
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class ChunkSink(io.RawIOBase):
+    """Arquivo só de escrita cujo conteúdo é retirado aos pedaços"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def open_writer(pa, sink, schema, format):
+    if format == ParquetRenderer.format:
+        return pa.parquet.ParquetWriter(sink, schema, compression=COMPRESSION)
+    options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+    # O formato de arquivo não aceita dicionários diferentes por lote
+    return pa.ipc.new_stream(sink, schema, options=options)
+
+
+def write_chunks(pa, queryset, format, row_group_size):
+    schema = arrow_schema(pa)
+    sink = ChunkSink()
+    writer = open_writer(pa, sink, schema, format)
+    rows = queryset.values_list(*(path for _, path, _ in COLUMNS))
+    # As tuplas do cursor viram lotes do Arrow (compactos) a cada bloco; o
+    # row group junta os lotes, sem acumular objetos Python
+    step = min(EXPORT_CHUNK_SIZE, row_group_size)
+    batches, pending, size = [], [], 0
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        pending.append(row)
+        if len(pending) >= step:
+            batches.append(record_batch(pa, schema, pending))
+            size += len(pending)
+            pending = []
+        if size >= row_group_size:
+            write_group(pa, writer, schema, batches, row_group_size)
+            batches, size = [], 0
+            yield sink.drain()
+    if pending:
+        batches.append(record_batch(pa, schema, pending))
+    if batches:
+        write_group(pa, writer, schema, batches, row_group_size)
+    writer.close()
+    yield sink.drain()
+
+
+def write_group(pa, writer, schema, batches, row_group_size):
+    table = pa.Table.from_batches(batches, schema=schema)
+    # Um dicionário por coluna no grupo, e não um por lote
+    writer.write_table(table.unify_dictionaries(), row_group_size)
+
+
+def columnar_chunks(queryset, format, row_group_size=ROW_GROUP_SIZE):
+    """
+    Bytes do arquivo Parquet ou Arrow com as respostas do queryset unidas à
+    hierarquia e aos atributos do funcionário, um pedaço por row group.
+    Levanta ValueError se o pyarrow não estiver instalado.
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Formato colunar desconhecido: {format}')
+    pa = load_pyarrow()
+    return write_chunks(pa, queryset, format, row_group_size)
+
+
+def columnar_response(queryset, renderer, filename):
+    response = StreamingHttpResponse(
+        columnar_chunks(queryset, renderer.format),
+        content_type=renderer.media_type,
+    )
+    response[
+        'Content-Disposition'
+    ] = f'attachment; filename="{filename}.{renderer.extension}"'
+    return response
@@ -0,0 +1,43 @@
+# Requisições condicionais (ETag e Last-Modified) das respostas da API
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def response_validators(request, version, updated_at):
+    """
+    ETag e Last-Modified derivados da versão dos dados, ou None para a API
+    navegável (HTML com token CSRF). A ETag é fraca e inclui o formato; a
+    URL já distingue páginas, filtros e campos.
+    """
+    if request.accepted_renderer.format != 'json':
+        return None
+    etag = f'W/"{version}-{request.accepted_renderer.format}"'
+    last_modified = int(updated_at.timestamp()) if updated_at else None
+    return etag, last_modified
+
+
+def not_modified(request, validators):
+    """304 (ou 412) se a cópia do cliente ainda vale, senão None"""
+    if validators is None:
+        return None
+    etag, last_modified = validators
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def set_validators(response, validators):
+    """Validadores e Cache-Control nas respostas 200 e 304"""
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Navegadores e proxies reutilizam a resposta por max-age segundos e
+    # depois revalidam com If-None-Match / If-Modified-Since
+    patch_cache_control(
+        response, public=True, max_age=settings.API_CACHE_MAX_AGE
+    )
+    return response
@@ -27,3 +27,34 @@ STATE_CHOICES = (
     ('SE', 'Sergipe'),
     ('TO', 'Tocantins'),
 )
+
+# Capitais, para mapear a localidade (cidade) do CSV para o estado
+CAPITAL_CHOICES = (
+    ('AC', 'Rio Branco'),
+    ('AL', 'Maceió'),
+    ('AP', 'Macapá'),
+    ('AM', 'Manaus'),
+    ('BA', 'Salvador'),
+    ('CE', 'Fortaleza'),
+    ('DF', 'Brasília'),
+    ('ES', 'Vitória'),
+    ('GO', 'Goiânia'),
+    ('MA', 'São Luís'),
+    ('MT', 'Cuiabá'),
+    ('MS', 'Campo Grande'),
+    ('MG', 'Belo Horizonte'),
+    ('PA', 'Belém'),
+    ('PB', 'João Pessoa'),
+    ('PR', 'Curitiba'),
+    ('PE', 'Recife'),
+    ('PI', 'Teresina'),
+    ('RJ', 'Rio de Janeiro'),
+    ('RN', 'Natal'),
+    ('RO', 'Porto Velho'),
+    ('RR', 'Boa Vista'),
+    ('RS', 'Porto Alegre'),
+    ('SC', 'Florianópolis'),
+    ('SP', 'São Paulo'),
+    ('SE', 'Aracaju'),
+    ('TO', 'Palmas'),
+)
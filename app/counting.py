@@ -0,0 +1,104 @@
+# Contagens das listagens paginadas: em cache e aproximadas
+from hashlib import blake2b
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .models import DatasetVersion
+
+# Validade das contagens em cache, em segundos. A troca de versão pelo
+# import_data invalida tudo na hora; o prazo cobre escritas feitas por
+# outros meios (admin, shell)
+COUNT_CACHE_TIMEOUT = 300
+
+
+def count_key(queryset, version):
+    """Chave de cache da contagem: banco, modelo, versão e filtros (SQL)"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    signature = blake2b(repr((sql, params)).encode(), digest_size=16)
+    return (
+        f'api-count:{queryset.db}:{queryset.model._meta.label_lower}:'
+        f'{version}:{signature.hexdigest()}'
+    )
+
+
+def cached_count(queryset, version=None):
+    """
+    COUNT(*) do queryset, reaproveitado enquanto os dados não mudarem.
+    `version` evita reler a versão dos dados já lida na requisição.
+    """
+    if version is None:
+        version = DatasetVersion.current(queryset.db)
+    try:
+        key = count_key(queryset, version)
+    except EmptyResultSet:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def table_estimate(database, table):
+    """
+    Número de linhas da tabela segundo as estatísticas do banco
+    (pg_class.reltuples no PostgreSQL, sqlite_stat1 no SQLite), ou None
+    quando elas não existem.
+    """
+    connection = connections[database]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s)',
+                [table],
+            )
+            row = cursor.fetchone()
+            # reltuples é -1 enquanto a tabela não foi analisada
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            row = cursor.fetchone()
+            # O primeiro número de cada linha é o total de linhas da tabela
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+def approximate_count(queryset):
+    """
+    Contagem estimada para listagens sem filtro. Devolve None quando o
+    queryset é filtrado ou o banco não tem estatísticas da tabela (ou
+    estima zero linhas, o que pode ser só uma estatística desatualizada).
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.is_sliced:
+        return None
+    estimate = table_estimate(queryset.db, queryset.model._meta.db_table)
+    return estimate or None
+
+
+def refresh_statistics(database, models):
+    """
+    Atualiza as estatísticas das tabelas (ANALYZE) depois de uma carga,
+    para o planejador e para as contagens aproximadas
+    """
+    connection = connections[database]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Amostra limitada por índice: rápido mesmo em tabelas grandes
+            cursor.execute('PRAGMA analysis_limit = 1000')
+        for model in models:
+            cursor.execute(
+                f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}'
+            )
@@ -0,0 +1,158 @@
+# Exportação completa das listagens em fluxo (NDJSON e CSV)
+import csv
+import io
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.serializers import Serializer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .importer.parsing import CSV_DELIMITER
+from .query_plan import plan_queryset
+from .values_serialization import values_plan
+
+# Linhas buscadas por vez no cursor do banco e linhas por bloco enviado
+EXPORT_CHUNK_SIZE = 2000
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Um objeto JSON por linha (application/x-ndjson)"""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Usado só em respostas comuns (erros); a exportação é em fluxo
+        items = data if isinstance(data, list) else [data]
+        return ''.join(encode_json(item) + '\n' for item in items).encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV com ';', como o data.csv"""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        items = data if isinstance(data, list) else [data]
+        return ''.join(csv_chunks(items, header_of(items))).encode()
+
+
+def encode_json(item):
+    # Mesmas opções do JSONRenderer do DRF (compacto, sem escapar UTF-8)
+    return json.dumps(
+        item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+    )
+
+
+def flatten(item, prefix=''):
+    """Achata objetos aninhados ('pessoa': {'nome'}) em 'pessoa.nome'"""
+    flat = {}
+    for key, value in item.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def header_of(items):
+    return list(flatten(items[0])) if items else []
+
+
+def serializer_header(serializer, prefix=''):
+    """Colunas do CSV a partir dos campos do serializador"""
+    header = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, Serializer):
+            header += serializer_header(field, f'{prefix}{name}.')
+        else:
+            header.append(f'{prefix}{name}')
+    return header
+
+
+def ndjson_chunks(items):
+    lines = []
+    for item in items:
+        lines.append(encode_json(item))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def csv_chunks(items, header):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(
+        buffer,
+        fieldnames=header,
+        delimiter=CSV_DELIMITER,
+        lineterminator='\n',
+        extrasaction='ignore',
+    )
+    writer.writeheader()
+    for position, item in enumerate(items, 1):
+        writer.writerow(flatten(item))
+        if position % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_items(queryset, serializer_class):
+    """
+    Representação de cada objeto do queryset, lida do banco em blocos
+    (cursor no servidor no PostgreSQL), sem manter o resultado em memória
+    """
+    plan = values_plan(serializer_class, queryset.model)
+    if plan is not None:
+        rows = queryset.values(**plan.expressions)
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield plan.to_representation(row)
+        return
+    queryset = plan_queryset(queryset, serializer_class)
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield serializer_class(instance).data
+
+
+def steps_header(steps, prefix=''):
+    """Colunas do CSV a partir dos passos de um ValuesPlan"""
+    header = []
+    for key, _, _, children in steps:
+        if children is not None:
+            header += steps_header(children, f'{prefix}{key}.')
+        else:
+            header.append(f'{prefix}{key}')
+    return header
+
+
+def export_header(queryset, serializer_class):
+    plan = values_plan(serializer_class, queryset.model)
+    if plan is not None:
+        # Campos omitidos pelo DRF (SkipField) não estão no plano
+        return steps_header(plan.steps)
+    return serializer_header(serializer_class())
+
+
+def export_response(queryset, serializer_class, renderer, filename):
+    """StreamingHttpResponse com o queryset inteiro no formato do renderer"""
+    items = export_items(queryset, serializer_class)
+    if renderer.format == CSVRenderer.format:
+        chunks = csv_chunks(items, export_header(queryset, serializer_class))
+    else:
+        chunks = ndjson_chunks(items)
+    response = StreamingHttpResponse(
+        (chunk.encode() for chunk in chunks),
+        content_type=f'{renderer.media_type}; charset={renderer.charset}',
+    )
+    response[
+        'Content-Disposition'
+    ] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
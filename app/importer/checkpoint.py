@@ -0,0 +1,53 @@
+# Checkpoints duráveis para retomar importações interrompidas
+import os
+
+from django.utils import timezone
+
+from app.models import ImportCheckpoint
+
+
+class Checkpointer:
+    """
+    Grava a posição do leitor (byte e linha do último registro entregue)
+    na tabela ImportCheckpoint. `save` é chamado pelos motores dentro da
+    transação de cada lote, então o checkpoint nunca aponta além do que
+    já foi efetivado no banco.
+    """
+
+    def __init__(self, database, path):
+        self.database = database
+        self.source = os.path.abspath(path)
+        self.file_size = os.path.getsize(path)
+        self.reader = None
+
+    def _queryset(self):
+        return ImportCheckpoint.objects.using(self.database).filter(
+            source=self.source
+        )
+
+    def resume_point(self):
+        """Checkpoint do mesmo arquivo (mesmo caminho e tamanho), se houver"""
+        return self._queryset().filter(file_size=self.file_size).first()
+
+    def start(self):
+        """Registra o início de uma importação desde o começo do arquivo"""
+        ImportCheckpoint.objects.using(self.database).update_or_create(
+            source=self.source,
+            defaults={
+                'file_size': self.file_size,
+                'offset': 0,
+                'line': 1,
+                'completed': False,
+            },
+        )
+
+    def save(self, completed=False):
+        self._queryset().update(
+            offset=self.reader.offset,
+            line=self.reader.line,
+            completed=completed,
+            updated_at=timezone.now(),
+        )
+
+    def finish(self):
+        self.save(completed=True)
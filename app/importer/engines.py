@@ -0,0 +1,625 @@
+# Motores de importação do CSV de pesquisas
+import time
+from collections import Counter
+
+from django.db import DatabaseError, transaction
+
+from app.models import (
+    Area,
+    Coordenadoria,
+    Diretoria,
+    Employee,
+    EmployeeLevel,
+    EmployeeType,
+    Empresa,
+    Gerencia,
+    ImportedRowHash,
+    Person,
+    SurveyResponse,
+)
+from app.rollups import tracking_updates
+
+from .parsing import SURVEY_FIELDS, parse_row
+
+DEFAULT_BATCH_SIZE = 5000
+# Objetos por UPDATE em bulk_update (cada campo vira um CASE no SQL)
+UPDATE_BATCH_SIZE = 500
+# Limite de parâmetros por consulta ao recarregar chaves recém-criadas
+LOOKUP_CHUNK_SIZE = 500
+
+
+class RowImportError(Exception):
+    """Erro de validação de uma linha que não invalida o lote inteiro"""
+
+
+class BaseEngine:
+    """
+    Interface comum aos motores. `run` consome pares (linha, dict do CSV);
+    `run_parsed` consome pares (linha, valores) já convertidos por
+    parse_row, em que os valores podem ser a exceção do parse.
+    """
+
+    # Importação incremental: o parse também calcula os hashes das linhas
+    incremental = False
+
+    def __init__(self, database, batch_size=DEFAULT_BATCH_SIZE, on_error=None):
+        self.database = database
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda line, error: None)
+        self.stats = Counter()
+        # Segundos gastos em cada etapa ('parse', 'write' e, dentro da
+        # escrita, 'dimensions'; o CopyEngine também mede 'copy')
+        self.timings = Counter()
+        # Chamado após cada lote, dentro da transação que o grava
+        self.checkpoint = None
+
+    def run(self, rows):
+        return self.run_parsed(self.parse(rows))
+
+    def parse(self, rows):
+        for line, row in rows:
+            started = time.perf_counter()
+            try:
+                values = parse_row(row, hashes=self.incremental)
+            except Exception as e:
+                values = e
+            self.timings['parse'] += time.perf_counter() - started
+            yield line, values
+
+    def run_parsed(self, records):
+        raise NotImplementedError
+
+    def report_error(self, line, error):
+        self.stats['errors'] += 1
+        self.on_error(line, error)
+
+    def save_checkpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint()
+
+
+class OrmEngine(BaseEngine):
+    """Motor original: uma cadeia de get_or_create por linha"""
+
+    def run_parsed(self, records):
+        for line, values in records:
+            self.stats['rows'] += 1
+            self.import_record(line, values)
+            # Cada linha já é efetivada isoladamente (autocommit); as
+            # rejeitadas também contam para o checkpoint
+            if self.stats['rows'] % self.batch_size == 0:
+                self.save_checkpoint()
+        return self.stats
+
+    def import_record(self, line, values):
+        if isinstance(values, Exception):
+            self.report_error(line, values)
+            return
+        started = time.perf_counter()
+        try:
+            created = self.import_row(values)
+        except Exception as e:
+            self.report_error(line, e)
+            return
+        finally:
+            self.timings['write'] += time.perf_counter() - started
+        self.stats['inserted' if created else 'skipped'] += 1
+
+    def import_row(self, values):
+        database = self.database
+
+        # Criar hierarquia
+        empresa, _ = Empresa.objects.using(database).get_or_create(
+            nome=values['empresa']
+        )
+        diretoria, _ = Diretoria.objects.using(database).get_or_create(
+            nome=values['diretoria'], empresa=empresa
+        )
+        gerencia, _ = Gerencia.objects.using(database).get_or_create(
+            nome=values['gerencia'], empresa=empresa, diretoria=diretoria
+        )
+        coordenadoria, _ = Coordenadoria.objects.using(database).get_or_create(
+            nome=values['coordenadoria'], empresa=empresa, gerencia=gerencia
+        )
+        area, _ = Area.objects.using(database).get_or_create(
+            nome=values['area'], empresa=empresa, cordenadoria=coordenadoria
+        )
+
+        # Criar EmployeeLevel e EmployeeType
+        level, _ = EmployeeLevel.objects.using(database).get_or_create(
+            funcao=values['funcao']
+        )
+        emp_type, _ = EmployeeType.objects.using(database).get_or_create(
+            cargo=values['cargo']
+        )
+
+        person, _ = Person.objects.using(database).get_or_create(
+            nome=values['nome'],
+            email=values['email'],
+            defaults={
+                'genero': values['genero'],
+                'geracao': values['geracao'],
+            },
+        )
+        employee, _ = Employee.objects.using(database).get_or_create(
+            pessoa=person,
+            defaults={
+                'empresa': empresa,
+                'email_corporativo': values['email_corporativo'],
+                'funcao': level,
+                'cargo': emp_type,
+                'area': area,
+                'estado': values['estado'],
+                'tempo_de_empresa': values['tempo_de_empresa'],
+            },
+        )
+        _, created = SurveyResponse.objects.using(database).get_or_create(
+            employee=employee,
+            data_da_resposta=values['data_da_resposta'],
+            defaults=values['survey'],
+        )
+        return created
+
+
+class DimensionCache:
+    """
+    Cache em memória de uma tabela indexada pela chave natural.
+
+    Cada entrada guarda (pk, *value_fields). Registros criados no lote
+    corrente ficam em `pending` até o commit da transação, para que um
+    rollback não deixe chaves apontando para linhas inexistentes.
+    """
+
+    def __init__(self, model, key_fields, value_fields=()):
+        self.model = model
+        self.key_fields = key_fields
+        self.value_fields = value_fields
+        self.entries = {}
+        self.pending = {}
+
+    def load(self, database):
+        self.entries = {}
+        self.pending = {}
+        n_keys = len(self.key_fields)
+        queryset = self.model.objects.using(database).values_list(
+            'pk', *self.key_fields, *self.value_fields
+        )
+        for pk, *fields in queryset.iterator(chunk_size=DEFAULT_BATCH_SIZE):
+            self.entries[tuple(fields[:n_keys])] = (pk, *fields[n_keys:])
+
+    def get(self, key):
+        # `pending` também guarda entradas alteradas no lote corrente
+        entry = self.pending.get(key)
+        return entry if entry is not None else self.entries.get(key)
+
+    def create_missing(self, database, items):
+        """Cria em lote as chaves ainda desconhecidas (items: chave -> extras)"""
+        keys, objs = [], []
+        for key, extra in items.items():
+            if self.get(key) is not None:
+                continue
+            keys.append(key)
+            objs.append(self.model(**dict(zip(self.key_fields, key)), **extra))
+        if not objs:
+            return
+        self.model.objects.using(database).bulk_create(objs)
+        if objs[0].pk is None:
+            # Backend sem RETURNING: recupera as chaves geradas
+            self._fetch_pending(database, keys)
+            return
+        for key, obj in zip(keys, objs):
+            self.pending[key] = (
+                obj.pk,
+                *(getattr(obj, field) for field in self.value_fields),
+            )
+
+    def _fetch_pending(self, database, keys):
+        wanted = set(keys)
+        last_field = self.key_fields[-1]
+        n_keys = len(self.key_fields)
+        values = sorted({key[-1] for key in keys}, key=str)
+        for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+            queryset = (
+                self.model.objects.using(database)
+                .filter(
+                    **{
+                        f'{last_field}__in': values[
+                            start : start + LOOKUP_CHUNK_SIZE
+                        ]
+                    }
+                )
+                .values_list('pk', *self.key_fields, *self.value_fields)
+            )
+            for pk, *fields in queryset:
+                key = tuple(fields[:n_keys])
+                if key in wanted:
+                    self.pending[key] = (pk, *fields[n_keys:])
+
+    def commit(self):
+        self.entries.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+
+class BulkEngine(BaseEngine):
+    """
+    Motor em lote: resolve as dimensões por caches em memória, cria as
+    chaves ausentes com bulk_create e insere as respostas em blocos, com
+    uma transação por lote.
+
+    Se um lote falhar no banco, ele é reprocessado linha a linha para
+    isolar as linhas problemáticas, preservando o comportamento do motor
+    original (a linha com erro é reportada e as demais seguem).
+
+    Com `incremental=True`, o hash de cada linha é comparado ao índice
+    ImportedRowHash: linhas inalteradas são descartadas antes de qualquer
+    acesso ao banco, respostas já existentes são atualizadas com os
+    valores do arquivo e as novas são inseridas. Se a mesma chave
+    (email, data) aparecer mais de uma vez no arquivo, vale a primeira.
+    """
+
+    def __init__(
+        self,
+        database,
+        batch_size=DEFAULT_BATCH_SIZE,
+        on_error=None,
+        incremental=False,
+    ):
+        super().__init__(database, batch_size, on_error)
+        self.incremental = incremental
+        self.empresas = DimensionCache(Empresa, ('nome',))
+        self.diretorias = DimensionCache(Diretoria, ('empresa_id', 'nome'))
+        self.gerencias = DimensionCache(
+            Gerencia, ('empresa_id', 'diretoria_id', 'nome')
+        )
+        self.coordenadorias = DimensionCache(
+            Coordenadoria, ('empresa_id', 'gerencia_id', 'nome')
+        )
+        self.areas = DimensionCache(
+            Area, ('empresa_id', 'cordenadoria_id', 'nome')
+        )
+        self.levels = DimensionCache(EmployeeLevel, ('funcao',))
+        self.types = DimensionCache(EmployeeType, ('cargo',))
+        self.people = DimensionCache(Person, ('email',), ('nome',))
+        self.employees = DimensionCache(
+            Employee, ('pessoa_id',), ('email_corporativo',)
+        )
+        self.corporate_emails = DimensionCache(
+            Employee, ('email_corporativo',)
+        )
+        self.responses = DimensionCache(
+            SurveyResponse, ('employee_id', 'data_da_resposta')
+        )
+        # Dimensões pequenas, resolvidas antes das pessoas e funcionários
+        self.dimensions = (
+            self.empresas,
+            self.diretorias,
+            self.gerencias,
+            self.coordenadorias,
+            self.areas,
+            self.levels,
+            self.types,
+        )
+        self.caches = self.dimensions + (
+            self.people,
+            self.employees,
+            self.corporate_emails,
+            self.responses,
+        )
+        if incremental:
+            self.row_hashes = DimensionCache(
+                ImportedRowHash, ('key_hash',), ('content_hash',)
+            )
+            self.caches += (self.row_hashes,)
+            # Chaves já vistas nesta execução, para ignorar duplicatas
+            self.seen_keys = set()
+
+    def load_caches(self):
+        for cache in self.caches:
+            cache.load(self.database)
+
+    def run_parsed(self, records):
+        self.load_caches()
+        batch = []
+        for line, values in records:
+            self.stats['rows'] += 1
+            if isinstance(values, Exception):
+                self.report_error(line, values)
+                continue
+            if self.incremental and self._is_unchanged(values):
+                self.stats['skipped'] += 1
+                continue
+            batch.append((line, values))
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = []
+        if batch:
+            self.write(batch)
+        return self.stats
+
+    def _is_unchanged(self, values):
+        key_hash, content_hash = values['hashes']
+        if key_hash in self.seen_keys:
+            return True
+        self.seen_keys.add(key_hash)
+        entry = self.row_hashes.get((key_hash,))
+        return entry is not None and entry[1] == content_hash
+
+    def write(self, batch):
+        started = time.perf_counter()
+        self.import_batch(batch, checkpoint=True)
+        self.timings['write'] += time.perf_counter() - started
+
+    def import_batch(self, batch, checkpoint=False):
+        """Importa um lote numa transação; em falha, isola linha a linha"""
+        try:
+            with transaction.atomic(using=self.database):
+                errors, stats = self._write_batch(batch)
+                if checkpoint:
+                    self.save_checkpoint()
+        except DatabaseError as e:
+            for cache in self.caches:
+                cache.rollback()
+            if len(batch) == 1:
+                self.report_error(batch[0][0], e)
+            else:
+                for item in batch:
+                    self.import_batch([item])
+            # O checkpoint só avança depois que todas as linhas do lote
+            # foram efetivadas
+            if checkpoint:
+                with transaction.atomic(using=self.database):
+                    self.save_checkpoint()
+            return
+        for cache in self.caches:
+            cache.commit()
+        self.stats.update(stats)
+        for line, error in errors:
+            self.report_error(line, error)
+
+    def _write_batch(self, batch):
+        errors = []
+        stats = Counter()
+        rows = [(line, values, {}) for line, values in batch]
+
+        self._resolve_dimensions(rows)
+        if self.incremental:
+            rows, updated = self._update_existing(rows)
+            stats['updated'] += len(updated)
+
+        # Pessoas: o email é único e o nome precisa coincidir
+        new_people = {}
+        valid = []
+        for line, values, ids in rows:
+            key = (values['email'],)
+            entry = self.people.get(key)
+            nome = entry[1] if entry else new_people.get(key, {}).get('nome')
+            if nome is not None and nome != values['nome']:
+                errors.append(
+                    (
+                        line,
+                        RowImportError(
+                            'Este email já está em uso por outra pessoa.'
+                        ),
+                    )
+                )
+                continue
+            if nome is None:
+                new_people[key] = {
+                    'nome': values['nome'],
+                    'genero': values['genero'],
+                    'geracao': values['geracao'],
+                }
+            valid.append((line, values, ids))
+        rows = valid
+        self.people.create_missing(self.database, new_people)
+        for _, values, ids in rows:
+            ids['pessoa'] = self.people.get((values['email'],))[0]
+
+        # Funcionários: um por pessoa, email corporativo único
+        new_employees = {}
+        valid = []
+        for line, values, ids in rows:
+            key = (ids['pessoa'],)
+            if self.employees.get(key) is None and key not in new_employees:
+                corporate_key = (values['email_corporativo'],)
+                if self.corporate_emails.get(corporate_key) is not None:
+                    errors.append(
+                        (
+                            line,
+                            RowImportError(
+                                'Este email corporativo já está em uso por '
+                                'outro funcionário.'
+                            ),
+                        )
+                    )
+                    continue
+                self.corporate_emails.pending[corporate_key] = (None,)
+                new_employees[key] = {
+                    'empresa_id': ids['empresa'],
+                    'email_corporativo': values['email_corporativo'],
+                    'funcao_id': ids['funcao'],
+                    'cargo_id': ids['cargo'],
+                    'area_id': ids['area'],
+                    'estado': values['estado'],
+                    'tempo_de_empresa': values['tempo_de_empresa'],
+                }
+            valid.append((line, values, ids))
+        rows = valid
+        self.employees.create_missing(self.database, new_employees)
+
+        # Respostas: (funcionário, data) já existentes são mantidas
+        new_responses = {}
+        for _, values, ids in rows:
+            employee_id = self.employees.get((ids['pessoa'],))[0]
+            key = (employee_id, values['data_da_resposta'])
+            if self.responses.get(key) is not None or key in new_responses:
+                stats['skipped'] += 1
+                continue
+            new_responses[key] = values['survey']
+            ids['resposta'] = key
+        self.responses.create_missing(self.database, new_responses)
+        stats['inserted'] += len(new_responses)
+
+        if self.incremental:
+            written = updated + [
+                (values['hashes'], self.responses.get(ids['resposta'])[0])
+                for _, values, ids in rows
+                if 'resposta' in ids
+            ]
+            self._record_hashes(written)
+        return errors, stats
+
+    def _update_existing(self, rows):
+        """
+        Atualiza pessoas, funcionários e respostas que já existem com os
+        valores do arquivo. O email corporativo, único, não é alterado.
+        Retorna as linhas restantes (novas) e os pares (hashes, resposta)
+        das atualizadas.
+        """
+        remaining = []
+        people, employees, responses = {}, {}, {}
+        hashes = {}
+        for line, values, ids in rows:
+            person = self.people.get((values['email'],))
+            employee = person and self.employees.get((person[0],))
+            response = employee and self.responses.get(
+                (employee[0], values['data_da_resposta'])
+            )
+            if not response:
+                remaining.append((line, values, ids))
+                continue
+            people[person[0]] = Person(
+                pk=person[0],
+                nome=values['nome'],
+                genero=values['genero'],
+                geracao=values['geracao'],
+            )
+            self.people.pending[(values['email'],)] = (
+                person[0],
+                values['nome'],
+            )
+            employees[employee[0]] = Employee(
+                pk=employee[0],
+                empresa_id=ids['empresa'],
+                funcao_id=ids['funcao'],
+                cargo_id=ids['cargo'],
+                area_id=ids['area'],
+                estado=values['estado'],
+                tempo_de_empresa=values['tempo_de_empresa'],
+            )
+            responses[response[0]] = SurveyResponse(
+                pk=response[0], **values['survey']
+            )
+            hashes[response[0]] = values['hashes']
+
+        # Funcionário e notas podem mudar as respostas de célula
+        with tracking_updates(self.database, employees):
+            self._bulk_update(people, employees, responses)
+        return remaining, [
+            (row_hashes, response_id)
+            for response_id, row_hashes in hashes.items()
+        ]
+
+    def _bulk_update(self, people, employees, responses):
+        for model, objs, fields in (
+            (Person, people, ['nome', 'genero', 'geracao']),
+            (
+                Employee,
+                employees,
+                [
+                    'empresa_id',
+                    'funcao_id',
+                    'cargo_id',
+                    'area_id',
+                    'estado',
+                    'tempo_de_empresa',
+                ],
+            ),
+            (SurveyResponse, responses, list(SURVEY_FIELDS)),
+        ):
+            if objs:
+                model.objects.using(self.database).bulk_update(
+                    objs.values(), fields, batch_size=UPDATE_BATCH_SIZE
+                )
+
+    def _record_hashes(self, written):
+        """Grava no índice os hashes das linhas inseridas ou atualizadas"""
+        new, changed = {}, []
+        for (key_hash, content_hash), response_id in written:
+            entry = self.row_hashes.get((key_hash,))
+            if entry is None:
+                new[(key_hash,)] = {
+                    'content_hash': content_hash,
+                    'response_id': response_id,
+                }
+                continue
+            changed.append(
+                ImportedRowHash(
+                    pk=entry[0],
+                    content_hash=content_hash,
+                    response_id=response_id,
+                )
+            )
+            self.row_hashes.pending[(key_hash,)] = (entry[0], content_hash)
+        self.row_hashes.create_missing(self.database, new)
+        if changed:
+            ImportedRowHash.objects.using(self.database).bulk_update(
+                changed,
+                ['content_hash', 'response_id'],
+                batch_size=UPDATE_BATCH_SIZE,
+            )
+
+    def _resolve_dimensions(self, rows):
+        """Resolve hierarquia, função e cargo de cada linha em `ids`"""
+        started = time.perf_counter()
+        self._resolve(self.empresas, rows, 'empresa', ('empresa',))
+        self._resolve(
+            self.diretorias, rows, 'diretoria', ('@empresa', 'diretoria')
+        )
+        self._resolve(
+            self.gerencias,
+            rows,
+            'gerencia',
+            ('@empresa', '@diretoria', 'gerencia'),
+        )
+        self._resolve(
+            self.coordenadorias,
+            rows,
+            'coordenadoria',
+            ('@empresa', '@gerencia', 'coordenadoria'),
+        )
+        self._resolve(
+            self.areas,
+            rows,
+            'area',
+            ('@empresa', '@coordenadoria', 'area'),
+            ancestors=('gerencia', 'diretoria'),
+        )
+        self._resolve(self.levels, rows, 'funcao', ('funcao',))
+        self._resolve(self.types, rows, 'cargo', ('cargo',))
+        self.timings['dimensions'] += time.perf_counter() - started
+
+    def _resolve(self, cache, rows, name, key_spec, ancestors=()):
+        """
+        Resolve a dimensão `name` para cada linha. Em `key_spec`, nomes
+        prefixados com '@' vêm de ids já resolvidos; os demais, do CSV.
+        `ancestors` são ids já resolvidos gravados junto nos registros
+        novos (os ancestrais desnormalizados da área).
+        """
+        keys, items = [], {}
+        for _, values, ids in rows:
+            key = tuple(
+                ids[part[1:]] if part.startswith('@') else values[part]
+                for part in key_spec
+            )
+            keys.append(key)
+            if key not in items:
+                items[key] = {
+                    f'{ancestor}_id': ids[ancestor] for ancestor in ancestors
+                }
+        cache.create_missing(self.database, items)
+        for (_, _, ids), key in zip(rows, keys):
+            ids[name] = cache.get(key)[0]
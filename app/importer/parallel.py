@@ -0,0 +1,133 @@
+# Parse do CSV em paralelo, por faixas de bytes, num pool de processos
+import csv
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .parsing import CSV_DELIMITER, parse_row
+from .readers import LineTracker, read_fieldnames
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def split_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, start_offset=None):
+    """
+    Lê o cabeçalho e divide o restante do arquivo (ou a partir de
+    `start_offset`) em faixas (início, fim) de aproximadamente
+    `chunk_size` bytes, sempre terminando numa quebra de linha. Supõe um
+    registro por linha física, como nas exportações da pesquisa (sem
+    campos entre aspas com quebras de linha).
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        fieldnames = read_fieldnames(f)
+        start = start_offset or f.tell()
+        chunks = []
+        while start < size:
+            f.seek(start + chunk_size)
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return fieldnames, chunks
+
+
+def parse_chunk(task):
+    """
+    Executado nos workers: faz o parse de uma faixa do arquivo. Retorna os
+    registros (linha relativa, valores ou exceção, byte final), o número
+    de linhas físicas lidas e o tempo gasto.
+    """
+    path, start, end, fieldnames, hashes = task
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Linhas quebradas só em \n, como na leitura sequencial do arquivo
+    tracker = LineTracker(io.BytesIO(data), start)
+    reader = csv.DictReader(
+        tracker, fieldnames=fieldnames, delimiter=CSV_DELIMITER
+    )
+    records = []
+    for row in reader:
+        try:
+            values = parse_row(row, hashes=hashes)
+        except Exception as e:
+            values = e
+        records.append((reader.line_num, values, tracker.offset))
+    return records, reader.line_num, time.perf_counter() - started
+
+
+def _init_worker():
+    # Necessário quando o pool usa spawn/forkserver em vez de fork
+    django.setup()
+
+
+class ParallelReader:
+    """
+    Itera sobre os registros (linha, valores) do CSV, com o parse feito em
+    `workers` processos. As faixas são consumidas em ordem e no máximo
+    2 * workers ficam em andamento, para limitar a memória quando a
+    escrita é o gargalo. Como no CsvReader, `offset` e `line` apontam
+    para o fim do último registro entregue.
+    """
+
+    def __init__(
+        self,
+        path,
+        workers,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        start_offset=None,
+        start_line=None,
+        hashes=False,
+    ):
+        self.path = path
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.start_offset = start_offset
+        # Hashes das linhas no parse (importação incremental)
+        self.hashes = hashes
+        self.offset = start_offset or 0
+        # A linha 1 é o cabeçalho
+        self.line = start_line if start_offset else 1
+        self.rows = 0
+        # Soma do tempo de parse em todos os workers
+        self.parse_seconds = 0.0
+
+    def __iter__(self):
+        fieldnames, chunks = split_chunks(
+            self.path, self.chunk_size, self.start_offset
+        )
+        tasks = (
+            (self.path, start, end, fieldnames, self.hashes)
+            for start, end in chunks
+        )
+        line_offset = self.line
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        ) as executor:
+            pending = deque()
+            for task in tasks:
+                pending.append(executor.submit(parse_chunk, task))
+                if len(pending) >= 2 * self.workers:
+                    line_offset = yield from self._consume(
+                        pending.popleft(), line_offset
+                    )
+            while pending:
+                line_offset = yield from self._consume(
+                    pending.popleft(), line_offset
+                )
+
+    def _consume(self, future, line_offset):
+        records, lines, seconds = future.result()
+        self.parse_seconds += seconds
+        self.rows += len(records)
+        for line, values, offset in records:
+            self.offset = offset
+            self.line = line_offset + line
+            yield self.line, values
+        return line_offset + lines
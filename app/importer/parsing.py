@@ -0,0 +1,211 @@
+# Conversão das linhas do CSV em valores prontos para os modelos
+from datetime import date
+from hashlib import blake2b
+
+from app.constants import CAPITAL_CHOICES, STATE_CHOICES
+from app.models import (
+    Area,
+    Coordenadoria,
+    Diretoria,
+    Employee,
+    EmployeeLevel,
+    EmployeeType,
+    Empresa,
+    Gerencia,
+    Person,
+)
+
+CSV_DELIMITER = ';'
+DATE_FORMAT = '%d/%m/%Y'
+
+# Mapeamento dos cabeçalhos de nota/comentário do CSV para os campos de
+# SurveyResponse
+SCORE_COLUMNS = (
+    ('Interesse no Cargo', 'interesse_no_cargo'),
+    ('Contribuição', 'contribuicao'),
+    ('Aprendizado e Desenvolvimento', 'aprendizado_e_desenvolvimento'),
+    ('Feedback', 'feedback'),
+    ('Interação com Gestor', 'interacao_com_gestor'),
+    (
+        'Clareza sobre Possibilidades de Carreira',
+        'clareza_sobre_possibilidades_de_carreira',
+    ),
+    ('Expectativa de Permanência', 'expectativa_de_permanencia'),
+    ('eNPS', 'enps'),
+)
+COMMENT_COLUMNS = (
+    ('Comentários - Interesse no Cargo', 'comentarios_interesse_no_cargo'),
+    ('Comentários - Contribuição', 'comentarios_contribuicao'),
+    (
+        'Comentários - Aprendizado e Desenvolvimento',
+        'comentarios_aprendizado_e_desenvolvimento',
+    ),
+    ('Comentários - Feedback', 'comentarios_feedback'),
+    (
+        'Comentários - Interação com Gestor',
+        'comentarios_interacao_com_gestor',
+    ),
+    (
+        'Comentários - Clareza sobre Possibilidades de Carreira',
+        'comentarios_clareza_sobre_possibilidades_de_carreira',
+    ),
+    (
+        'Comentários - Expectativa de Permanência',
+        'comentarios_expectativa_de_permanencia',
+    ),
+    ('[Aberta] eNPS', 'aberta_enps'),
+)
+SURVEY_FIELDS = tuple(field for _, field in SCORE_COLUMNS) + tuple(
+    field for _, field in COMMENT_COLUMNS
+)
+# Colunas lidas por parse_row, na ordem usada pelo hash de conteúdo
+SOURCE_COLUMNS = (
+    'nome',
+    'email',
+    'email_corporativo',
+    'cargo',
+    'funcao',
+    'localidade',
+    'tempo_de_empresa',
+    'genero',
+    'geracao',
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+    'Data da Resposta',
+) + tuple(column for column, _ in SCORE_COLUMNS + COMMENT_COLUMNS)
+
+# Busca de estado por nome (ou capital) em O(1), no lugar da varredura de
+# STATE_CHOICES
+STATE_BY_NAME = {name.lower(): code for code, name in CAPITAL_CHOICES}
+STATE_BY_NAME.update({name.lower(): code for code, name in STATE_CHOICES})
+
+# Tamanho máximo de cada valor textual, conforme os campos dos modelos. O
+# SQLite não aplica max_length e o bulk_create do PostgreSQL trunca em
+# silêncio, então a validação é feita aqui para todos os motores
+MAX_LENGTHS = {
+    key: model._meta.get_field(field).max_length
+    for key, model, field in (
+        ('empresa', Empresa, 'nome'),
+        ('diretoria', Diretoria, 'nome'),
+        ('gerencia', Gerencia, 'nome'),
+        ('coordenadoria', Coordenadoria, 'nome'),
+        ('area', Area, 'nome'),
+        ('funcao', EmployeeLevel, 'funcao'),
+        ('cargo', EmployeeType, 'cargo'),
+        ('nome', Person, 'nome'),
+        ('email', Person, 'email'),
+        ('genero', Person, 'genero'),
+        ('geracao', Person, 'geracao'),
+        ('email_corporativo', Employee, 'email_corporativo'),
+        ('estado', Employee, 'estado'),
+        ('tempo_de_empresa', Employee, 'tempo_de_empresa'),
+    )
+}
+
+
+def choice_lookup(choices):
+    """Índice que aceita tanto o valor quanto o rótulo de um TextChoices"""
+    lookup = {label.lower(): value for value, label in choices}
+    lookup.update({value.lower(): value for value, _ in choices})
+    return lookup
+
+
+# O CSV traz os rótulos em minúsculas ('masculino', 'geração z'); os
+# campos guardam os valores das escolhas ('M', 'Geração Z'), que cabem em
+# Person.genero (max_length=1) em qualquer banco
+GENDER_BY_NAME = choice_lookup(Person.GenderChoices.choices)
+GENERATION_BY_NAME = choice_lookup(Person.GenerationChoices.choices)
+# Nomes alternativos usados nas exportações
+GENERATION_BY_NAME.update(
+    {
+        'baby boomer': Person.GenerationChoices.BABY_BOOMERS,
+        'geração y': Person.GenerationChoices.MILLENNIALS,
+    }
+)
+
+
+def parse_choice(value, lookup):
+    """Normaliza para o valor da escolha (ou mantém o valor desconhecido)"""
+    return lookup.get(value.lower(), value)
+
+
+def parse_state(localidade):
+    """Mapeia a localidade (estado ou capital) para a sigla do estado"""
+    return STATE_BY_NAME.get(localidade.lower(), localidade)
+
+
+def parse_date(value):
+    """Converte datas no formato dd/mm/aaaa sem passar por strptime"""
+    day, month, year = value.split('/')
+    if not (
+        day.isdigit()
+        and month.isdigit()
+        and year.isdigit()
+        and len(day) <= 2
+        and len(month) <= 2
+        and len(year) == 4
+    ):
+        raise ValueError(f'Data inválida: {value!r}')
+    return date(int(year), int(month), int(day))
+
+
+def row_hashes(row, answered=None):
+    """
+    Hashes estáveis da linha: a chave identifica a resposta (email, data)
+    e o conteúdo cobre todas as colunas importadas, em ordem fixa. A data
+    entra já convertida (`answered`, ou lida da linha) e escrita como
+    dd/mm/aaaa: 1/2/2022 e 01/02/2022 são a mesma resposta.
+    """
+    if answered is None:
+        answered = parse_date(row['Data da Resposta'])
+    columns = dict(row, **{'Data da Resposta': f'{answered:%d/%m/%Y}'})
+    key = blake2b(
+        f"{columns['email']}\x1f{columns['Data da Resposta']}".encode(),
+        digest_size=16,
+    )
+    content = blake2b(
+        '\x1f'.join(
+            columns[column] or '' for column in SOURCE_COLUMNS
+        ).encode(),
+        digest_size=16,
+    )
+    return key.hexdigest(), content.hexdigest()
+
+
+def parse_row(row, hashes=False):
+    """
+    Converte uma linha do CSV (dict) nos valores usados pelos modelos. Com
+    `hashes`, inclui os de row_hashes (só a importação incremental os usa).
+    """
+    survey = {field: int(row[column]) for column, field in SCORE_COLUMNS}
+    for column, field in COMMENT_COLUMNS:
+        survey[field] = row[column] or ''
+    values = {
+        'empresa': row['n0_empresa'],
+        'diretoria': row['n1_diretoria'],
+        'gerencia': row['n2_gerencia'],
+        'coordenadoria': row['n3_coordenacao'],
+        'area': row['n4_area'],
+        'funcao': row['funcao'],
+        'cargo': row['cargo'],
+        'nome': row['nome'],
+        'email': row['email'],
+        'genero': parse_choice(row['genero'], GENDER_BY_NAME),
+        'geracao': parse_choice(row['geracao'], GENERATION_BY_NAME),
+        'email_corporativo': row['email_corporativo'],
+        'estado': parse_state(row['localidade']),
+        'tempo_de_empresa': row['tempo_de_empresa'],
+        'data_da_resposta': parse_date(row['Data da Resposta']),
+        'survey': survey,
+    }
+    for key, max_length in MAX_LENGTHS.items():
+        if len(values[key]) > max_length:
+            raise ValueError(
+                f'{key}: {values[key]!r} excede {max_length} caracteres'
+            )
+    if hashes:
+        values['hashes'] = row_hashes(row, values['data_da_resposta'])
+    return values
@@ -0,0 +1,227 @@
+# Caminho rápido para PostgreSQL: COPY em tabela de staging + SQL em conjunto
+import time
+from collections import Counter
+
+from django.db import connections
+
+from app.models import Employee, Person, SurveyResponse
+
+from .engines import BulkEngine, RowImportError
+from .parsing import SURVEY_FIELDS
+
+STAGING_TABLE = 'import_staging'
+
+# Colunas da tabela de staging, na ordem em que são escritas pelo COPY
+STAGING_COLUMNS = (
+    ('line', 'integer'),
+    ('nome', 'varchar(255)'),
+    ('email', 'varchar(254)'),
+    ('genero', 'varchar(255)'),
+    ('geracao', 'varchar(255)'),
+    ('empresa_id', 'bigint'),
+    ('email_corporativo', 'varchar(254)'),
+    ('funcao_id', 'bigint'),
+    ('cargo_id', 'bigint'),
+    ('area_id', 'bigint'),
+    ('estado', 'varchar(255)'),
+    ('tempo_de_empresa', 'varchar(255)'),
+    ('data_da_resposta', 'date'),
+) + tuple(
+    (field, 'text' if field.startswith(('comentarios', 'aberta')) else 'int')
+    for field in SURVEY_FIELDS
+)
+EMPLOYEE_COLUMNS = (
+    'empresa_id',
+    'email_corporativo',
+    'funcao_id',
+    'cargo_id',
+    'area_id',
+    'estado',
+    'tempo_de_empresa',
+)
+
+
+def supports_copy(database):
+    """Indica se o alias usa PostgreSQL com o driver psycopg 3"""
+    connection = connections[database]
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    return is_psycopg3
+
+
+class CopyEngine(BulkEngine):
+    """
+    Motor COPY: as dimensões pequenas continuam nos caches do BulkEngine,
+    mas pessoas, funcionários e respostas são enviados via COPY ... FROM
+    STDIN para uma tabela temporária e mesclados nas tabelas reais com
+    INSERT ... SELECT, sem manter esses registros em memória.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.caches = self.dimensions
+        self.tables = {
+            'person': Person._meta.db_table,
+            'employee': Employee._meta.db_table,
+            'response': SurveyResponse._meta.db_table,
+        }
+
+    def load_caches(self):
+        super().load_caches()
+        columns = ', '.join(f'{name} {kind}' for name, kind in STAGING_COLUMNS)
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+                f'({columns}) ON COMMIT DELETE ROWS'
+            )
+
+    def _write_batch(self, batch):
+        errors = []
+        stats = Counter()
+        rows = [(line, values, {}) for line, values in batch]
+        self._resolve_dimensions(rows)
+
+        with connections[self.database].cursor() as cursor:
+            columns = ', '.join(name for name, _ in STAGING_COLUMNS)
+            started = time.perf_counter()
+            with cursor.copy(
+                f'COPY {STAGING_TABLE} ({columns}) FROM STDIN'
+            ) as copy:
+                for line, values, ids in rows:
+                    copy.write_row(self._staging_row(line, values, ids))
+            self.timings['copy'] += time.perf_counter() - started
+
+            for line in self._execute_lines(cursor, self._person_conflicts):
+                errors.append(
+                    (
+                        line,
+                        RowImportError(
+                            'Este email já está em uso por outra pessoa.'
+                        ),
+                    )
+                )
+            cursor.execute(self._insert_people())
+            cursor.execute(self._insert_employees())
+            for line in self._execute_lines(cursor, self._employee_conflicts):
+                errors.append(
+                    (
+                        line,
+                        RowImportError(
+                            'Este email corporativo já está em uso por '
+                            'outro funcionário.'
+                        ),
+                    )
+                )
+            cursor.execute(self._insert_responses())
+            inserted = cursor.rowcount
+
+        stats['inserted'] += inserted
+        stats['skipped'] += len(rows) - len(errors) - inserted
+        return errors, stats
+
+    @staticmethod
+    def _staging_row(line, values, ids):
+        return (
+            line,
+            values['nome'],
+            values['email'],
+            values['genero'],
+            values['geracao'],
+            ids['empresa'],
+            values['email_corporativo'],
+            ids['funcao'],
+            ids['cargo'],
+            ids['area'],
+            values['estado'],
+            values['tempo_de_empresa'],
+            values['data_da_resposta'],
+            *(values['survey'][field] for field in SURVEY_FIELDS),
+        )
+
+    @staticmethod
+    def _execute_lines(cursor, sql_factory):
+        cursor.execute(sql_factory())
+        return sorted(line for (line,) in cursor.fetchall())
+
+    def _person_conflicts(self):
+        # O nome da pessoa vem do banco ou, se nova, da primeira linha do lote
+        return f"""
+            DELETE FROM {STAGING_TABLE} s
+            USING (
+                SELECT DISTINCT ON (email) email, nome
+                FROM {STAGING_TABLE}
+                ORDER BY email, line
+            ) primeira
+            LEFT JOIN {self.tables['person']} p ON p.email = primeira.email
+            WHERE primeira.email = s.email
+              AND COALESCE(p.nome, primeira.nome) <> s.nome
+            RETURNING s.line
+        """
+
+    def _insert_people(self):
+        return f"""
+            INSERT INTO {self.tables['person']} (nome, email, genero, geracao)
+            SELECT nome, email, genero, geracao FROM (
+                SELECT DISTINCT ON (email) line, nome, email, genero, geracao
+                FROM {STAGING_TABLE}
+                ORDER BY email, line
+            ) novas
+            ORDER BY line
+            ON CONFLICT (email) DO NOTHING
+        """
+
+    def _insert_employees(self):
+        columns = ', '.join(EMPLOYEE_COLUMNS)
+        staged = ', '.join(f's.{column}' for column in EMPLOYEE_COLUMNS)
+        return f"""
+            INSERT INTO {self.tables['employee']} (pessoa_id, {columns})
+            SELECT pessoa_id, {columns} FROM (
+                SELECT DISTINCT ON (p.id) s.line, p.id AS pessoa_id, {staged}
+                FROM {STAGING_TABLE} s
+                JOIN {self.tables['person']} p ON p.email = s.email
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {self.tables['employee']} e
+                    WHERE e.pessoa_id = p.id
+                )
+                ORDER BY p.id, s.line
+            ) novos
+            ORDER BY line
+            ON CONFLICT DO NOTHING
+        """
+
+    def _employee_conflicts(self):
+        # Linhas cuja pessoa ficou sem funcionário: email corporativo em uso
+        return f"""
+            DELETE FROM {STAGING_TABLE} s
+            USING {self.tables['person']} p
+            WHERE p.email = s.email
+              AND NOT EXISTS (
+                  SELECT 1 FROM {self.tables['employee']} e
+                  WHERE e.pessoa_id = p.id
+              )
+            RETURNING s.line
+        """
+
+    def _insert_responses(self):
+        fields = ', '.join(SURVEY_FIELDS)
+        staged = ', '.join(f's.{field}' for field in SURVEY_FIELDS)
+        return f"""
+            INSERT INTO {self.tables['response']}
+                (employee_id, data_da_resposta, {fields})
+            SELECT employee_id, data_da_resposta, {fields} FROM (
+                SELECT DISTINCT ON (e.id, s.data_da_resposta)
+                    s.line, e.id AS employee_id, s.data_da_resposta, {staged}
+                FROM {STAGING_TABLE} s
+                JOIN {self.tables['person']} p ON p.email = s.email
+                JOIN {self.tables['employee']} e ON e.pessoa_id = p.id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {self.tables['response']} r
+                    WHERE r.employee_id = e.id
+                      AND r.data_da_resposta = s.data_da_resposta
+                )
+                ORDER BY e.id, s.data_da_resposta, s.line
+            ) novas
+            ORDER BY line
+        """
@@ -0,0 +1,171 @@
+# Perfil de execução do import_data (--profile / --cprofile)
+import cProfile
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.apps import apps
+from django.db import connections
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Intervalo mínimo, em segundos, entre as amostras de vazão
+SAMPLE_INTERVAL = 1.0
+
+SQL_VERB = re.compile(r'\s*(\w+)')
+SQL_TABLE = re.compile(r'\b(?:INTO|UPDATE|FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def peak_rss_kb():
+    """Pico de memória residente deste processo e dos filhos, em KiB"""
+    if resource is None:
+        return None
+    # O ru_maxrss vem em bytes no macOS e em KiB nos demais sistemas
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return {
+        'main': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        'workers': (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+        ),
+    }
+
+
+class ImportProfiler:
+    """
+    Coleta o perfil de uma importação: tempo de leitura do CSV (`track`),
+    as etapas medidas pelo motor (`engine.timings`), contagem e tempo das
+    consultas por comando e modelo (via execute_wrapper do Django), amostras
+    de linhas/s ao longo da execução e o pico de RSS. Com `cprofile=True`,
+    também roda o cProfile durante a importação.
+    """
+
+    def __init__(self, engine, cprofile=False, interval=SAMPLE_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self.profiler = cProfile.Profile() if cprofile else None
+        self.read_seconds = 0.0
+        self.queries = defaultdict(Counter)
+        self.samples = []
+        self.last_sample = (0.0, 0)
+        self.elapsed = 0.0
+        self.started = None
+        self.models = {
+            model._meta.db_table: model.__name__ for model in apps.get_models()
+        }
+
+    def track(self, records):
+        """Repassa os registros do leitor medindo a espera por cada um"""
+        records = iter(records)
+        while True:
+            started = time.perf_counter()
+            record = next(records, None)
+            now = time.perf_counter()
+            self.read_seconds += now - started
+            if record is None:
+                return
+            if now - self.started - self.last_sample[0] >= self.interval:
+                self.sample(now)
+            yield record
+
+    def sample(self, now):
+        """Registra as linhas/s desde a amostra anterior"""
+        elapsed = now - self.started
+        rows = self.engine.stats['rows']
+        last_elapsed, last_rows = self.last_sample
+        if elapsed <= last_elapsed:
+            return
+        self.samples.append(
+            {
+                'elapsed': round(elapsed, 3),
+                'rows': rows,
+                'rows_per_second': round(
+                    (rows - last_rows) / (elapsed - last_elapsed), 1
+                ),
+            }
+        )
+        self.last_sample = (elapsed, rows)
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            verb = SQL_VERB.match(sql).group(1).upper()
+            table = SQL_TABLE.search(sql)
+            if table is not None:
+                table = table.group(1)
+                verb = f'{verb} {self.models.get(table, table)}'
+            self.queries[verb]['count'] += 1
+            self.queries[verb]['seconds'] += time.perf_counter() - started
+
+    @contextmanager
+    def profile(self, *databases):
+        """Mede a importação executada dentro do bloco"""
+        with ExitStack() as stack:
+            for database in databases:
+                stack.enter_context(
+                    connections[database].execute_wrapper(self.query_wrapper)
+                )
+            if self.profiler is not None:
+                self.profiler.enable()
+            self.started = time.perf_counter()
+            try:
+                yield self
+            finally:
+                now = time.perf_counter()
+                self.elapsed = now - self.started
+                self.sample(now)
+                if self.profiler is not None:
+                    self.profiler.disable()
+
+    def summary(self, parse_seconds=None, **extra):
+        """
+        Resumo serializável em JSON. `parse_seconds` substitui o tempo de
+        parse do motor quando ele é feito fora dele (ParallelReader).
+        """
+        rows = self.engine.stats['rows']
+        queries = {
+            statement: {
+                'count': counter['count'],
+                'seconds': round(counter['seconds'], 6),
+            }
+            for statement, counter in sorted(self.queries.items())
+        }
+        stages = {'read': self.read_seconds, **self.engine.timings}
+        if parse_seconds is not None:
+            stages['parse'] = parse_seconds
+        return {
+            **extra,
+            'rows': rows,
+            'stats': dict(self.engine.stats),
+            'elapsed_seconds': round(self.elapsed, 6),
+            'rows_per_second': (
+                round(rows / self.elapsed, 1) if self.elapsed else None
+            ),
+            'stages': {
+                stage: round(seconds, 6) for stage, seconds in stages.items()
+            },
+            'queries': {
+                'count': sum(query['count'] for query in queries.values()),
+                'seconds': round(
+                    sum(query['seconds'] for query in queries.values()), 6
+                ),
+                'by_statement': queries,
+            },
+            'throughput': self.samples,
+            'peak_rss_kb': peak_rss_kb(),
+        }
+
+    def write(self, path, parse_seconds=None, **extra):
+        summary = self.summary(parse_seconds, **extra)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    def dump_stats(self, path):
+        self.profiler.dump_stats(path)
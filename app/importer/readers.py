@@ -0,0 +1,142 @@
+# Leitura do CSV acompanhando a posição (linha e byte) de cada registro
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import sys
+from contextlib import ExitStack, contextmanager
+
+from .parsing import CSV_DELIMITER
+
+# Caminho que representa a entrada padrão
+STDIN = '-'
+# Assinaturas dos formatos comprimidos aceitos
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+# Tamanho dos blocos descartados ao avançar em fluxos sem seek
+SKIP_BLOCK_SIZE = 1024 * 1024
+
+
+def detect_compression(stream):
+    """Identifica a compressão pelos primeiros bytes, sem consumi-los"""
+    head = stream.peek(6)
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def _decompress(stream, compression):
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream)
+    if compression == 'bz2':
+        return bz2.BZ2File(stream)
+    if compression == 'xz':
+        return lzma.LZMAFile(stream)
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            'Arquivos zstd exigem o pacote zstandard (pip install zstandard)'
+        )
+    # O leitor do zstandard não implementa readline; o BufferedReader sim
+    return io.BufferedReader(
+        zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)
+    )
+
+
+@contextmanager
+def open_source(path):
+    """
+    Abre o CSV (um caminho ou '-' para a entrada padrão) como fluxo binário,
+    descomprimindo gzip, bz2, xz ou zstd sob demanda. A leitura é sempre
+    incremental, então a memória usada não depende do tamanho do arquivo.
+    """
+    with ExitStack() as stack:
+        if path == STDIN:
+            stream = sys.stdin.buffer
+        else:
+            stream = stack.enter_context(open(path, 'rb'))
+        compression = detect_compression(stream)
+        if compression is not None:
+            stream = stack.enter_context(_decompress(stream, compression))
+        yield stream
+
+
+def is_plain_file(path):
+    """Indica se o CSV é um arquivo sem compressão (permite seek/faixas)"""
+    if path == STDIN:
+        return False
+    with open(path, 'rb') as f:
+        return detect_compression(f) is None
+
+
+def skip_to(f, offset):
+    """Posiciona o fluxo em `offset`, lendo e descartando se não há seek"""
+    if f.seekable():
+        f.seek(offset)
+        return
+    remaining = offset - f.tell()
+    while remaining > 0:
+        block = f.read(min(remaining, SKIP_BLOCK_SIZE))
+        if not block:
+            break
+        remaining -= len(block)
+
+
+class LineTracker:
+    """Itera linhas decodificadas acumulando a posição em bytes lidos"""
+
+    def __init__(self, raw_lines, offset=0):
+        self.raw_lines = raw_lines
+        self.offset = offset
+
+    def __iter__(self):
+        for raw in self.raw_lines:
+            self.offset += len(raw)
+            yield raw.decode('utf-8')
+
+
+def read_fieldnames(f):
+    """Lê o cabeçalho de um arquivo binário e retorna os nomes das colunas"""
+    header = f.readline().decode('utf-8')
+    return next(csv.reader([header], delimiter=CSV_DELIMITER))
+
+
+class CsvReader:
+    """
+    Itera pares (linha, dict) do CSV. Após cada registro, `offset` e
+    `line` apontam para o fim dele, o que permite gravar um checkpoint e
+    retomar a leitura com `start_offset`/`start_line` sem reler o início.
+    Em arquivos comprimidos, `offset` conta os bytes já descomprimidos.
+    """
+
+    def __init__(self, path, start_offset=None, start_line=None):
+        self.path = path
+        self.start_offset = start_offset
+        self.start_line = start_line
+        self.offset = 0
+        # A linha 1 é o cabeçalho
+        self.line = 1
+
+    def __iter__(self):
+        with open_source(self.path) as f:
+            fieldnames = read_fieldnames(f)
+            if self.start_offset:
+                skip_to(f, self.start_offset)
+                self.line = self.start_line
+            start_line = self.line
+            tracker = LineTracker(f, f.tell())
+            reader = csv.DictReader(
+                tracker, fieldnames=fieldnames, delimiter=CSV_DELIMITER
+            )
+            for row in reader:
+                self.offset = tracker.offset
+                self.line = start_line + reader.line_num
+                yield self.line, row
+            self.offset = tracker.offset
@@ -0,0 +1,203 @@
+# Importação em tabelas de sombra, trocadas de forma atômica no final
+import os
+import sqlite3
+
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from app.models import (
+    Area,
+    Coordenadoria,
+    Diretoria,
+    Employee,
+    EmployeeLevel,
+    EmployeeType,
+    Empresa,
+    Gerencia,
+    ImportedRowHash,
+    Person,
+    RollupState,
+    SurveyResponse,
+    SurveyRollup,
+)
+
+# Tabelas servidas pela API e escritas pela importação, em ordem de
+# dependência (chaves estrangeiras)
+SWAP_MODELS = (
+    Empresa,
+    Diretoria,
+    Gerencia,
+    Coordenadoria,
+    Area,
+    EmployeeLevel,
+    EmployeeType,
+    Person,
+    Employee,
+    SurveyResponse,
+    ImportedRowHash,
+    SurveyRollup,
+    RollupState,
+)
+SHADOW_SCHEMA = 'import_shadow'
+OLD_SCHEMA = 'import_old'
+
+
+class SwapError(Exception):
+    """O banco não permite a importação com troca atômica"""
+
+
+def shadow_database(database):
+    """Escolhe a implementação de sombra adequada ao backend do alias"""
+    vendor = connections[database].vendor
+    if vendor == 'postgresql':
+        return PostgresShadow(database)
+    if vendor == 'sqlite':
+        return SqliteShadow(database)
+    raise SwapError(f'--swap não é suportado no backend {vendor}')
+
+
+class BaseShadow:
+    """
+    Cria um alias de banco (`alias`) em que as tabelas importadas começam
+    como cópia das tabelas em uso. Os motores gravam nesse alias sem tocar
+    nas tabelas lidas pela API; `swap` publica o resultado de uma vez e
+    `discard` descarta a sombra se a importação falhar.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.alias = f'{database}__shadow'
+
+    def register(self, **overrides):
+        connections.settings[self.alias] = {
+            **connections.settings[self.database],
+            **overrides,
+        }
+
+    def unregister(self):
+        if self.alias in connections.settings:
+            connections[self.alias].close()
+            del connections[self.alias]
+            del connections.settings[self.alias]
+
+    def create(self):
+        raise NotImplementedError
+
+    def swap(self):
+        raise NotImplementedError
+
+    def discard(self):
+        raise NotImplementedError
+
+
+class PostgresShadow(BaseShadow):
+    """
+    A sombra é o schema SHADOW_SCHEMA, único schema no search_path do
+    alias (assim o migrate cria ali todas as tabelas, em vez de enxergar
+    as de public). A troca move, numa única transação, as tabelas em uso para
+    OLD_SCHEMA e as da sombra para public (com índices, restrições e
+    sequências), o que só exige um bloqueio breve de cada tabela.
+    """
+
+    def create(self):
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {SHADOW_SCHEMA}')
+        settings = connections.settings[self.database]
+        self.register(
+            OPTIONS={
+                **settings['OPTIONS'],
+                'options': f'-c search_path={SHADOW_SCHEMA}',
+            }
+        )
+        call_command('migrate', database=self.alias, verbosity=0)
+        connection = connections[self.alias]
+        with transaction.atomic(using=self.alias):
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                for model in SWAP_MODELS:
+                    table = model._meta.db_table
+                    # Colunas por nome, não pela ordem física nas tabelas
+                    columns = ', '.join(
+                        quote(field.column)
+                        for field in model._meta.concrete_fields
+                    )
+                    cursor.execute(
+                        f'INSERT INTO {SHADOW_SCHEMA}.{table} ({columns}) '
+                        f'SELECT {columns} FROM public.{table}'
+                    )
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), SWAP_MODELS
+                ):
+                    cursor.execute(sql)
+
+    def swap(self):
+        self.unregister()
+        with transaction.atomic(using=self.database):
+            with connections[self.database].cursor() as cursor:
+                cursor.execute(f'DROP SCHEMA IF EXISTS {OLD_SCHEMA} CASCADE')
+                cursor.execute(f'CREATE SCHEMA {OLD_SCHEMA}')
+                for model in SWAP_MODELS:
+                    table = model._meta.db_table
+                    cursor.execute(
+                        f'ALTER TABLE public.{table} SET SCHEMA {OLD_SCHEMA}'
+                    )
+                    cursor.execute(
+                        f'ALTER TABLE {SHADOW_SCHEMA}.{table} '
+                        'SET SCHEMA public'
+                    )
+                cursor.execute(f'DROP SCHEMA {OLD_SCHEMA} CASCADE')
+                cursor.execute(f'DROP SCHEMA {SHADOW_SCHEMA} CASCADE')
+
+    def discard(self):
+        self.unregister()
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {SHADOW_SCHEMA} CASCADE')
+
+
+class SqliteShadow(BaseShadow):
+    """
+    A sombra é uma cópia consistente do arquivo (API de backup do SQLite)
+    e a troca é um os.replace, atômico no sistema de arquivos: conexões
+    já abertas continuam lendo o arquivo antigo e as novas (o Django abre
+    uma por requisição) já encontram os dados completos.
+    """
+
+    def __init__(self, database):
+        super().__init__(database)
+        connection = connections[database]
+        if connection.is_in_memory_db():
+            raise SwapError('--swap exige um banco SQLite em arquivo')
+        self.path = str(connection.settings_dict['NAME'])
+        self.shadow_path = f'{self.path}.shadow'
+
+    def create(self):
+        connection = connections[self.database]
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            (journal_mode,) = cursor.fetchone()
+        if journal_mode.lower() == 'wal':
+            # O arquivo -wal do banco em uso seria aplicado ao novo arquivo
+            raise SwapError('--swap não é suportado com journal_mode=WAL')
+        self.remove_shadow_file()
+        target = sqlite3.connect(self.shadow_path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        self.register(NAME=self.shadow_path)
+
+    def swap(self):
+        self.unregister()
+        os.replace(self.shadow_path, self.path)
+        # A conexão deste processo ainda aponta para o arquivo antigo
+        connections[self.database].close()
+
+    def discard(self):
+        self.unregister()
+        self.remove_shadow_file()
+
+    def remove_shadow_file(self):
+        if os.path.exists(self.shadow_path):
+            os.remove(self.shadow_path)
@@ -0,0 +1,351 @@
+# Geração de arquivos de pesquisa sintéticos para testes de escala
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import random
+import sys
+from array import array
+from contextlib import contextmanager
+from datetime import date, timedelta
+from itertools import accumulate
+
+from app.constants import CAPITAL_CHOICES
+
+from .parsing import COMMENT_COLUMNS, CSV_DELIMITER, DATE_FORMAT, SCORE_COLUMNS
+
+# Mesma ordem de colunas das exportações da pesquisa
+HEADER = (
+    'nome',
+    'email',
+    'email_corporativo',
+    'area',
+    'cargo',
+    'funcao',
+    'localidade',
+    'tempo_de_empresa',
+    'genero',
+    'geracao',
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+    'Data da Resposta',
+) + tuple(
+    column
+    for score, comment in zip(SCORE_COLUMNS, COMMENT_COLUMNS)
+    for column in (score[0], comment[0])
+)
+
+FIRST_NAMES = (
+    'Ana',
+    'Bruno',
+    'Carla',
+    'Daniel',
+    'Eduarda',
+    'Felipe',
+    'Gabriela',
+    'Henrique',
+    'Isabela',
+    'João',
+    'Juliana',
+    'Lucas',
+    'Mariana',
+    'Mateus',
+    'Natália',
+    'Otávio',
+    'Paula',
+    'Rafael',
+    'Sofia',
+    'Thiago',
+    'Vitória',
+    'Wagner',
+    'Yasmin',
+    'Zeca',
+)
+LAST_NAMES = (
+    'Almeida',
+    'Barbosa',
+    'Cardoso',
+    'Costa',
+    'Dias',
+    'Ferreira',
+    'Gomes',
+    'Lima',
+    'Martins',
+    'Melo',
+    'Oliveira',
+    'Pereira',
+    'Ribeiro',
+    'Rocha',
+    'Santos',
+    'Silva',
+    'Souza',
+    'Teixeira',
+)
+DEPARTMENTS = (
+    'administrativo',
+    'comercial',
+    'financeiro',
+    'recursos humanos',
+    'tecnologia',
+)
+# (cargo, função, peso), nas proporções do data.csv
+ROLES = (
+    ('estagiário', 'profissional', 17),
+    ('analista', 'profissional', 34),
+    ('coordenador', 'gestor', 28),
+    ('gerente', 'gestor', 20),
+    ('diretor', 'gestor', 2),
+)
+TENURES = (
+    'menos de 1 ano',
+    'entre 1 e 2 anos',
+    'entre 2 e 5 anos',
+    'mais de 5 anos',
+)
+GENDERS = (('masculino', 48), ('feminino', 48), ('outro', 4))
+GENERATIONS = ('baby boomer', 'geração x', 'geração y', 'geração z')
+LOCATIONS = tuple(name.lower() for _, name in CAPITAL_CHOICES)
+COMMENT_WORDS = (
+    'ambiente',
+    'equipe',
+    'gestor',
+    'carreira',
+    'feedback',
+    'projetos',
+    'reconhecimento',
+    'salário',
+    'benefícios',
+    'aprendizado',
+    'colaborativa',
+    'processos',
+    'comunicação',
+    'liderança',
+    'metas',
+    'crescimento',
+    'bom',
+    'ótimo',
+    'melhorar',
+    'falta',
+    'clareza',
+    'oportunidades',
+    'trabalho',
+    'desafios',
+    'flexibilidade',
+    'treinamento',
+    'cultura',
+    'respeito',
+)
+# Comentários e combinações de notas sorteados no início e reutilizados
+# nas linhas, o que evita dezenas de sorteios por linha
+COMMENT_POOL_SIZE = 1000
+SCORE_POOL_BITS = 10
+SCORE_POOL_SIZE = 2**SCORE_POOL_BITS
+# Desvio de cada nota em relação à satisfação do funcionário
+NOISE = (-2, -1, -1, 0, 0, 0, 1, 1, 2)
+EMPTY_ANSWERS = ('',) * (len(SCORE_COLUMNS) + len(COMMENT_COLUMNS))
+EMPTY_COMMENT = '-'
+FIRST_WAVE = date(2022, 1, 20)
+WAVE_INTERVAL = timedelta(days=90)
+
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def _uniform(rng, values, k):
+    """Sorteia `k` índices de `values` como array compacto"""
+    return array('B', rng.choices(range(len(values)), k=k))
+
+
+def _weighted(rng, choices, k):
+    """Sorteia `k` índices de `choices` ((..., peso)) como array compacto"""
+    cum_weights = list(accumulate(choice[-1] for choice in choices))
+    return array(
+        'B', rng.choices(range(len(choices)), cum_weights=cum_weights, k=k)
+    )
+
+
+class SurveyGenerator:
+    """
+    Gera linhas no formato das exportações da pesquisa. A hierarquia tem
+    `companies` empresas, cada uma com `directorates` diretorias, cada
+    diretoria com `managements` gerências, cada gerência com
+    `coordinations` coordenações e cada coordenação com `areas` áreas.
+    Cada funcionário responde uma vez por onda (`waves`, a cada 90 dias).
+
+    Os atributos de cada funcionário são sorteados uma única vez e
+    guardados em arrays compactos (poucos bytes por funcionário), e as
+    linhas são produzidas sob demanda. O resultado depende só da semente.
+    Cada funcionário tem um nível de satisfação que puxa as notas e o eNPS,
+    então agregações (eNPS, favorabilidade) não ficam todas no meio da
+    escala.
+    """
+
+    def __init__(
+        self,
+        employees=1000,
+        waves=1,
+        companies=1,
+        directorates=5,
+        managements=2,
+        coordinations=2,
+        areas=2,
+        comment_length=60,
+        comment_rate=0.3,
+        seed=0,
+    ):
+        self.employees = employees
+        self.waves = waves
+        self.companies = companies
+        self.shape = (directorates, managements, coordinations, areas)
+        self.comment_length = comment_length
+        self.comment_rate = comment_rate
+        self.seed = seed
+        self.areas_per_company = (
+            directorates * managements * coordinations * areas
+        )
+
+    @property
+    def rows(self):
+        return self.employees * self.waves
+
+    def _sample_employees(self, rng):
+        n = self.employees
+        total_areas = self.companies * self.areas_per_company
+        self.area = array('I', (rng.randrange(total_areas) for _ in range(n)))
+        self.role = _weighted(rng, ROLES, n)
+        self.gender = _weighted(rng, GENDERS, n)
+        self.first_name = _uniform(rng, FIRST_NAMES, n)
+        self.last_name = _uniform(rng, LAST_NAMES, n)
+        self.department = _uniform(rng, DEPARTMENTS, n)
+        self.tenure = _uniform(rng, TENURES, n)
+        self.generation = _uniform(rng, GENERATIONS, n)
+        self.location = _uniform(rng, LOCATIONS, n)
+        # Satisfação de 1 a 7, concentrada no meio da escala
+        self.mood = array(
+            'B',
+            (min(7, max(1, round(rng.gauss(4.5, 1.5)))) for _ in range(n)),
+        )
+
+    def _comment_pool(self, rng):
+        """Comentários sorteados, misturados a '-' na proporção desejada"""
+        if self.comment_length <= 0 or self.comment_rate <= 0:
+            return [EMPTY_COMMENT]
+        pool = []
+        for _ in range(COMMENT_POOL_SIZE):
+            length = max(1, round(rng.gauss(1, 0.3) * self.comment_length))
+            words = [rng.choice(COMMENT_WORDS)]
+            size = len(words[0])
+            while size < length:
+                words.append(rng.choice(COMMENT_WORDS))
+                size += len(words[-1]) + 1
+            pool.append(' '.join(words).capitalize() + '.')
+        rate = self.comment_rate
+        empty = round(COMMENT_POOL_SIZE * (1 - rate) / rate)
+        return pool + [EMPTY_COMMENT] * empty
+
+    def hierarchy(self, area):
+        """Nomes (empresa, diretoria, gerência, coordenação, área)"""
+        company, area = divmod(area, self.areas_per_company)
+        directorates, managements, coordinations, areas = self.shape
+        path = []
+        for size in (
+            managements * coordinations * areas,
+            coordinations * areas,
+            areas,
+        ):
+            index, area = divmod(area, size)
+            path.append(index + 1)
+        path.append(area + 1)
+        d, m, c, a = path
+        return (
+            f'empresa {company + 1}',
+            f'diretoria {d}',
+            f'gerência {d}.{m}',
+            f'coordenação {d}.{m}.{c}',
+            f'área {d}.{m}.{c}.{a}',
+        )
+
+    def _score_pool(self, rng):
+        """
+        Para cada nível de satisfação, SCORE_POOL_SIZE combinações de
+        notas (7 Likert + eNPS) já em texto, com ruído em torno dele
+        """
+        pool = [None]
+        for mood in range(1, 8):
+            enps = round((mood - 1) * 10 / 6)
+            combinations = []
+            for _ in range(SCORE_POOL_SIZE):
+                noise = rng.choices(NOISE, k=8)
+                scores = [
+                    str(min(7, max(1, mood + delta))) for delta in noise[:7]
+                ]
+                scores.append(str(min(10, max(0, enps + noise[7]))))
+                combinations.append(scores)
+            pool.append(combinations)
+        return pool
+
+    def __iter__(self):
+        """Itera as linhas (listas na ordem de HEADER), onda por onda"""
+        rng = random.Random(self.seed)
+        self._sample_employees(rng)
+        comments = self._comment_pool(rng)
+        scores = self._score_pool(rng)
+        n_comments = len(COMMENT_COLUMNS)
+        first_score = HEADER.index(SCORE_COLUMNS[0][0])
+        hierarchies = {}
+        for wave in range(self.waves):
+            answered = (FIRST_WAVE + wave * WAVE_INTERVAL).strftime(
+                DATE_FORMAT
+            )
+            for i in range(self.employees):
+                area = self.area[i]
+                hierarchy = hierarchies.get(area)
+                if hierarchy is None:
+                    hierarchy = hierarchies[area] = self.hierarchy(area)
+                company = area // self.areas_per_company + 1
+                cargo, funcao, _ = ROLES[self.role[i]]
+                row = [
+                    f'{FIRST_NAMES[self.first_name[i]]} '
+                    f'{LAST_NAMES[self.last_name[i]]}',
+                    f'colaborador{i + 1:07d}@exemplo.com.br',
+                    f'colaborador{i + 1:07d}@empresa{company}.com.br',
+                    DEPARTMENTS[self.department[i]],
+                    cargo,
+                    funcao,
+                    LOCATIONS[self.location[i]],
+                    TENURES[self.tenure[i]],
+                    GENDERS[self.gender[i]][0],
+                    GENERATIONS[self.generation[i]],
+                    *hierarchy,
+                    answered,
+                    *EMPTY_ANSWERS,
+                ]
+                # Notas e comentários se alternam nas colunas
+                row[first_score::2] = scores[self.mood[i]][
+                    rng.getrandbits(SCORE_POOL_BITS)
+                ]
+                row[first_score + 1 :: 2] = rng.choices(comments, k=n_comments)
+                yield row
+
+
+@contextmanager
+def open_output(path):
+    """Abre o destino em texto ('-' é stdout; .gz/.bz2/.xz comprimem)"""
+    if path == '-':
+        yield sys.stdout
+        return
+    opener = OPENERS.get(os.path.splitext(path)[1], open)
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        yield f
+
+
+def write_survey_file(generator, path):
+    """Grava as linhas do gerador em `path`, sem mantê-las em memória"""
+    with open_output(path) as f:
+        writer = csv.writer(f, delimiter=CSV_DELIMITER, lineterminator='\n')
+        writer.writerow(HEADER)
+        writer.writerows(generator)
+    return generator.rows
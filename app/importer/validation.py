@@ -0,0 +1,240 @@
+# Validação do CSV sem acesso ao banco (import_data --check)
+import csv
+import io
+from array import array
+from functools import partial
+
+from .parsing import (
+    CSV_DELIMITER,
+    GENDER_BY_NAME,
+    GENERATION_BY_NAME,
+    MAX_LENGTHS,
+    SCORE_COLUMNS,
+    SOURCE_COLUMNS,
+    STATE_BY_NAME,
+    parse_date,
+)
+from .readers import open_source
+
+# Linhas validadas de cada vez; cada bloco é transposto em colunas
+CHUNK_SIZE = 100_000
+# Escala Likert usada nas exportações (1 a 7) e escala do eNPS
+LIKERT_RANGE = range(1, 8)
+ENPS_RANGE = range(0, 11)
+# Colunas do CSV conferidas contra o max_length do campo de destino
+LENGTH_COLUMNS = (
+    ('n0_empresa', 'empresa'),
+    ('n1_diretoria', 'diretoria'),
+    ('n2_gerencia', 'gerencia'),
+    ('n3_coordenacao', 'coordenadoria'),
+    ('n4_area', 'area'),
+    ('funcao', 'funcao'),
+    ('cargo', 'cargo'),
+    ('nome', 'nome'),
+    ('email', 'email'),
+    ('email_corporativo', 'email_corporativo'),
+    ('tempo_de_empresa', 'tempo_de_empresa'),
+)
+
+
+def check_score(value, valid_range):
+    try:
+        number = int(value)
+    except ValueError:
+        return 'Nota não numérica'
+    if number not in valid_range:
+        return (
+            f'Nota fora do intervalo {valid_range.start} a '
+            f'{valid_range.stop - 1}'
+        )
+    return None
+
+
+def check_date(value):
+    try:
+        parse_date(value)
+    except ValueError:
+        return 'Data inválida (esperado dd/mm/aaaa)'
+    return None
+
+
+def check_lookup(lookup, message):
+    return lambda value: None if value.lower() in lookup else message
+
+
+# Verificações por valor: como as colunas validadas têm poucos valores
+# distintos, cada valor é conferido uma única vez por coluna
+VALUE_CHECKS = tuple(
+    (
+        column,
+        partial(
+            check_score,
+            valid_range=ENPS_RANGE if field == 'enps' else LIKERT_RANGE,
+        ),
+    )
+    for column, field in SCORE_COLUMNS
+) + (
+    ('Data da Resposta', check_date),
+    (
+        'localidade',
+        check_lookup(STATE_BY_NAME, 'Localidade não é um estado ou capital'),
+    ),
+    ('genero', check_lookup(GENDER_BY_NAME, 'Gênero desconhecido')),
+    ('geracao', check_lookup(GENERATION_BY_NAME, 'Geração desconhecida')),
+)
+
+
+class Validator:
+    """
+    Valida o CSV em blocos de CHUNK_SIZE linhas, transpostos em colunas:
+    faixas das notas, eNPS, datas, localidades, gênero, geração e tamanho
+    dos textos são conferidos coluna a coluna, e a unicidade de email e
+    email corporativo é verificada com índices em memória, com as mesmas
+    regras dos motores de importação. Nada é gravado no banco.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.errors = []
+        # Resultado de cada valor distinto já conferido, por coluna
+        self.verdicts = {column: {} for column, _ in VALUE_CHECKS}
+        # email -> nome e email corporativo -> email da primeira ocorrência
+        self.names = {}
+        self.owners = {}
+
+    def add_error(self, line, column, value, message):
+        self.errors.append(
+            {
+                'line': line,
+                'column': column,
+                'value': value,
+                'message': message,
+            }
+        )
+
+    def run(self):
+        with open_source(self.path) as f:
+            text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+            try:
+                return self.validate(csv.reader(text, delimiter=CSV_DELIMITER))
+            finally:
+                # Devolve o fluxo ao open_source sem fechá-lo (pode ser stdin)
+                text.detach()
+
+    def validate(self, reader):
+        header = next(reader, [])
+        missing = [column for column in SOURCE_COLUMNS if column not in header]
+        for column in missing:
+            self.add_error(1, column, None, 'Coluna ausente no cabeçalho')
+        if missing:
+            return self.report()
+        indexes = {column: header.index(column) for column in header}
+        lines = array('q')
+        chunk = []
+        for row in reader:
+            self.rows += 1
+            if len(row) != len(header):
+                self.add_error(
+                    reader.line_num,
+                    None,
+                    None,
+                    f'Esperadas {len(header)} colunas, '
+                    f'encontradas {len(row)}',
+                )
+                continue
+            lines.append(reader.line_num)
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self.validate_chunk(lines, chunk, indexes)
+                lines, chunk = array('q'), []
+        if chunk:
+            self.validate_chunk(lines, chunk, indexes)
+        return self.report()
+
+    def validate_chunk(self, lines, chunk, indexes):
+        columns = list(zip(*chunk))
+
+        for column, check in VALUE_CHECKS:
+            values = columns[indexes[column]]
+            verdicts = self.verdicts[column]
+            distinct = set(values)
+            for value in distinct.difference(verdicts):
+                verdicts[value] = check(value)
+            invalid = {value for value in distinct if verdicts[value]}
+            if not invalid:
+                continue
+            for position, value in enumerate(values):
+                if value in invalid:
+                    self.add_error(
+                        lines[position], column, value, verdicts[value]
+                    )
+
+        for column, key in LENGTH_COLUMNS:
+            values = columns[indexes[column]]
+            max_length = MAX_LENGTHS[key]
+            if max(map(len, values)) <= max_length:
+                continue
+            for position, value in enumerate(values):
+                if len(value) > max_length:
+                    self.add_error(
+                        lines[position],
+                        column,
+                        value,
+                        f'Excede {max_length} caracteres',
+                    )
+
+        self.check_uniqueness(
+            lines,
+            columns[indexes['email']],
+            columns[indexes['nome']],
+            columns[indexes['email_corporativo']],
+        )
+
+    def check_uniqueness(self, lines, emails, names, corporate_emails):
+        # A primeira linha de cada email define o nome da pessoa e o email
+        # corporativo pertence ao primeiro email que o usou
+        seen_names = self.names
+        owners = self.owners
+        for line, email, name, corporate in zip(
+            lines, emails, names, corporate_emails
+        ):
+            if not email:
+                self.add_error(line, 'email', email, 'Email vazio')
+                continue
+            if seen_names.setdefault(email, name) != name:
+                self.add_error(
+                    line,
+                    'email',
+                    email,
+                    'Este email já está em uso por outra pessoa.',
+                )
+                continue
+            if owners.setdefault(corporate, email) != email:
+                self.add_error(
+                    line,
+                    'email_corporativo',
+                    corporate,
+                    'Este email corporativo já está em uso por outro '
+                    'funcionário.',
+                )
+
+    def report(self):
+        """Relatório serializável em JSON, com os erros ordenados por linha"""
+        order = {column: index for index, column in enumerate(SOURCE_COLUMNS)}
+        self.errors.sort(
+            key=lambda error: (error['line'], order.get(error['column'], -1))
+        )
+        by_column = {}
+        for error in self.errors:
+            column = error['column'] or '*'
+            by_column[column] = by_column.get(column, 0) + 1
+        return {
+            'source': self.path,
+            'rows': self.rows,
+            'valid': not self.errors,
+            'error_count': len(self.errors),
+            'errors_by_column': by_column,
+            'errors': self.errors,
+        }
@@ -0,0 +1,102 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from app.analytics import (
+    covered_by_rollups,
+    parse_filters,
+    parse_group_by,
+    survey_analytics,
+)
+from app.management.commands.benchmark_serialization import best_of
+from app.models import SurveyResponse
+from app.rollups import rollups_current
+from app.snapshot import ScoreSnapshot
+
+# Consultas medidas por padrão (query strings de /api/analytics/)
+QUERIES = (
+    '',
+    'group_by=diretoria',
+    'group_by=area,mes',
+    'group_by=cargo,trimestre&estado=SP,RJ',
+    'group_by=genero,geracao',
+    'estado=SP,RJ&genero=M&geracao=Geração Z',
+    'group_by=semana&data_de=2022-01-01&data_ate=2022-06-30',
+    'group_by=dia',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Comparar o tempo dos indicadores calculados no banco (sobre as '
+        'respostas e sobre as agregações) com o da cópia em memória'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries',
+            nargs='*',
+            help='Query strings a medir (padrão: um conjunto de consultas)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Repetições de cada medição (vale a mais rápida)',
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            default='default',
+            help='Alias do banco de dados',
+        )
+
+    def handle(self, *args, **options):
+        database, repeat = options['database'], options['repeat']
+        if repeat < 1:
+            raise CommandError('--repeat deve ser positivo')
+        started = time.perf_counter()
+        try:
+            snapshot = ScoreSnapshot(database)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f'Cópia em memória: {snapshot.size} respostas em '
+            f'{time.perf_counter() - started:.2f}s'
+        )
+        queryset = SurveyResponse.objects.using(database)
+        current = rollups_current(database)
+        self.stdout.write(
+            f'ms por consulta, melhor de {repeat} execuções'
+            f"{'' if current else ' (agregações desatualizadas)'}"
+        )
+        self.stdout.write(
+            f"{'consulta':<48}{'grupos':>8}{'respostas':>11}"
+            f"{'agregações':>12}{'memória':>10}{'ganho':>8}  saída"
+        )
+        for query in options['queries'] or QUERIES:
+            params = QueryDict(query)
+            group_by = parse_group_by(params.get('group_by'))
+            filters, period = parse_filters(params)
+            sql, expected = best_of(
+                repeat,
+                lambda: survey_analytics(
+                    queryset.all(), params, use_rollups=False
+                ),
+            )
+            rollups = '-'
+            if current and covered_by_rollups(group_by, filters, period):
+                seconds, _ = best_of(
+                    repeat, lambda: survey_analytics(queryset.all(), params)
+                )
+                rollups = f'{seconds * 1000:.1f}'
+            memory, result = best_of(
+                repeat, lambda: snapshot.analytics(params)
+            )
+            self.stdout.write(
+                f'{query or "(tudo)":<48}{len(expected):>8}'
+                f'{sql * 1000:>11.1f}{rollups:>12}{memory * 1000:>10.2f}'
+                f'{sql / memory:>7.0f}x'
+                f"  {'idêntica' if result == expected else 'DIFERENTE'}"
+            )
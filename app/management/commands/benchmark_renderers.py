@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app.management.commands.benchmark_serialization import best_of
+from app.models import Employee
+from app.query_plan import plan_queryset
+from app.renderers import FastJSONRenderer, orjson
+from app.serializers import SerializadorFuncionario
+from app.values_serialization import values_plan
+
+
+def render_many(renderer, data, number):
+    for _ in range(number):
+        output = renderer.render(data)
+    return output
+
+
+class Command(BaseCommand):
+    help = (
+        'Comparar o JSONRenderer do DRF com o FastJSONRenderer na '
+        'renderização de uma página de funcionários'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page_size',
+            type=int,
+            default=10,
+            help='Funcionários na página',
+        )
+        parser.add_argument(
+            '--number',
+            type=int,
+            default=1000,
+            help='Renderizações por medição',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Repetições de cada medição (vale a mais rápida)',
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            default='default',
+            help='Alias do banco de dados',
+        )
+
+    def handle(self, *args, **options):
+        page_size, number = options['page_size'], options['number']
+        if min(page_size, number, options['repeat']) < 1:
+            raise CommandError(
+                '--page_size, --number e --repeat devem ser positivos'
+            )
+        queryset = Employee.objects.using(options['database']).all()
+        instances = list(
+            plan_queryset(queryset, SerializadorFuncionario)[:page_size]
+        )
+        if not instances:
+            raise CommandError('Não há funcionários no banco')
+        plan = values_plan(SerializadorFuncionario, Employee)
+        rows = queryset.values(**plan.expressions)[:page_size]
+        # Mesmo envelope da paginação; os resultados vêm do serializador
+        # (ReturnDict aninhados) e do caminho por values() (dicts)
+        pages = {
+            'serializador': SerializadorFuncionario(instances, many=True).data,
+            'values()': [plan.to_representation(row) for row in rows],
+        }
+
+        renderers = {'DRF': JSONRenderer(), 'rápido': FastJSONRenderer()}
+        self.stdout.write(
+            f"FastJSONRenderer com {'orjson' if orjson else 'json (stdlib)'}"
+            f'; µs por página de {len(instances)}, melhor de '
+            f"{options['repeat']} x {number}"
+        )
+        self.stdout.write(
+            f"{'resultados':<14}{'DRF':>10}{'rápido':>10}{'ganho':>8}  saída"
+        )
+        for name, results in pages.items():
+            data = {
+                'count': queryset.count(),
+                'count_exact': True,
+                'next': 'http://testserver/api/funcionarios/?page=2',
+                'previous': None,
+                'results': results,
+            }
+            timings, outputs = {}, {}
+            for label, renderer in renderers.items():
+                elapsed, outputs[label] = best_of(
+                    options['repeat'],
+                    lambda: render_many(renderer, data, number),
+                )
+                timings[label] = elapsed / number * 1e6
+            identical = outputs['DRF'] == outputs['rápido']
+            self.stdout.write(
+                f"{name:<14}{timings['DRF']:>10.1f}{timings['rápido']:>10.1f}"
+                f"{timings['DRF'] / timings['rápido']:>7.1f}x"
+                f"  {'idêntica' if identical else 'DIFERENTE'}"
+            )
@@ -0,0 +1,124 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from app.query_plan import plan_queryset
+from app.values_serialization import values_plan
+from app.views import (
+    AreaViewSet,
+    CoordenadoriaViewSet,
+    DiretoriaViewSet,
+    EmpresaViewSet,
+    FuncionarioViewSet,
+    GerenciaViewSet,
+    NivelFuncionarioViewSet,
+    PessoaViewSet,
+    RespostaPesquisaViewSet,
+    TipoFuncionarioViewSet,
+)
+
+VIEWSETS = (
+    EmpresaViewSet,
+    DiretoriaViewSet,
+    GerenciaViewSet,
+    CoordenadoriaViewSet,
+    AreaViewSet,
+    PessoaViewSet,
+    NivelFuncionarioViewSet,
+    TipoFuncionarioViewSet,
+    FuncionarioViewSet,
+    RespostaPesquisaViewSet,
+)
+
+
+def best_of(repeat, function):
+    """Menor tempo de `repeat` execuções e o resultado da última"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        'Comparar o custo por linha do serializador do DRF com o caminho '
+        'por values() (values_serialization) de cada visão'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Linhas serializadas por medição',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Repetições de cada medição (vale a mais rápida)',
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            default='default',
+            help='Alias do banco de dados',
+        )
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError('--rows e --repeat devem ser positivos')
+        renderer = JSONRenderer()
+        self.stdout.write(
+            'µs por linha (busca + serialização), melhor de '
+            f'{repeat} execuções'
+        )
+        self.stdout.write(
+            f"{'visão':<26}{'linhas':>8}"
+            f"{'DRF':>16}{'values()':>16}{'ganho':>8}  saída"
+        )
+        for viewset in VIEWSETS:
+            model = viewset.queryset.model
+            serializer_class = viewset.serializer_class
+            plan = values_plan(serializer_class, model)
+            if plan is None:
+                self.stdout.write(f'{viewset.__name__:<26}sem caminho rápido')
+                continue
+            queryset = model.objects.using(options['database'])
+            classic = plan_queryset(queryset.all(), serializer_class)[:rows]
+            values = queryset.values(**plan.expressions)[:rows]
+
+            fetch, instances = best_of(repeat, lambda: list(classic.all()))
+            serialize, classic_data = best_of(
+                repeat,
+                lambda: serializer_class(instances, many=True).data,
+            )
+            values_fetch, rows_ = best_of(repeat, lambda: list(values.all()))
+            values_serialize, values_data = best_of(
+                repeat,
+                lambda: [plan.to_representation(row) for row in rows_],
+            )
+            count = len(instances)
+            if not count:
+                self.stdout.write(f'{viewset.__name__:<26}sem dados')
+                continue
+            identical = renderer.render(classic_data) == renderer.render(
+                values_data
+            )
+
+            def per_row(seconds):
+                return seconds / count * 1e6
+
+            self.stdout.write(
+                f'{viewset.__name__:<26}{count:>8}'
+                f'{per_row(fetch):>7.1f} + {per_row(serialize):>6.1f}'
+                f'{per_row(values_fetch):>7.1f} + '
+                f'{per_row(values_serialize):>6.1f}'
+                f'{(fetch + serialize) / (values_fetch + values_serialize):>7.1f}x'
+                f"  {'idêntica' if identical else 'DIFERENTE'}"
+            )
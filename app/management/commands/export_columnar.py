@@ -0,0 +1,74 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.columnar import FORMATS, ROW_GROUP_SIZE, columnar_chunks
+from app.models import SurveyResponse
+
+
+class Command(BaseCommand):
+    help = (
+        'Exportar as respostas de pesquisa, com a hierarquia e os atributos '
+        'do funcionário, para Parquet ou Arrow IPC (exige pyarrow)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            required=True,
+            help='Arquivo de saída',
+        )
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default=None,
+            help='Formato (padrão: pela extensão do arquivo, senão parquet)',
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            default='default',
+            help='Alias do banco de dados',
+        )
+        parser.add_argument(
+            '--row_group_size',
+            type=int,
+            default=ROW_GROUP_SIZE,
+            help='Linhas por row group (Parquet) ou lote (Arrow)',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format = options['format'] or self.format_of(output)
+        if options['row_group_size'] < 1:
+            raise CommandError('--row_group_size deve ser positivo')
+        queryset = SurveyResponse.objects.using(options['database']).all()
+        try:
+            chunks = columnar_chunks(
+                queryset, format, options['row_group_size']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        with open(output, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(output) / 2**20
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{output} ({format}) gravado em {elapsed:.2f}s, '
+                f'{size:.1f} MiB'
+            )
+        )
+
+    @staticmethod
+    def format_of(path):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        for format, renderer in FORMATS.items():
+            if extension in (format, renderer.extension):
+                return format
+        return 'parquet'
@@ -0,0 +1,110 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importer.synthetic import SurveyGenerator, write_survey_file
+
+
+class Command(BaseCommand):
+    help = (
+        'Gerar um arquivo de pesquisa sintético, no formato do data.csv, '
+        'para testes de escala do importador e da API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            required=True,
+            help=(
+                "Arquivo de saída ('-' para a saída padrão); terminado em "
+                '.gz, .bz2 ou .xz é gravado comprimido'
+            ),
+        )
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=1000,
+            help='Quantidade de funcionários (linhas por onda)',
+        )
+        parser.add_argument(
+            '--waves',
+            type=int,
+            default=1,
+            help='Ondas da pesquisa; cada funcionário responde uma por onda',
+        )
+        parser.add_argument(
+            '--companies', type=int, default=1, help='Quantidade de empresas'
+        )
+        parser.add_argument(
+            '--directorates',
+            type=int,
+            default=5,
+            help='Diretorias por empresa',
+        )
+        parser.add_argument(
+            '--managements',
+            type=int,
+            default=2,
+            help='Gerências por diretoria',
+        )
+        parser.add_argument(
+            '--coordinations',
+            type=int,
+            default=2,
+            help='Coordenações por gerência',
+        )
+        parser.add_argument(
+            '--areas', type=int, default=2, help='Áreas por coordenação'
+        )
+        parser.add_argument(
+            '--comment_length',
+            type=int,
+            default=60,
+            help='Tamanho médio dos comentários, em caracteres',
+        )
+        parser.add_argument(
+            '--comment_rate',
+            type=float,
+            default=0.3,
+            help="Fração dos comentários preenchidos (os demais são '-')",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Semente; a mesma semente gera sempre o mesmo arquivo',
+        )
+
+    def handle(self, *args, **options):
+        sizes = (
+            'employees',
+            'waves',
+            'companies',
+            'directorates',
+            'managements',
+            'coordinations',
+            'areas',
+        )
+        for name in sizes:
+            if options[name] < 1:
+                raise CommandError(f'--{name} deve ser maior que 0')
+        if not 0 <= options['comment_rate'] <= 1:
+            raise CommandError('--comment_rate deve estar entre 0 e 1')
+
+        generator = SurveyGenerator(
+            comment_length=options['comment_length'],
+            comment_rate=options['comment_rate'],
+            seed=options['seed'],
+            **{name: options[name] for name in sizes},
+        )
+        started = time.perf_counter()
+        rows = write_survey_file(generator, options['output'])
+        elapsed = time.perf_counter() - started
+        if options['output'] != '-':
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{rows} linhas gravadas em {options['output']} "
+                    f'({elapsed:.1f}s)'
+                )
+            )
@@ -1,23 +1,28 @@
-import csv
+import json
 import os
-from datetime import datetime
+import time
+from contextlib import nullcontext, suppress
 
 from django.core.management import call_command
-from django.core.management.base import BaseCommand
-
-from app.constants import STATE_CHOICES
-from app.models import (
-    Area,
-    Coordenadoria,
-    Diretoria,
-    Employee,
-    EmployeeLevel,
-    EmployeeType,
-    Empresa,
-    Gerencia,
-    Person,
-    SurveyResponse,
-)
+from django.core.management.base import BaseCommand, CommandError
+
+from app.counting import refresh_statistics
+from app.importer.checkpoint import Checkpointer
+from app.importer.engines import DEFAULT_BATCH_SIZE, BulkEngine, OrmEngine
+from app.importer.parallel import ParallelReader
+from app.importer.profiling import ImportProfiler
+from app.importer.postgres import CopyEngine, supports_copy
+from app.importer.readers import STDIN, CsvReader, is_plain_file, open_source
+from app.importer.shadow import SWAP_MODELS, SwapError, shadow_database
+from app.importer.validation import Validator
+from app.models import DatasetVersion
+from app.rollups import refresh_rollups
+
+ENGINES = {
+    'orm': OrmEngine,
+    'bulk': BulkEngine,
+    'copy': CopyEngine,
+}
 
 
 class Command(BaseCommand):
@@ -28,7 +33,10 @@ class Command(BaseCommand):
             '--csv_file',
             type=str,
             required=True,
-            help='Caminho para o arquivo CSV',
+            help=(
+                'Caminho para o arquivo CSV, opcionalmente comprimido '
+                "(gzip, bz2, xz ou zstd); use '-' para ler da entrada padrão"
+            ),
         )
         parser.add_argument(
             '--database',
@@ -36,156 +44,291 @@ class Command(BaseCommand):
             default='default',
             help='Banco de dados a ser usado',
         )
+        parser.add_argument(
+            '--engine',
+            choices=sorted(ENGINES),
+            default='bulk',
+            help=(
+                'Motor de importação: bulk (caches em memória e inserção '
+                'em lote), copy (COPY FROM STDIN, apenas PostgreSQL com '
+                'psycopg 3) ou orm (get_or_create linha a linha)'
+            ),
+        )
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Quantidade de linhas por lote/transação no motor bulk',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=(
+                'Processos para o parse do CSV; com mais de 1, o arquivo é '
+                'dividido em faixas de bytes e um único escritor grava os lotes'
+            ),
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help=(
+                'Importa apenas linhas novas ou alteradas, comparando o hash '
+                'de cada linha com os já importados (motor bulk)'
+            ),
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=(
+                'Retoma a importação deste arquivo a partir do último lote '
+                'gravado (checkpoint salvo a cada lote)'
+            ),
+        )
+        parser.add_argument(
+            '--swap',
+            action='store_true',
+            help=(
+                'Importa em tabelas de sombra (cópia das atuais) e as troca '
+                'de forma atômica no final, sem bloquear as tabelas lidas '
+                'pela API (PostgreSQL ou SQLite em arquivo)'
+            ),
+        )
+        parser.add_argument(
+            '--profile',
+            type=str,
+            help=(
+                'Grava neste arquivo um resumo JSON do perfil da importação: '
+                'tempo por etapa, consultas por modelo, linhas/s ao longo '
+                'da execução e pico de memória'
+            ),
+        )
+        parser.add_argument(
+            '--cprofile',
+            type=str,
+            help='Grava neste arquivo o dump do cProfile da importação',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help=(
+                'Apenas valida o arquivo, sem acessar o banco, e escreve um '
+                'relatório JSON com os erros por linha na saída padrão'
+            ),
+        )
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
         database = options['database']
+        if options['check']:
+            return self.validate_file(csv_file)
         # Run pending migrations
         self.stdout.write('Running migrations...')
         call_command('migrate', database=database, verbosity=0)
         self.stdout.write(self.style.SUCCESS('Migrations completed.'))
-        if not os.path.exists(csv_file):
+        if csv_file != STDIN and not os.path.exists(csv_file):
             self.stdout.write(
                 self.style.ERROR(f'Arquivo {csv_file} não existe')
             )
             return
+        try:
+            # Só identifica a compressão; nada é consumido da entrada
+            with open_source(csv_file):
+                pass
+        except ValueError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
 
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter=';')
-            for row in reader:
-                try:
-                    # Criar hierarquia
-                    empresa, _ = Empresa.objects.using(database).get_or_create(
-                        nome=row['n0_empresa']
-                    )
-                    diretoria, _ = Diretoria.objects.using(
-                        database
-                    ).get_or_create(nome=row['n1_diretoria'], empresa=empresa)
-                    gerencia, _ = Gerencia.objects.using(
-                        database
-                    ).get_or_create(
-                        nome=row['n2_gerencia'],
-                        empresa=empresa,
-                        diretoria=diretoria,
+        engine_name = options['engine']
+        if engine_name == 'copy' and not supports_copy(database):
+            self.stdout.write(
+                self.style.WARNING(
+                    f'O banco {database} não é PostgreSQL com psycopg 3; '
+                    'usando o motor bulk.'
+                )
+            )
+            engine_name = 'bulk'
+        engine_options = {}
+        if options['incremental']:
+            if engine_name != 'bulk':
+                self.stdout.write(
+                    self.style.WARNING(
+                        '--incremental só é suportado pelo motor bulk; '
+                        'usando o motor bulk.'
                     )
-                    coordenadoria, _ = Coordenadoria.objects.using(
-                        database
-                    ).get_or_create(
-                        nome=row['n3_coordenacao'],
-                        empresa=empresa,
-                        gerencia=gerencia,
+                )
+                engine_name = 'bulk'
+            engine_options['incremental'] = True
+        shadow = None
+        write_database = database
+        if options['swap']:
+            try:
+                shadow = shadow_database(database)
+                self.stdout.write('Preparando tabelas de sombra...')
+                shadow.create()
+            except SwapError as e:
+                self.stdout.write(self.style.ERROR(str(e)))
+                return
+            write_database = shadow.alias
+        engine = ENGINES[engine_name](
+            write_database,
+            batch_size=options['batch_size'],
+            on_error=self.report_error,
+            **engine_options,
+        )
+        checkpointer = None
+        start_offset = start_line = None
+        if csv_file == STDIN or shadow is not None:
+            if options['resume']:
+                self.stdout.write(
+                    self.style.WARNING(
+                        '--resume não é suportado na entrada padrão nem com '
+                        '--swap; importando desde o início.'
                     )
-                    area, _ = Area.objects.using(database).get_or_create(
-                        nome=row['n4_area'],
-                        empresa=empresa,
-                        cordenadoria=coordenadoria,
+                )
+        else:
+            checkpointer = Checkpointer(database, csv_file)
+            point = checkpointer.resume_point() if options['resume'] else None
+            if point is not None and point.completed:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Importação de {csv_file} já concluída.'
                     )
-
-                    # Criar EmployeeLevel e EmployeeType
-                    level, _ = EmployeeLevel.objects.using(
-                        database
-                    ).get_or_create(funcao=row['funcao'])
-                    emp_type, _ = EmployeeType.objects.using(
-                        database
-                    ).get_or_create(cargo=row['cargo'])
-
-                    # Criar Person
-                    person, _ = Person.objects.using(database).get_or_create(
-                        nome=row['nome'],
-                        email=row['email'],
-                        defaults={
-                            'genero': row['genero'],
-                            'geracao': row['geracao'],
-                        },
+                )
+                return
+            if point is not None:
+                start_offset, start_line = point.offset, point.line
+                self.stdout.write(
+                    f'Retomando a partir da linha {point.line} '
+                    f'(byte {point.offset}).'
+                )
+            else:
+                if options['resume']:
+                    self.stdout.write(
+                        'Nenhum checkpoint para este arquivo; importando '
+                        'desde o início.'
                     )
+                checkpointer.start()
 
-                    # Mapear localidade para estado
-                    estado = row['localidade']
-                    for code, name in STATE_CHOICES:
-                        if name.lower() == row['localidade'].lower():
-                            estado = code
-                            break
-
-                    # Criar Employee
-                    employee, _ = Employee.objects.using(
-                        database
-                    ).get_or_create(
-                        pessoa=person,
-                        defaults={
-                            'empresa': empresa,
-                            'email_corporativo': row['email_corporativo'],
-                            'funcao': level,
-                            'cargo': emp_type,
-                            'area': area,
-                            'estado': estado,
-                            'tempo_de_empresa': row['tempo_de_empresa'],
-                        },
-                    )
+        workers = options['workers']
+        if workers > 1 and not is_plain_file(csv_file):
+            # As faixas de bytes exigem seek no arquivo original
+            self.stdout.write(
+                self.style.WARNING(
+                    'O parse paralelo exige um arquivo CSV sem compressão; '
+                    'usando 1 worker.'
+                )
+            )
+            workers = 1
+        if workers > 1:
+            reader = ParallelReader(
+                csv_file,
+                workers,
+                start_offset=start_offset,
+                start_line=start_line,
+                hashes=engine.incremental,
+            )
+        else:
+            reader = CsvReader(csv_file, start_offset, start_line)
+        if checkpointer is not None:
+            checkpointer.reader = reader
+            engine.checkpoint = checkpointer.save
 
-                    # Analisar data
-                    data_resposta = datetime.strptime(
-                        row['Data da Resposta'], '%d/%m/%Y'
-                    ).date()
-
-                    # Criar SurveyResponse
-                    SurveyResponse.objects.using(database).get_or_create(
-                        employee=employee,
-                        data_da_resposta=data_resposta,
-                        defaults={
-                            'interesse_no_cargo': int(
-                                row['Interesse no Cargo']
-                            ),
-                            'comentarios_interesse_no_cargo': row[
-                                'Comentários - Interesse no Cargo'
-                            ]
-                            or '',
-                            'contribuicao': int(row['Contribuição']),
-                            'comentarios_contribuicao': row[
-                                'Comentários - Contribuição'
-                            ]
-                            or '',
-                            'aprendizado_e_desenvolvimento': int(
-                                row['Aprendizado e Desenvolvimento']
-                            ),
-                            'comentarios_aprendizado_e_desenvolvimento': row[
-                                'Comentários - Aprendizado e Desenvolvimento'
-                            ]
-                            or '',
-                            'feedback': int(row['Feedback']),
-                            'comentarios_feedback': row[
-                                'Comentários - Feedback'
-                            ]
-                            or '',
-                            'interacao_com_gestor': int(
-                                row['Interação com Gestor']
-                            ),
-                            'comentarios_interacao_com_gestor': row[
-                                'Comentários - Interação com Gestor'
-                            ]
-                            or '',
-                            'clareza_sobre_possibilidades_de_carreira': int(
-                                row['Clareza sobre Possibilidades de Carreira']
-                            ),
-                            'comentarios_clareza_sobre_possibilidades_de_carreira': row[
-                                'Comentários - Clareza sobre Possibilidades de Carreira'
-                            ]
-                            or '',
-                            'expectativa_de_permanencia': int(
-                                row['Expectativa de Permanência']
-                            ),
-                            'comentarios_expectativa_de_permanencia': row[
-                                'Comentários - Expectativa de Permanência'
-                            ]
-                            or '',
-                            'enps': int(row['eNPS']),
-                            'aberta_enps': row['[Aberta] eNPS'] or '',
-                        },
-                    )
+        profiler = None
+        records = reader
+        if options['profile'] or options['cprofile']:
+            profiler = ImportProfiler(
+                engine, cprofile=bool(options['cprofile'])
+            )
+            records = profiler.track(reader)
 
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Erro ao processar linha: {e}')
-                    )
-                    continue
+        profiling = profiler.profile(write_database) if profiler else None
+        started = time.perf_counter()
+        try:
+            with profiling or nullcontext():
+                if workers > 1:
+                    stats = engine.run_parsed(records)
+                    parse_seconds = reader.parse_seconds
+                else:
+                    stats = engine.run(records)
+                    parse_seconds = engine.timings['parse']
+            # Só as respostas inseridas entram nas agregações; as
+            # atualizadas já foram corrigidas lote a lote
+            aggregated = refresh_rollups(write_database)
+        except BaseException:
+            if shadow is not None:
+                shadow.discard()
+            else:
+                # Os lotes já confirmados continuam no banco. Se o próprio
+                # banco falhou, o erro que sobe é o da importação
+                with suppress(Exception):
+                    DatasetVersion.bump(database)
+            raise
+        if checkpointer is not None:
+            checkpointer.finish()
+        if shadow is not None:
+            shadow.swap()
+            self.stdout.write('Tabelas de sombra publicadas.')
+        # Invalida as contagens (e demais caches) da API e atualiza as
+        # estatísticas usadas pelas contagens aproximadas
+        DatasetVersion.bump(database)
+        refresh_statistics(database, SWAP_MODELS)
+        elapsed = time.perf_counter() - started
 
+        self.stdout.write(
+            f"Linhas: {stats['rows']} | inseridas: {stats['inserted']} | "
+            f"atualizadas: {stats['updated']} | "
+            f"já existentes: {stats['skipped']} | erros: {stats['errors']}"
+        )
+        self.stdout.write(f'Respostas somadas às agregações: {aggregated}')
+        self.report_throughput(
+            stats['rows'],
+            workers,
+            parse_seconds,
+            engine.timings['write'],
+            elapsed,
+        )
+        if options['profile']:
+            profiler.write(
+                options['profile'],
+                parse_seconds,
+                source=csv_file,
+                engine=engine_name,
+                workers=workers,
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(f"Perfil gravado em {options['profile']}")
+        if options['cprofile']:
+            profiler.dump_stats(options['cprofile'])
+            self.stdout.write(f"cProfile gravado em {options['cprofile']}")
         self.stdout.write(self.style.SUCCESS('Importação de dados concluída'))
+
+    def validate_file(self, csv_file):
+        if csv_file != STDIN and not os.path.exists(csv_file):
+            raise CommandError(f'Arquivo {csv_file} não existe')
+        try:
+            report = Validator(csv_file).run()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if not report['valid']:
+            raise CommandError(
+                f"{report['error_count']} erro(s) de validação em "
+                f"{report['rows']} linha(s)"
+            )
+
+    def report_throughput(self, rows, workers, parse, write, elapsed):
+        def rate(seconds):
+            return f'{rows / seconds:,.0f}' if seconds else '-'
+
+        self.stdout.write(
+            f'Parse: {rate(parse)} linhas/s por worker '
+            f'({workers} worker(s), {parse:.2f}s somados) | '
+            f'escrita: {rate(write)} linhas/s ({write:.2f}s) | '
+            f'total: {rate(elapsed)} linhas/s ({elapsed:.2f}s)'
+        )
+
+    def report_error(self, line, error):
+        self.stdout.write(
+            self.style.ERROR(f'Erro ao processar linha {line}: {error}')
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.models import SurveyRollup
+from app.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcular as agregações das respostas (SurveyRollup) a partir de '
+        'todas as respostas, por exemplo após alterações feitas fora do '
+        'import_data'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            type=str,
+            default='default',
+            help='Alias do banco de dados',
+        )
+
+    def handle(self, *args, **options):
+        database = options['database']
+        started = time.perf_counter()
+        responses = rebuild_rollups(database)
+        elapsed = time.perf_counter() - started
+        cells = SurveyRollup.objects.using(database).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{responses} respostas agregadas em {cells} células '
+                f'em {elapsed:.2f}s'
+            )
+        )
@@ -0,0 +1,239 @@
+# Generated by Django 6.0 on 2026-10-18 15:42
+
+import app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='area',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Área',
+                'verbose_name_plural': 'Áreas',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='coordenadoria',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Coordenadoria',
+                'verbose_name_plural': 'Coordenadorias',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='diretoria',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Diretoria',
+                'verbose_name_plural': 'Diretorias',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='employee',
+            options={
+                'ordering': ['pessoa__nome'],
+                'verbose_name': 'Funcionário',
+                'verbose_name_plural': 'Funcionários',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='employeelevel',
+            options={
+                'ordering': ['funcao'],
+                'verbose_name': 'Função',
+                'verbose_name_plural': 'Funções',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='employeetype',
+            options={
+                'ordering': ['cargo'],
+                'verbose_name': 'Cargo',
+                'verbose_name_plural': 'Cargos',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='empresa',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Empresa',
+                'verbose_name_plural': 'Empresas',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='gerencia',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Gerência',
+                'verbose_name_plural': 'Gerências',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='person',
+            options={
+                'ordering': ['nome'],
+                'verbose_name': 'Pessoa',
+                'verbose_name_plural': 'Pessoas',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='surveyresponse',
+            options={
+                'ordering': ['-data_da_resposta'],
+                'verbose_name': 'Resposta de Pesquisa',
+                'verbose_name_plural': 'Respostas de Pesquisas',
+            },
+        ),
+        migrations.AlterField(
+            model_name='area',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Área',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='coordenadoria',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Coordenadoria',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='diretoria',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Diretoria',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='email_corporativo',
+            field=models.EmailField(
+                db_index=True,
+                max_length=254,
+                unique=True,
+                verbose_name='Email Corporativo',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='tempo_de_empresa',
+            field=models.CharField(
+                max_length=20,
+                validators=[app.models.validate_stripped],
+                verbose_name='Tempo de Empresa',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='employeelevel',
+            name='funcao',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Função',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='employeetype',
+            name='cargo',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Cargo',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='empresa',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Compania',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='gerencia',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Gerência',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='person',
+            name='email',
+            field=models.EmailField(
+                db_index=True,
+                max_length=254,
+                unique=True,
+                verbose_name='Email',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='person',
+            name='genero',
+            field=models.CharField(
+                choices=[
+                    ('M', 'Masculino'),
+                    ('F', 'Feminino'),
+                    ('O', 'Outro'),
+                ],
+                db_index=True,
+                max_length=1,
+                verbose_name='Gênero',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='person',
+            name='geracao',
+            field=models.CharField(
+                choices=[
+                    ('Baby Boomers', 'Baby Boomers'),
+                    ('Geração X', 'Geracao X'),
+                    ('Millennials', 'Millennials'),
+                    ('Geração Z', 'Geracao Z'),
+                ],
+                db_index=True,
+                max_length=20,
+                verbose_name='Geração',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='person',
+            name='nome',
+            field=models.CharField(
+                db_index=True,
+                max_length=255,
+                validators=[app.models.validate_stripped],
+                verbose_name='Nome',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='surveyresponse',
+            name='data_da_resposta',
+            field=models.DateField(
+                db_index=True, verbose_name='Respondido em'
+            ),
+        ),
+    ]
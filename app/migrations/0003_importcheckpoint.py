@@ -0,0 +1,65 @@
+# Generated by Django 6.0 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_sync_model_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'source',
+                    models.CharField(
+                        max_length=1024, unique=True, verbose_name='Arquivo'
+                    ),
+                ),
+                (
+                    'file_size',
+                    models.BigIntegerField(verbose_name='Tamanho do arquivo'),
+                ),
+                (
+                    'offset',
+                    models.BigIntegerField(
+                        default=0, verbose_name='Posição (bytes)'
+                    ),
+                ),
+                (
+                    'line',
+                    models.PositiveIntegerField(
+                        default=1, verbose_name='Linha'
+                    ),
+                ),
+                (
+                    'completed',
+                    models.BooleanField(
+                        default=False, verbose_name='Concluída'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='Atualizado em'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Importação',
+                'verbose_name_plural': 'Checkpoints de Importação',
+            },
+        ),
+    ]
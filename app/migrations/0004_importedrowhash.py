@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedRowHash',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'key_hash',
+                    models.CharField(
+                        max_length=32,
+                        unique=True,
+                        verbose_name='Hash da chave',
+                    ),
+                ),
+                (
+                    'content_hash',
+                    models.CharField(
+                        max_length=32, verbose_name='Hash do conteúdo'
+                    ),
+                ),
+                (
+                    'response',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='app.surveyresponse',
+                        verbose_name='Resposta',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Hash de Linha Importada',
+                'verbose_name_plural': 'Hashes de Linhas Importadas',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_importedrowhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'version',
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name='Versão'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='Atualizado em'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Versão dos Dados',
+                'verbose_name_plural': 'Versões dos Dados',
+            },
+        ),
+    ]
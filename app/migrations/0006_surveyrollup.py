@@ -0,0 +1,773 @@
+# Generated by Django 6.0 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_datasetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'last_response_id',
+                    models.BigIntegerField(
+                        null=True, verbose_name='Última resposta agregada'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='Atualizado em'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Estado das Agregações',
+                'verbose_name_plural': 'Estados das Agregações',
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyRollup',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'estado',
+                    models.CharField(
+                        choices=[
+                            ('AC', 'Acre'),
+                            ('AL', 'Alagoas'),
+                            ('AP', 'Amapá'),
+                            ('AM', 'Amazonas'),
+                            ('BA', 'Bahia'),
+                            ('CE', 'Ceará'),
+                            ('DF', 'Distrito Federal'),
+                            ('ES', 'Espírito Santo'),
+                            ('GO', 'Goiás'),
+                            ('MA', 'Maranhão'),
+                            ('MT', 'Mato Grosso'),
+                            ('MS', 'Mato Grosso do Sul'),
+                            ('MG', 'Minas Gerais'),
+                            ('PA', 'Pará'),
+                            ('PB', 'Paraíba'),
+                            ('PR', 'Paraná'),
+                            ('PE', 'Pernambuco'),
+                            ('PI', 'Piauí'),
+                            ('RJ', 'Rio de Janeiro'),
+                            ('RN', 'Rio Grande do Norte'),
+                            ('RO', 'Rondônia'),
+                            ('RR', 'Roraima'),
+                            ('RS', 'Rio Grande do Sul'),
+                            ('SC', 'Santa Catarina'),
+                            ('SP', 'São Paulo'),
+                            ('SE', 'Sergipe'),
+                            ('TO', 'Tocantins'),
+                        ],
+                        max_length=2,
+                        verbose_name='Estado',
+                    ),
+                ),
+                ('mes', models.DateField(db_index=True, verbose_name='Mês')),
+                (
+                    'respostas',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Respostas'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_soma',
+                    models.BigIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Soma'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_0',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 0'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_1',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 1'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_2',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 2'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_3',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 3'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_4',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 4'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_5',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 5'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_6',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 6'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_7',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 7'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_8',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 8'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_9',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 9'
+                    ),
+                ),
+                (
+                    'interesse_no_cargo_10',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Interesse no cargo - Nota 10'
+                    ),
+                ),
+                (
+                    'contribuicao_soma',
+                    models.BigIntegerField(
+                        default=0, verbose_name='Contribuição - Soma'
+                    ),
+                ),
+                (
+                    'contribuicao_0',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 0'
+                    ),
+                ),
+                (
+                    'contribuicao_1',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 1'
+                    ),
+                ),
+                (
+                    'contribuicao_2',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 2'
+                    ),
+                ),
+                (
+                    'contribuicao_3',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 3'
+                    ),
+                ),
+                (
+                    'contribuicao_4',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 4'
+                    ),
+                ),
+                (
+                    'contribuicao_5',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 5'
+                    ),
+                ),
+                (
+                    'contribuicao_6',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 6'
+                    ),
+                ),
+                (
+                    'contribuicao_7',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 7'
+                    ),
+                ),
+                (
+                    'contribuicao_8',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 8'
+                    ),
+                ),
+                (
+                    'contribuicao_9',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 9'
+                    ),
+                ),
+                (
+                    'contribuicao_10',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Contribuição - Nota 10'
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_soma',
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Soma',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_0',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 0',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_1',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 1',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_2',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 2',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_3',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 3',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_4',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 4',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_5',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 5',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_6',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 6',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_7',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 7',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_8',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 8',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_9',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 9',
+                    ),
+                ),
+                (
+                    'aprendizado_e_desenvolvimento_10',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Aprendizado e Desenvolvimento - Nota 10',
+                    ),
+                ),
+                (
+                    'feedback_soma',
+                    models.BigIntegerField(
+                        default=0, verbose_name='Feedback - Soma'
+                    ),
+                ),
+                (
+                    'feedback_0',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 0'
+                    ),
+                ),
+                (
+                    'feedback_1',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 1'
+                    ),
+                ),
+                (
+                    'feedback_2',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 2'
+                    ),
+                ),
+                (
+                    'feedback_3',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 3'
+                    ),
+                ),
+                (
+                    'feedback_4',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 4'
+                    ),
+                ),
+                (
+                    'feedback_5',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 5'
+                    ),
+                ),
+                (
+                    'feedback_6',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 6'
+                    ),
+                ),
+                (
+                    'feedback_7',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 7'
+                    ),
+                ),
+                (
+                    'feedback_8',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 8'
+                    ),
+                ),
+                (
+                    'feedback_9',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 9'
+                    ),
+                ),
+                (
+                    'feedback_10',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='Feedback - Nota 10'
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_soma',
+                    models.BigIntegerField(
+                        default=0, verbose_name='Interação com o Gestor - Soma'
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_0',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 0',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_1',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 1',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_2',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 2',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_3',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 3',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_4',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 4',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_5',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 5',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_6',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 6',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_7',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 7',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_8',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 8',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_9',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 9',
+                    ),
+                ),
+                (
+                    'interacao_com_gestor_10',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Interação com o Gestor - Nota 10',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_soma',
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Soma',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_0',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 0',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_1',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 1',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_2',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 2',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_3',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 3',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_4',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 4',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_5',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 5',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_6',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 6',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_7',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 7',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_8',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 8',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_9',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 9',
+                    ),
+                ),
+                (
+                    'clareza_sobre_possibilidades_de_carreira_10',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Clareza sobre Possibilidades de Carreira - Nota 10',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_soma',
+                    models.BigIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Soma',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_0',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 0',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_1',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 1',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_2',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 2',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_3',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 3',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_4',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 4',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_5',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 5',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_6',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 6',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_7',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 7',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_8',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 8',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_9',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 9',
+                    ),
+                ),
+                (
+                    'expectativa_de_permanencia_10',
+                    models.PositiveIntegerField(
+                        default=0,
+                        verbose_name='Expectativa de Permanência - Nota 10',
+                    ),
+                ),
+                (
+                    'enps_soma',
+                    models.BigIntegerField(
+                        default=0, verbose_name='eNPS - Soma'
+                    ),
+                ),
+                (
+                    'enps_0',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 0'
+                    ),
+                ),
+                (
+                    'enps_1',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 1'
+                    ),
+                ),
+                (
+                    'enps_2',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 2'
+                    ),
+                ),
+                (
+                    'enps_3',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 3'
+                    ),
+                ),
+                (
+                    'enps_4',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 4'
+                    ),
+                ),
+                (
+                    'enps_5',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 5'
+                    ),
+                ),
+                (
+                    'enps_6',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 6'
+                    ),
+                ),
+                (
+                    'enps_7',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 7'
+                    ),
+                ),
+                (
+                    'enps_8',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 8'
+                    ),
+                ),
+                (
+                    'enps_9',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 9'
+                    ),
+                ),
+                (
+                    'enps_10',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='eNPS - Nota 10'
+                    ),
+                ),
+                (
+                    'area',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='app.area',
+                        verbose_name='Área',
+                    ),
+                ),
+                (
+                    'cargo',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='app.employeetype',
+                        verbose_name='Cargo',
+                    ),
+                ),
+                (
+                    'empresa',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='app.empresa',
+                        verbose_name='Empresa',
+                    ),
+                ),
+                (
+                    'funcao',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to='app.employeelevel',
+                        verbose_name='Função',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Agregação de Respostas',
+                'verbose_name_plural': 'Agregações de Respostas',
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=(
+                            'empresa',
+                            'area',
+                            'cargo',
+                            'funcao',
+                            'estado',
+                            'mes',
+                        ),
+                        name='unique_survey_rollup_cell',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0 on 2026-10-18 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_ancestors(apps, schema_editor):
+    Area = apps.get_model('app', 'Area')
+    Coordenadoria = apps.get_model('app', 'Coordenadoria')
+    coordenadoria = Coordenadoria.objects.filter(pk=OuterRef('cordenadoria'))
+    Area.objects.using(schema_editor.connection.alias).update(
+        gerencia=Subquery(coordenadoria.values('gerencia')[:1]),
+        diretoria=Subquery(coordenadoria.values('gerencia__diretoria')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_surveyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='gerencia',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='app.gerencia',
+                verbose_name='Gerência',
+            ),
+        ),
+        migrations.AddField(
+            model_name='area',
+            name='diretoria',
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to='app.diretoria',
+                verbose_name='Diretoria',
+            ),
+        ),
+        migrations.RunPython(fill_ancestors, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='area',
+            name='gerencia',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to='app.gerencia',
+                verbose_name='Gerência',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='area',
+            name='diretoria',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to='app.diretoria',
+                verbose_name='Diretoria',
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils.timezone import now
 
 from .constants import STATE_CHOICES
 
@@ -15,7 +16,11 @@ def validate_stripped(value):
     return value
 
 
-# Modelos desenhados para escalar a solução de forma hierárquica
+# Modelos desenhados para escalar a solução de forma hierárquica.
+# `str_parts` descreve o __str__ de cada modelo: campos (um campo relacional
+# sem sufixo é o __str__ do modelo relacionado) e textos fixos (Value). O
+# app.query_plan carrega esses campos junto com a consulta e o
+# app.values_serialization monta o mesmo texto em SQL
 class Empresa(models.Model):
     nome = models.CharField(
         max_length=255,
@@ -24,6 +29,8 @@ class Empresa(models.Model):
         db_index=True,
     )
 
+    str_parts = ('nome',)
+
     def __str__(self):
         return self.nome
 
@@ -44,6 +51,8 @@ class Diretoria(models.Model):
         db_index=True,
     )
 
+    str_parts = ('nome', models.Value(' - '), 'empresa__nome')
+
     def __str__(self):
         return f'{self.nome} - {self.empresa.nome}'
 
@@ -67,9 +76,20 @@ class Gerencia(models.Model):
         Diretoria, on_delete=models.CASCADE, verbose_name='Diretoria'
     )
 
+    str_parts = ('nome', models.Value(' - '), 'empresa__nome')
+
     def __str__(self):
         return f'{self.nome} - {self.empresa.nome}'
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # Mantém os ancestrais desnormalizados das áreas
+            Area.objects.using(self._state.db).filter(gerencia=self).update(
+                diretoria_id=self.diretoria_id
+            )
+
     class Meta:
         verbose_name = 'Gerência'
         verbose_name_plural = 'Gerências'
@@ -90,9 +110,23 @@ class Coordenadoria(models.Model):
         Gerencia, on_delete=models.CASCADE, verbose_name='Gerência'
     )
 
+    str_parts = ('nome', models.Value(' - '), 'empresa__nome')
+
     def __str__(self):
         return f'{self.nome} - {self.empresa.nome}'
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # Mantém os ancestrais desnormalizados das áreas
+            Area.objects.using(self._state.db).filter(
+                cordenadoria=self
+            ).update(
+                gerencia_id=self.gerencia_id,
+                diretoria_id=self.gerencia.diretoria_id,
+            )
+
     class Meta:
         verbose_name = 'Coordenadoria'
         verbose_name_plural = 'Coordenadorias'
@@ -112,10 +146,27 @@ class Area(models.Model):
     cordenadoria = models.ForeignKey(
         Coordenadoria, on_delete=models.CASCADE, verbose_name='Coordenadoria'
     )
+    # Ancestrais desnormalizados (como a empresa em todos os níveis), para
+    # filtrar e agrupar por qualquer nível a partir da área, sem percorrer
+    # coordenadoria -> gerência -> diretoria. Derivados da coordenadoria
+    gerencia = models.ForeignKey(
+        Gerencia, on_delete=models.CASCADE, verbose_name='Gerência'
+    )
+    diretoria = models.ForeignKey(
+        Diretoria, on_delete=models.CASCADE, verbose_name='Diretoria'
+    )
+
+    str_parts = ('nome', models.Value(' - '), 'empresa__nome')
 
     def __str__(self):
         return f'{self.nome} - {self.empresa.nome}'
 
+    def save(self, *args, **kwargs):
+        gerencia = self.cordenadoria.gerencia
+        self.gerencia_id = gerencia.pk
+        self.diretoria_id = gerencia.diretoria_id
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Área'
         verbose_name_plural = 'Áreas'
@@ -165,6 +216,8 @@ class Person(models.Model):
                 'Este email já está em uso por outra pessoa.'
             )
 
+    str_parts = ('nome', models.Value(' - '), 'email')
+
     def __str__(self):
         return f'{self.nome} - {self.email}'
 
@@ -182,6 +235,8 @@ class EmployeeLevel(models.Model):
         db_index=True,
     )
 
+    str_parts = ('funcao',)
+
     def __str__(self):
         return self.funcao
 
@@ -199,6 +254,8 @@ class EmployeeType(models.Model):
         db_index=True,
     )
 
+    str_parts = ('cargo',)
+
     def __str__(self):
         return self.cargo
 
@@ -253,6 +310,15 @@ class Employee(models.Model):
                 'Este email corporativo já está em uso por outro funcionário.'
             )
 
+    str_parts = (
+        models.Value('['),
+        'empresa',
+        models.Value('] '),
+        'pessoa__nome',
+        models.Value(' - '),
+        'pessoa__email',
+    )
+
     def __str__(self):
         return f'[{self.empresa}] {self.pessoa.nome} - {self.pessoa.email}'
 
@@ -319,6 +385,15 @@ class SurveyResponse(models.Model):
         blank=True, verbose_name='Comentários - eNPS'
     )
 
+    str_parts = (
+        'data_da_resposta',
+        models.Value(' - '),
+        'employee__pessoa__nome',
+        models.Value(' ('),
+        'employee__empresa__nome',
+        models.Value(')'),
+    )
+
     def __str__(self):
         return f'{self.data_da_resposta} - {self.employee.pessoa.nome} ({self.employee.empresa.nome})'
 
@@ -326,3 +401,189 @@ class SurveyResponse(models.Model):
         verbose_name = 'Resposta de Pesquisa'
         verbose_name_plural = 'Respostas de Pesquisas'
         ordering = ['-data_da_resposta']
+
+
+class ImportCheckpoint(models.Model):
+    """Posição do último lote gravado por import_data, para --resume"""
+
+    source = models.CharField(
+        max_length=1024, unique=True, verbose_name='Arquivo'
+    )
+    file_size = models.BigIntegerField(verbose_name='Tamanho do arquivo')
+    offset = models.BigIntegerField(default=0, verbose_name='Posição (bytes)')
+    line = models.PositiveIntegerField(default=1, verbose_name='Linha')
+    completed = models.BooleanField(default=False, verbose_name='Concluída')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Atualizado em'
+    )
+
+    def __str__(self):
+        return f'{self.source} - linha {self.line}'
+
+    class Meta:
+        verbose_name = 'Checkpoint de Importação'
+        verbose_name_plural = 'Checkpoints de Importação'
+
+
+class ImportedRowHash(models.Model):
+    """Hashes das linhas do CSV já importadas, para import_data --incremental"""
+
+    key_hash = models.CharField(
+        max_length=32, unique=True, verbose_name='Hash da chave'
+    )
+    content_hash = models.CharField(
+        max_length=32, verbose_name='Hash do conteúdo'
+    )
+    response = models.ForeignKey(
+        SurveyResponse, on_delete=models.CASCADE, verbose_name='Resposta'
+    )
+
+    def __str__(self):
+        return self.key_hash
+
+    class Meta:
+        verbose_name = 'Hash de Linha Importada'
+        verbose_name_plural = 'Hashes de Linhas Importadas'
+
+
+class DatasetVersion(models.Model):
+    """
+    Versão dos dados servidos pela API (linha única), incrementada pelo
+    import_data. Caches derivados dos dados usam a versão na chave.
+    """
+
+    version = models.PositiveBigIntegerField(default=0, verbose_name='Versão')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Atualizado em'
+    )
+
+    def __str__(self):
+        return f'Versão {self.version}'
+
+    @classmethod
+    def current(cls, using='default'):
+        return cls.state(using)[0]
+
+    @classmethod
+    def state(cls, using='default'):
+        """Versão e data da última troca, ou (0, None) antes do primeiro"""
+        state = (
+            cls.objects.using(using)
+            .filter(pk=1)
+            .values_list('version', 'updated_at')
+            .first()
+        )
+        return state or (0, None)
+
+    @classmethod
+    def bump(cls, using='default'):
+        # get_or_create trata a corrida de dois imports criando a linha; o
+        # incremento é um UPDATE atômico sobre a linha que já existe
+        objects = cls.objects.using(using)
+        objects.get_or_create(pk=1)
+        objects.filter(pk=1).update(
+            version=models.F('version') + 1, updated_at=now()
+        )
+
+    class Meta:
+        verbose_name = 'Versão dos Dados'
+        verbose_name_plural = 'Versões dos Dados'
+
+
+# Campos de nota de SurveyResponse, na ordem do CSV
+SCORE_FIELDS = tuple(
+    field.name
+    for field in SurveyResponse._meta.concrete_fields
+    if type(field) is models.IntegerField
+)
+# Faixas do histograma das notas. As pontas acumulam as notas fora da
+# escala (<= 0 e >= 10), de modo que as contagens acima ou abaixo de
+# qualquer limite entre 0 e 10 saem exatas
+ROLLUP_BUCKETS = range(0, 11)
+
+
+def rollup_sum_field(metric):
+    return f'{metric}_soma'
+
+
+def rollup_bucket_field(metric, score):
+    return f'{metric}_{score}'
+
+
+class SurveyRollup(models.Model):
+    """
+    Agregação das respostas por empresa, área, cargo, função, estado e mês
+    (os atributos do funcionário): quantidade de respostas e, por nota,
+    soma e histograma. Mantida pelo import_data (ver app.rollups).
+    """
+
+    empresa = models.ForeignKey(
+        Empresa, on_delete=models.CASCADE, verbose_name='Empresa'
+    )
+    area = models.ForeignKey(
+        Area, on_delete=models.CASCADE, verbose_name='Área'
+    )
+    cargo = models.ForeignKey(
+        EmployeeType, on_delete=models.CASCADE, verbose_name='Cargo'
+    )
+    funcao = models.ForeignKey(
+        EmployeeLevel, on_delete=models.CASCADE, verbose_name='Função'
+    )
+    estado = models.CharField(
+        max_length=2, choices=STATE_CHOICES, verbose_name='Estado'
+    )
+    mes = models.DateField(verbose_name='Mês', db_index=True)
+    respostas = models.PositiveIntegerField(
+        default=0, verbose_name='Respostas'
+    )
+
+    def __str__(self):
+        return f'{self.mes:%m/%Y} - {self.area_id} ({self.respostas})'
+
+    class Meta:
+        verbose_name = 'Agregação de Respostas'
+        verbose_name_plural = 'Agregações de Respostas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['empresa', 'area', 'cargo', 'funcao', 'estado', 'mes'],
+                name='unique_survey_rollup_cell',
+            )
+        ]
+
+
+# Soma e histograma de cada nota: colunas e não linhas, para cada célula
+# ser uma linha só
+for metric in SCORE_FIELDS:
+    label = SurveyResponse._meta.get_field(metric).verbose_name
+    SurveyRollup.add_to_class(
+        rollup_sum_field(metric),
+        models.BigIntegerField(default=0, verbose_name=f'{label} - Soma'),
+    )
+    for score in ROLLUP_BUCKETS:
+        SurveyRollup.add_to_class(
+            rollup_bucket_field(metric, score),
+            models.PositiveIntegerField(
+                default=0, verbose_name=f'{label} - Nota {score}'
+            ),
+        )
+
+
+class RollupState(models.Model):
+    """
+    Maior id de SurveyResponse já somado às agregações (linha única). As
+    respostas acima dele ainda não estão em SurveyRollup.
+    """
+
+    last_response_id = models.BigIntegerField(
+        null=True, verbose_name='Última resposta agregada'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Atualizado em'
+    )
+
+    def __str__(self):
+        return f'Agregado até {self.last_response_id}'
+
+    class Meta:
+        verbose_name = 'Estado das Agregações'
+        verbose_name_plural = 'Estados das Agregações'
@@ -1,11 +1,214 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counting import approximate_count, cached_count
+
+
+def expand_ordering(model, term):
+    """
+    Reescreve um termo de ordenação em colunas do banco. Ordenar por uma
+    chave estrangeira ordena, no Django, pela ordenação do modelo
+    relacionado; a expansão torna isso explícito para que o cursor guarde
+    exatamente os valores comparados.
+    """
+    descending = term.startswith('-')
+    path = term.lstrip('-')
+    current = model
+    for name in path.split('__'):
+        if name == 'pk':
+            field = current._meta.pk
+        else:
+            try:
+                field = current._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ValidationError(
+                    {'detail': f'Campo de ordenação inválido: {term}.'}
+                )
+        if field.is_relation:
+            current = field.related_model
+    if not field.is_relation:
+        return [term]
+    terms = []
+    for related_term in current._meta.ordering or ['pk']:
+        related_descending = related_term.startswith('-')
+        sign = '-' if descending != related_descending else ''
+        terms += expand_ordering(
+            model, f"{sign}{path}__{related_term.lstrip('-')}"
+        )
+    return terms
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por chave (keyset): o cursor opaco guarda os valores da
+    ordenação corrente (mais o pk, que desempata) do último item da página,
+    e a próxima página é filtrada a partir deles com WHERE, sem COUNT e
+    sem OFFSET. O custo de uma página não depende da profundidade. Os
+    campos de ordenação devem ser não nulos.
+    """
+
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            ordering, values, previous = (
+                cursor['o'],
+                cursor['v'],
+                cursor['p'],
+            )
+        except (
+            binascii.Error,
+            UnicodeDecodeError,
+            ValueError,
+            KeyError,
+            TypeError,
+        ):
+            raise ValidationError({'detail': 'Cursor inválido.'})
+        if ordering != self.ordering or len(values) != len(ordering):
+            raise ValidationError(
+                {'detail': 'Cursor não corresponde à ordenação solicitada.'}
+            )
+        return values, bool(previous)
+
+    def encode_cursor(self, item, previous):
+        # Linhas de values() (visões com values_serialization) são dicts
+        if isinstance(item, dict):
+            values = [item[key] for key in self.keys]
+        else:
+            values = [getattr(item, key) for key in self.keys]
+        cursor = json.dumps(
+            {'o': self.ordering, 'v': values, 'p': int(previous)},
+            cls=DjangoJSONEncoder,
+            separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def get_link(self, item, previous):
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(item, previous)
+        )
+
+    def after(self, values, backwards):
+        """Filtro dos itens que vêm depois (ou antes) da chave `values`"""
+        clauses = []
+        for position, term in enumerate(self.ordering):
+            descending = term.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            conditions = {
+                previous.lstrip('-'): value
+                for previous, value in zip(
+                    self.ordering[:position], values[:position]
+                )
+            }
+            conditions[f"{term.lstrip('-')}__{lookup}"] = values[position]
+            clauses.append(Q(**conditions))
+        return reduce(or_, clauses)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = []
+        for term in queryset.query.order_by or queryset.model._meta.ordering:
+            ordering += expand_ordering(queryset.model, term)
+        if not any(term.lstrip('-') == 'pk' for term in ordering):
+            ordering.append('pk')
+        self.ordering = ordering
+        self.keys = [f'keyset_{i}' for i in range(len(ordering))]
+
+        cursor = self.decode_cursor(request)
+        backwards = cursor is not None and cursor[1]
+        if backwards:
+            # Página anterior: percorre a ordenação invertida e desfaz a
+            # inversão no final
+            order_by = [
+                term[1:] if term.startswith('-') else f'-{term}'
+                for term in ordering
+            ]
+        else:
+            order_by = ordering
+        queryset = queryset.annotate(
+            **{
+                key: F(term.lstrip('-'))
+                for key, term in zip(self.keys, ordering)
+            }
+        ).order_by(*order_by)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor[0], backwards))
+
+        page = list(queryset[: self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[: self.page_size]
+        if backwards:
+            page.reverse()
+        self.next = self.previous = None
+        if page:
+            if has_more or backwards:
+                self.next = self.get_link(page[-1], previous=False)
+            if cursor is not None and (has_more or not backwards):
+                self.previous = self.get_link(page[0], previous=True)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'next': self.next,
+                'previous': self.previous,
+                'results': data,
+            }
+        )
 
 
 class CustomPageNumberPagination(PageNumberPagination):
-    """Paginação personalizada com validação de número de página e tamanho de página"""
+    """
+    Paginação personalizada com validação de número de página e tamanho de página.
+    Com o parâmetro `cursor` (vazio na primeira página), usa KeysetPagination.
+    A contagem é feita uma única vez e fica em cache até a próxima importação;
+    com `count=approximate`, listagens sem filtro usam a estimativa do banco.
+    """
+
+    cursor_query_param = KeysetPagination.cursor_query_param
+    count_query_param = 'count'
+    keyset = None
+    count_exact = True
+
+    def get_count(self, queryset, request):
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            estimate = approximate_count(queryset)
+            if estimate is not None:
+                return estimate, False
+        # Versão dos dados já lida pelo cache de respostas, se houver
+        version = getattr(request, 'dataset_version', None)
+        return cached_count(queryset, version), True
 
     def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        self.request = request
+
         # Obter o número da página solicitado
         page_number_param = request.query_params.get(self.page_query_param, 1)
 
@@ -24,7 +227,7 @@ class CustomPageNumberPagination(PageNumberPagination):
             )
 
         # Calcular o offset e verificar se excede o total de itens
-        total_count = queryset.count()
+        total_count, self.count_exact = self.get_count(queryset, request)
         offset = (requested_page_number - 1) * self.page_size
         if offset >= total_count and total_count > 0:
             raise ValidationError(
@@ -33,17 +236,39 @@ class CustomPageNumberPagination(PageNumberPagination):
                 }
             )
 
-        # Chamar o método pai para obter a página
-        page = super().paginate_queryset(queryset, request, view)
+        # O Paginator do Django usa a contagem já obtida em vez de contar
+        # de novo
+        paginator = self.django_paginator_class(queryset, self.page_size)
+        paginator.count = total_count
+        try:
+            self.page = paginator.page(requested_page_number)
+        except InvalidPage:
+            raise ValidationError(
+                {
+                    'detail': f'Número de página {requested_page_number} excede o total de páginas disponíveis ({paginator.num_pages}).'
+                }
+            )
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
 
-        # Verificar se a página solicitada é válida
-        if page is not None:
-            total_pages = self.page.paginator.num_pages
-            if requested_page_number > total_pages:
-                raise ValidationError(
-                    {
-                        'detail': f'Número de página {requested_page_number} excede o total de páginas disponíveis ({total_pages}).'
-                    }
-                )
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return Response(
+            {
+                'count': self.page.paginator.count,
+                'count_exact': self.count_exact,
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            }
+        )
 
-        return page
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {
+            'type': 'boolean',
+            'description': 'Falso quando `count` é uma estimativa',
+        }
+        return response_schema
@@ -0,0 +1,177 @@
+# Planejamento das consultas da API a partir dos serializadores
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, Value
+from rest_framework.relations import (
+    ManyRelatedField,
+    RelatedField,
+    SlugRelatedField,
+)
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+class QueryPlan:
+    """
+    Caminhos para select_related, prefetch_related e only() que cobrem
+    tudo o que um serializador lê de um modelo. `only` vira None quando
+    algum campo lê um atributo que não é campo do modelo (property,
+    método): nesse caso as colunas não são restringidas.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.select = []
+        self.prefetch = []
+        self.only = []
+
+    def add_select(self, path):
+        if path not in self.select:
+            self.select.append(path)
+
+    def add_only(self, path):
+        if self.only is not None and path not in self.only:
+            self.only.append(path)
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(
+                *(
+                    Prefetch(
+                        path, queryset=plan.apply(plan.model.objects.all())
+                    )
+                    for path, plan in self.prefetch
+                )
+            )
+        if self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def join(prefix, name):
+    return f'{prefix}__{name}' if prefix else name
+
+
+def plan_str(plan, model, prefix):
+    """Inclui no plano os campos lidos por model.__str__ (`str_parts`)"""
+    str_parts = getattr(model, 'str_parts', None)
+    if str_parts is None:
+        # __str__ desconhecido: carrega a linha inteira do modelo
+        for field in model._meta.concrete_fields:
+            plan.add_only(join(prefix, field.name))
+        return
+    for path in str_parts:
+        if isinstance(path, Value):
+            continue
+        current, current_prefix = model, prefix
+        for name in path.split('__'):
+            field = current._meta.get_field(name)
+            current_prefix = join(current_prefix, name)
+            plan.add_only(current_prefix)
+            if field.is_relation:
+                plan.add_select(current_prefix)
+                current = field.related_model
+        if field.is_relation:
+            plan_str(plan, current, current_prefix)
+
+
+def get_model_field(model, attr):
+    """Campo do modelo pelo nome ou pelo acessor de uma relação reversa"""
+    try:
+        return model._meta.get_field(attr)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == attr:
+                return relation
+        raise
+
+
+def plan_field(plan, model, prefix, field):
+    """Inclui no plano o que `field` (campo do serializador) lê de `model`"""
+    if field.write_only:
+        return
+    if field.source == '*':
+        if isinstance(field, BaseSerializer):
+            plan_serializer(plan, model, prefix, field)
+        else:
+            plan.only = None
+        return
+    current, path = model, prefix
+    attrs = field.source_attrs
+    for position, attr in enumerate(attrs):
+        try:
+            model_field = get_model_field(current, attr)
+        except FieldDoesNotExist:
+            # Atributos inexistentes são ignorados pelo DRF (SkipField);
+            # properties e métodos podem ler qualquer coluna
+            if hasattr(current, attr):
+                plan.only = None
+            return
+        path = join(path, attr)
+        last = position == len(attrs) - 1
+        if not model_field.is_relation:
+            plan.add_only(path)
+            return
+        related = model_field.related_model
+        if model_field.many_to_many or model_field.one_to_many:
+            if not last:
+                return
+            child_plan = QueryPlan(related)
+            if model_field.one_to_many:
+                # O prefetch associa os objetos pela chave estrangeira
+                child_plan.add_only(model_field.field.name)
+            if isinstance(field, ListSerializer):
+                plan_serializer(child_plan, related, '', field.child)
+            elif isinstance(field, ManyRelatedField):
+                plan_related(child_plan, related, '', field.child_relation)
+            plan.prefetch.append((path, child_plan))
+            return
+        # Relação para um (ForeignKey, OneToOneField)
+        plan.add_only(path)
+        if last and uses_pk_only(field):
+            # Só a chave é lida, sem junção
+            return
+        plan.add_select(path)
+        current = related
+    if isinstance(field, BaseSerializer):
+        plan_serializer(plan, current, path, field)
+    else:
+        plan_related(plan, current, path, field)
+
+
+def uses_pk_only(field):
+    return isinstance(field, RelatedField) and field.use_pk_only_optimization()
+
+
+def plan_related(plan, model, prefix, field):
+    """Campos do objeto relacionado lidos por um campo de relação"""
+    if uses_pk_only(field):
+        return
+    if isinstance(field, SlugRelatedField):
+        plan.add_only(join(prefix, field.slug_field))
+        return
+    plan_str(plan, model, prefix)
+
+
+def plan_serializer(plan, model, prefix, serializer):
+    for field in serializer.fields.values():
+        plan_field(plan, model, prefix, field)
+
+
+@lru_cache(maxsize=None)
+def serializer_plan(serializer_class, model):
+    plan = QueryPlan(model)
+    plan_serializer(plan, model, '', serializer_class())
+    return plan
+
+
+def plan_queryset(queryset, serializer_class):
+    """
+    Aplica ao queryset o select_related, o prefetch_related e o only()
+    derivados dos campos do serializador e das dependências de __str__
+    (`str_parts`) dos modelos relacionados, para que a serialização de
+    qualquer quantidade de objetos não dispare consultas adicionais.
+    """
+    return serializer_plan(serializer_class, queryset.model).apply(queryset)
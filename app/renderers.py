@@ -0,0 +1,50 @@
+# Renderização JSON das respostas da API
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Compacto e em UTF-8, como o JSONRenderer do DRF; datas e datetimes
+    # saem em ISO 8601 sem passar pelo encoder (com 'Z' para UTC; o DRF
+    # corta os microssegundos em milissegundos, o orjson mantém os seis)
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer que usa o orjson quando instalado. Os tipos que o orjson
+    não conhece (Decimal, textos traduzíveis, QuerySet...) passam pelo
+    encoder do DRF; saída indentada (API navegável, `; indent=`), ASCII,
+    sem orjson ou que ele recusa (chaves não textuais, inteiros acima de
+    64 bits) fica com a implementação padrão.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Mesmo escape do DRF, para a saída ser um subconjunto de JavaScript.
+        # U+2028 e U+2029 começam pelo byte 0xE2, raro em português: buscar
+        # um byte é bem mais barato que buscar as duas sequências
+        if b'\xe2' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
@@ -0,0 +1,114 @@
+# Cache das respostas da API, invalidado pela versão dos dados
+from hashlib import blake2b
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+HIT, MISS = 'hit', 'miss'
+
+
+def stats_keys(outcome):
+    # Contadores por resultado: respostas e microssegundos acumulados
+    return f'api-response-stats:{outcome}', f'api-response-stats:{outcome}:us'
+
+
+STATS_KEYS = stats_keys(HIT) + stats_keys(MISS)
+
+
+def response_key(request, database, version):
+    """
+    Chave da resposta: banco, versão dos dados, URL absoluta (os links
+    next/previous incluem o host), parâmetros em ordem canônica e formato
+    """
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+    )
+    signature = blake2b(
+        repr(
+            (
+                request.build_absolute_uri(request.path),
+                params,
+                request.accepted_renderer.format,
+            )
+        ).encode(),
+        digest_size=16,
+    )
+    return f'api-response:{database}:{version}:{signature.hexdigest()}'
+
+
+def is_cacheable(request):
+    # A API navegável (HTML) depende do usuário e do token CSRF
+    return (
+        settings.API_RESPONSE_CACHE_TIMEOUT > 0
+        and request.method == 'GET'
+        and request.accepted_renderer.format == 'json'
+    )
+
+
+def record(response, outcome, started):
+    """Cabeçalhos de observação e contadores compartilhados no cache"""
+    elapsed = perf_counter() - started
+    response['X-Cache'] = outcome.upper()
+    response[
+        'Server-Timing'
+    ] = f'cache;desc="{outcome}";dur={elapsed * 1000:.2f}'
+    count_key, time_key = stats_keys(outcome)
+    for key, amount in ((count_key, 1), (time_key, round(elapsed * 1e6))):
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.add(key, amount, None)
+
+
+def cached_response(handler, request, database, version, *args, **kwargs):
+    """
+    Resposta de `handler` servida do cache enquanto a versão dos dados
+    (DatasetVersion, incrementada pelo import_data) não mudar. Só respostas
+    200 em JSON são guardadas, já renderizadas.
+    """
+    if not is_cacheable(request):
+        return handler(request, *args, **kwargs)
+    started = perf_counter()
+    key = response_key(request, database, version)
+    entry = cache.get(key)
+    if entry is not None:
+        content, content_type = entry
+        response = HttpResponse(content, content_type=content_type)
+        record(response, HIT, started)
+        return response
+
+    response = handler(request, *args, **kwargs)
+    if response.status_code != 200:
+        return response
+
+    def store(response):
+        cache.set(
+            key,
+            (response.rendered_content, response['Content-Type']),
+            settings.API_RESPONSE_CACHE_TIMEOUT,
+        )
+        record(response, MISS, started)
+
+    response.add_post_render_callback(store)
+    return response
+
+
+def cache_stats():
+    """
+    Acertos, falhas e latência média (ms) de cada um. Os contadores ficam
+    no próprio cache: com LocMemCache são de cada processo
+    """
+    values = cache.get_many(STATS_KEYS)
+    hits, hit_us, misses, miss_us = (values.get(key, 0) for key in STATS_KEYS)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+        'hit_ms': round(hit_us / hits / 1000, 3) if hits else None,
+        'miss_ms': round(miss_us / misses / 1000, 3) if misses else None,
+    }
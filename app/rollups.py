@@ -0,0 +1,275 @@
+# Agregações das respostas (SurveyRollup) mantidas de forma incremental
+import operator
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import reduce
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import (
+    ROLLUP_BUCKETS,
+    SCORE_FIELDS,
+    RollupState,
+    SurveyResponse,
+    SurveyRollup,
+    rollup_bucket_field,
+    rollup_sum_field,
+)
+
+# Chaves por consulta ao filtrar respostas por funcionário
+LOOKUP_CHUNK_SIZE = 500
+# Células por INSERT (~100 parâmetros cada, abaixo do limite de 65535 do
+# PostgreSQL)
+INSERT_BATCH_SIZE = 500
+
+# Célula da agregação: campo de SurveyRollup -> expressão sobre a resposta
+CELL = {
+    'empresa_id': F('employee__empresa_id'),
+    'area_id': F('employee__area_id'),
+    'cargo_id': F('employee__cargo_id'),
+    'funcao_id': F('employee__funcao_id'),
+    'estado': F('employee__estado'),
+    'mes': TruncMonth('data_da_resposta'),
+}
+COUNTER_FIELDS = ('respostas',) + tuple(
+    field
+    for metric in SCORE_FIELDS
+    for field in (
+        rollup_sum_field(metric),
+        *(rollup_bucket_field(metric, score) for score in ROLLUP_BUCKETS),
+    )
+)
+
+
+def bucket_filter(metric, score):
+    if score == ROLLUP_BUCKETS[0]:
+        return Q(**{f'{metric}__lte': score})
+    if score == ROLLUP_BUCKETS[-1]:
+        return Q(**{f'{metric}__gte': score})
+    return Q(**{metric: score})
+
+
+def response_aggregates():
+    """Contadores de uma célula calculados a partir das respostas"""
+    aggregates = {'respostas': Count('pk')}
+    for metric in SCORE_FIELDS:
+        aggregates[rollup_sum_field(metric)] = Sum(metric)
+        for score in ROLLUP_BUCKETS:
+            aggregates[rollup_bucket_field(metric, score)] = Count(
+                'pk', filter=bucket_filter(metric, score)
+            )
+    return aggregates
+
+
+def cell_counts(queryset):
+    """Contadores por célula das respostas do queryset: {célula: Counter}"""
+    rows = queryset.order_by().values(**CELL).annotate(**response_aggregates())
+    return {
+        tuple(row[field] for field in CELL): Counter(
+            {field: row[field] for field in COUNTER_FIELDS}
+        )
+        for row in rows
+    }
+
+
+def apply_deltas(database, deltas):
+    """
+    Soma os contadores de `deltas` ({célula: Counter}, com valores
+    negativos para respostas que saíram da célula) às linhas de
+    SurveyRollup. As linhas afetadas são regravadas; as que ficam sem
+    respostas são removidas.
+    """
+    if not deltas:
+        return
+    rollups = SurveyRollup.objects.using(database)
+    existing = {
+        tuple(row[field] for field in CELL): row
+        for row in rollups.filter(
+            mes__in={cell[-1] for cell in deltas}
+        ).values('pk', *CELL, *COUNTER_FIELDS)
+    }
+    replaced, cells = [], []
+    for cell, delta in deltas.items():
+        counters = Counter(delta)
+        row = existing.get(cell)
+        if row is not None:
+            replaced.append(row['pk'])
+            counters.update({field: row[field] for field in COUNTER_FIELDS})
+        if counters['respostas']:
+            cells.append(
+                cell + tuple(counters[field] for field in COUNTER_FIELDS)
+            )
+    rollups.filter(pk__in=replaced).delete()
+    insert_cells(database, cells)
+
+
+def insert_cells(database, cells):
+    """
+    INSERT das tuplas (célula, contadores) em lotes de várias linhas, sem
+    o bulk_create: os valores já são inteiros, textos e datas, e ele
+    prepararia um a um os ~100 campos de cada linha
+    """
+    connection = connections[database]
+    quote = connection.ops.quote_name
+    fields = [
+        SurveyRollup._meta.get_field(name) for name in (*CELL, *COUNTER_FIELDS)
+    ]
+    columns = ', '.join(quote(field.column) for field in fields)
+    row = f"({', '.join(['%s'] * len(fields))})"
+    batch_size = min(
+        INSERT_BATCH_SIZE, connection.ops.bulk_batch_size(fields, cells)
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(cells), batch_size):
+            batch = cells[start : start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {quote(SurveyRollup._meta.db_table)} '
+                f"({columns}) VALUES {', '.join([row] * len(batch))}",
+                [value for cell in batch for value in cell],
+            )
+
+
+def last_folded(database):
+    return (
+        RollupState.objects.using(database)
+        .filter(pk=1)
+        .values_list('last_response_id', flat=True)
+        .first()
+    )
+
+
+def month_range(month):
+    following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return Q(data_da_resposta__gte=month, data_da_resposta__lt=following)
+
+
+def insert_aggregated(database, queryset):
+    """
+    INSERT ... SELECT das células agregadas a partir das respostas do
+    queryset, sem trazer as linhas para o Python
+    """
+    query = (
+        queryset.order_by()
+        .values(**CELL)
+        .annotate(**response_aggregates())
+        .query
+    )
+    sql, params = query.get_compiler(using=database).as_sql()
+    connection = connections[database]
+    quote = connection.ops.quote_name
+    # Colunas na ordem do SELECT gerado
+    columns = ', '.join(
+        quote(SurveyRollup._meta.get_field(name).column)
+        for name in (*query.values_select, *query.annotation_select)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(SurveyRollup._meta.db_table)} '
+            f'({columns}) {sql}',
+            params,
+        )
+
+
+def refresh_rollups(database='default'):
+    """
+    Soma às agregações as respostas inseridas desde a última chamada (id
+    acima de RollupState.last_response_id) e retorna quantas foram. Só as
+    respostas novas são lidas: meses ainda sem agregação (o caso de uma
+    nova rodada da pesquisa) recebem as células por INSERT ... SELECT e,
+    nos que já tinham células, os contadores novos são somados a elas.
+    """
+    with transaction.atomic(using=database):
+        state, _ = (
+            RollupState.objects.using(database)
+            .select_for_update()
+            .get_or_create(pk=1)
+        )
+        start = state.last_response_id or 0
+        responses = SurveyResponse.objects.using(database)
+        end = responses.aggregate(last=Max('pk'))['last']
+        if end is None or end <= start:
+            return 0
+        pending = responses.filter(pk__gt=start, pk__lte=end)
+        months = list(pending.dates('data_da_resposta', 'month'))
+        merged = set(
+            SurveyRollup.objects.using(database)
+            .filter(mes__in=months)
+            .values_list('mes', flat=True)
+            .distinct()
+        )
+        if merged:
+            late = reduce(operator.or_, map(month_range, merged))
+            apply_deltas(database, cell_counts(pending.filter(late)))
+            if len(merged) < len(months):
+                insert_aggregated(database, pending.exclude(late))
+        else:
+            insert_aggregated(database, pending)
+        state.last_response_id = end
+        state.save(using=database)
+        return pending.count()
+
+
+def rebuild_rollups(database='default'):
+    """Recalcula todas as agregações a partir das respostas"""
+    with transaction.atomic(using=database):
+        SurveyRollup.objects.using(database).all().delete()
+        RollupState.objects.using(database).update_or_create(
+            pk=1, defaults={'last_response_id': None}
+        )
+        return refresh_rollups(database)
+
+
+@contextmanager
+def tracking_updates(database, employee_ids):
+    """
+    Para atualizações de funcionários e respostas já agregadas: compara
+    os contadores das respostas desses funcionários antes e depois do
+    bloco e aplica a diferença. Deve rodar na transação que atualiza.
+    """
+    last = last_folded(database) if employee_ids else None
+    if last is None:
+        # Nada agregado ainda: refresh_rollups somará tudo
+        yield
+        return
+    employee_ids = sorted(employee_ids)
+    querysets = [
+        SurveyResponse.objects.using(database).filter(
+            employee_id__in=employee_ids[start : start + LOOKUP_CHUNK_SIZE],
+            pk__lte=last,
+        )
+        for start in range(0, len(employee_ids), LOOKUP_CHUNK_SIZE)
+    ]
+    before = [cell_counts(queryset) for queryset in querysets]
+    yield
+    deltas = {}
+    for old, queryset in zip(before, querysets):
+        for sign, counts in ((-1, old), (1, cell_counts(queryset))):
+            for cell, counters in counts.items():
+                delta = deltas.setdefault(cell, Counter())
+                for field, value in counters.items():
+                    delta[field] += sign * value
+    apply_deltas(
+        database,
+        {cell: delta for cell, delta in deltas.items() if any(delta.values())},
+    )
+
+
+def rollups_current(database='default'):
+    """As agregações já incluem todas as respostas do banco?"""
+    state = (
+        RollupState.objects.using(database)
+        .filter(pk=1)
+        .annotate(
+            last=Subquery(
+                SurveyResponse.objects.using(database)
+                .order_by('-pk')
+                .values('pk')[:1]
+            )
+        )
+        .values_list('last_response_id', 'last')
+        .first()
+    )
+    return state is not None and state[0] == state[1]
@@ -1,4 +1,6 @@
 # Serializadores para a API REST
+from functools import lru_cache
+
 from rest_framework import serializers
 
 from .models import (
@@ -140,3 +142,70 @@ class SerializadorRespostaPesquisa(serializers.ModelSerializer):
             'enps',
             'aberta_enps',
         ]
+
+
+def readable_fields(serializer_class):
+    return [
+        name
+        for name, field in serializer_class().fields.items()
+        if not field.write_only
+    ]
+
+
+def select_fields(serializer_class, fields=None, omit=None):
+    """
+    Campos pedidos em `?fields=` menos os de `?omit=` (listas separadas por
+    vírgula), na ordem do serializador. Devolve None quando nenhum dos dois
+    parâmetros foi usado e levanta ValidationError para nomes desconhecidos,
+    para `?fields=` sem nomes e para uma seleção que não sobra nenhum campo.
+    """
+    if fields is None and not omit:
+        return None
+    available = readable_fields(serializer_class)
+    selected = available
+    for param, value in (('fields', fields), ('omit', omit)):
+        if value is None:
+            continue
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        if not names and param == 'fields':
+            raise serializers.ValidationError(
+                {param: 'Informe ao menos um campo.'}
+            )
+        unknown = sorted(names - set(available))
+        if unknown:
+            raise serializers.ValidationError(
+                {
+                    param: f'Campos desconhecidos: {", ".join(unknown)}. '
+                    f'Disponíveis: {", ".join(available)}.'
+                }
+            )
+        if param == 'fields':
+            selected = [name for name in selected if name in names]
+        else:
+            selected = [name for name in selected if name not in names]
+        if not selected:
+            raise serializers.ValidationError(
+                {param: 'A seleção não deixa nenhum campo.'}
+            )
+    return tuple(selected)
+
+
+@lru_cache(maxsize=None)
+def sparse_serializer(serializer_class, names):
+    """
+    Subclasse do serializador restrita aos campos `names`. A classe é
+    reaproveitada para a mesma combinação, então o plano de consulta
+    (app.query_plan) e o de values() (app.values_serialization) também: só
+    as colunas e junções dos campos pedidos chegam ao SQL.
+    """
+
+    def get_fields(self):
+        fields = super(sparse, self).get_fields()
+        return {name: fields[name] for name in fields if name in names}
+
+    sparse = type(
+        serializer_class.__name__,
+        (serializer_class,),
+        {'get_fields': get_fields, '__module__': serializer_class.__module__},
+    )
+    return sparse
@@ -0,0 +1,386 @@
+# Cópia colunar em memória das respostas para indicadores sem consultas
+import threading
+from datetime import date
+
+from . import bitmaps
+from .analytics import (
+    DATE_BUCKETS,
+    DIMENSIONS,
+    METRICS,
+    THRESHOLDS,
+    parse_filters,
+    parse_group_by,
+    summarize,
+)
+from .models import ROLLUP_BUCKETS, DatasetVersion, SurveyResponse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Dias de date.toordinal() até 1970-01-01, a origem do datetime64
+EPOCH = date(1970, 1, 1).toordinal()
+# Meses de cada período agrupado a partir do mês da resposta
+MONTHS_PER_BUCKET = {'mes': 1, 'trimestre': 3, 'ano': 12}
+# Maior número de grupos contados por bincount direto sobre a chave
+# mista; acima disso a chave é compactada com np.unique
+DENSE_GROUPS = 1 << 22
+
+
+NUMPY_MISSING = (
+    'Os indicadores em memória exigem o pacote numpy (pip install numpy)'
+)
+
+
+def load_numpy():
+    if np is None:
+        raise ValueError(NUMPY_MISSING)
+    return np
+
+
+def factorize(values):
+    """Códigos int32 e valores distintos em ordem crescente"""
+    uniques, codes = np.unique(np.asarray(values), return_inverse=True)
+    return codes.astype(np.int32), uniques
+
+
+def label_source(path):
+    """Modelo e campo do caminho do nome de uma dimensão"""
+    *relations, field = path.split('__')
+    model = SurveyResponse
+    for name in relations:
+        model = model._meta.get_field(name).related_model
+    return model, field
+
+
+def week_starts(ordinals):
+    # date(1, 1, 1).toordinal() == 1 é uma segunda-feira
+    return ordinals - (ordinals - 1) % 7
+
+
+def month_starts(ordinals, months):
+    """Ordinal do primeiro dia do período de `months` meses (desde janeiro)"""
+    index = (ordinals - EPOCH).astype('datetime64[D]').astype('datetime64[M]')
+    index = index.astype(np.int64)
+    index -= index % months
+    return (
+        index.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+        + EPOCH
+    )
+
+
+class ScoreSnapshot:
+    """
+    Respostas de um banco em arrays NumPy: notas em int8, dimensões em
+    códigos int32 (valores distintos em ordem crescente) e datas em
+    ordinais, com as linhas em ordem de data. O período é uma fatia e os
+    filtros, operações entre bitmaps; sem agrupamento os indicadores saem
+    de contagens de bits e, com ele, de bincount sobre a chave dos grupos,
+    com o mesmo resultado de survey_analytics.
+    Imutável: uma nova versão dos dados gera outra cópia.
+    """
+
+    def __init__(self, database='default', version=None):
+        load_numpy()
+        self.database = database
+        self.version = (
+            DatasetVersion.current(database) if version is None else version
+        )
+        paths = [key for key, _ in DIMENSIONS.values()]
+        rows = list(
+            SurveyResponse.objects.using(database)
+            .order_by('data_da_resposta')
+            .values_list(*paths, 'data_da_resposta', *METRICS)
+        )
+        columns = list(zip(*rows)) or [()] * (len(paths) + 1 + len(METRICS))
+        self.size = len(rows)
+        del rows
+        self.dimensions = {}
+        for name, values in zip(DIMENSIONS, columns):
+            self.dimensions[name] = factorize(values)
+        self.labels = {}
+        for name, (_, label) in DIMENSIONS.items():
+            if label is not None:
+                model, field = label_source(label)
+                self.labels[name] = dict(
+                    model.objects.using(database).values_list('pk', field)
+                )
+        self.ordinals = np.fromiter(
+            (day.toordinal() for day in columns[len(paths)]),
+            dtype=np.int32,
+            count=self.size,
+        )
+        # Notas e faixas do histograma (0 a 10, as pontas acumulam as notas
+        # fora da escala, como nas agregações). A soma sai do histograma
+        # quando todas as notas da métrica estão na escala.
+        self.scores, self.buckets, self.in_scale = {}, {}, set()
+        last = len(ROLLUP_BUCKETS) - 1
+        for metric, values in zip(METRICS, columns[len(paths) + 1 :]):
+            scores = np.asarray(values, dtype=np.int64)
+            low, high = (scores.min(), scores.max()) if scores.size else (0, 0)
+            small = -128 <= low and high <= 127
+            self.scores[metric] = scores.astype(np.int8 if small else np.int32)
+            self.buckets[metric] = np.clip(scores, 0, last).astype(np.int8)
+            if 0 <= low and high <= last:
+                self.in_scale.add(metric)
+        self.periods = {}
+        # Índice de bitmaps, montado no primeiro uso: um bitmap por
+        # (dimensão, código) filtrado e, por métrica, os de notas
+        # favoráveis e desfavoráveis e as fatias de bits das notas
+        self.value_bitmaps, self.score_bitmaps = {}, {}
+        self.lock = threading.Lock()
+
+    def period_codes(self, name):
+        """Códigos e inícios (ordinais) do período da data, calculados uma vez"""
+        with self.lock:
+            if name not in self.periods:
+                ordinals = self.ordinals.astype(np.int64)
+                if name == 'semana':
+                    ordinals = week_starts(ordinals)
+                elif name in MONTHS_PER_BUCKET:
+                    ordinals = month_starts(ordinals, MONTHS_PER_BUCKET[name])
+                self.periods[name] = factorize(ordinals)
+            return self.periods[name]
+
+    def group_codes(self, name):
+        if name in DATE_BUCKETS:
+            return self.period_codes(name)
+        return self.dimensions[name]
+
+    def group_value(self, name, uniques, code):
+        value = uniques[code].item()
+        if name in DATE_BUCKETS:
+            return date.fromordinal(value)
+        return value
+
+    def window(self, period):
+        """Fatia das linhas do período (as linhas estão em ordem de data)"""
+        start, end = period
+        low, high = 0, self.size
+        if start is not None:
+            low = int(np.searchsorted(self.ordinals, start.toordinal()))
+        if end is not None:
+            high = int(
+                np.searchsorted(self.ordinals, end.toordinal(), side='right')
+            )
+        return slice(low, max(low, high))
+
+    def value_code(self, name, value):
+        """Código do valor na dimensão, ou None se nenhuma linha o tem"""
+        _, uniques = self.dimensions[name]
+        code = int(np.searchsorted(uniques, value))
+        if code < len(uniques) and uniques[code] == value:
+            return code
+        return None
+
+    def value_bitmap(self, name, code):
+        """Bitmap das linhas com o código na dimensão, montado uma vez"""
+        with self.lock:
+            key = (name, code)
+            if key not in self.value_bitmaps:
+                codes, _ = self.dimensions[name]
+                self.value_bitmaps[key] = bitmaps.pack(codes == code)
+            return self.value_bitmaps[key]
+
+    def score_index(self, metric):
+        """Bitmaps de favoráveis e desfavoráveis e fatias de bits da nota"""
+        with self.lock:
+            if metric not in self.score_bitmaps:
+                scores = self.scores[metric]
+                favorable, unfavorable = THRESHOLDS[metric]
+                self.score_bitmaps[metric] = (
+                    bitmaps.pack(scores >= favorable),
+                    bitmaps.pack(scores <= unfavorable),
+                    *bitmaps.bit_slices(scores),
+                )
+            return self.score_bitmaps[metric]
+
+    def bitmap(self, filters, period):
+        """
+        Bitmap das linhas dentro do período e dos filtros ({dimensão:
+        [valores]}): união dos bitmaps dos valores de cada dimensão e
+        interseção entre dimensões. Combina com outros por &, | e
+        bitmaps.invert.
+        """
+        window = self.window(period)
+        selected = bitmaps.span(self.size, window.start, window.stop)
+        for name, values in filters.items():
+            union = np.zeros_like(selected)
+            for value in set(values):
+                code = self.value_code(name, value)
+                if code is not None:
+                    union |= self.value_bitmap(name, code)
+            selected &= union
+        return selected
+
+    def bitmap_counts(self, bitmap):
+        """
+        Contadores (formato de grouped_counts, sem grupo) das linhas do
+        bitmap, só com contagens de bits
+        """
+        total = bitmaps.count(bitmap)
+        row = {'total': total}
+        for metric in METRICS:
+            favorable, unfavorable, low, slices = self.score_index(metric)
+            row[f'{metric}__sum'] = bitmaps.sliced_sum(
+                bitmap, total, low, slices
+            )
+            row[f'{metric}__fav'] = bitmaps.count(bitmap & favorable)
+            row[f'{metric}__unf'] = bitmaps.count(bitmap & unfavorable)
+        return row
+
+    def summary(self, bitmap):
+        """Indicadores das linhas do bitmap (None se ele está vazio)"""
+        row = self.bitmap_counts(bitmap)
+        return summarize(row, []) if row['total'] else None
+
+    def selection(self, filters, period):
+        """
+        Linhas dentro do período e dos filtros: a fatia do período ou, com
+        filtros por dimensão, as posições do bitmap deles
+        """
+        if not filters:
+            return self.window(period)
+        return bitmaps.positions(self.bitmap(filters, period), self.size)
+
+    def group_keys(self, group_by, rows, size):
+        """
+        Índice do grupo de cada linha selecionada, em ordem crescente dos
+        códigos dos agrupamentos, número de grupos e a função que traduz
+        índices de grupo nos códigos de cada agrupamento
+        """
+        columns = [
+            (codes[rows], len(uniques))
+            for codes, uniques in map(self.group_codes, group_by)
+        ]
+        key = np.zeros(size, dtype=np.int64)
+        groups, compacted = 1, False
+        for codes, length in columns:
+            key *= length
+            key += codes
+            groups *= length
+            if groups > DENSE_GROUPS:
+                # Só os grupos presentes, mantendo a ordem
+                distinct, key = np.unique(key, return_inverse=True)
+                groups, compacted = len(distinct), True
+        if compacted:
+            # Uma linha de cada grupo (a primeira) dá os seus códigos
+            first = np.empty(groups, dtype=np.int64)
+            first[key[::-1]] = np.arange(size - 1, -1, -1)
+
+            def decode(index):
+                return [codes[first[index]] for codes, _ in columns]
+
+        else:
+            shape = [length for _, length in columns]
+
+            def decode(index):
+                return np.unravel_index(index, shape)
+
+        return key, groups, decode
+
+    def counts(self, group_by, filters, period):
+        """Linhas de contagens no formato de grouped_counts"""
+        if not group_by:
+            row = self.bitmap_counts(self.bitmap(filters, period))
+            return [row] if row['total'] else []
+        rows = self.selection(filters, period)
+        size = rows.stop - rows.start if isinstance(rows, slice) else len(rows)
+        key, groups, decode = self.group_keys(group_by, rows, size)
+        width = len(ROLLUP_BUCKETS)
+        offsets = key * width
+        histograms = {
+            # Histograma 0 a 10 de cada grupo em um bincount
+            metric: np.bincount(
+                offsets + self.buckets[metric][rows], minlength=groups * width
+            ).reshape(-1, width)
+            for metric in METRICS
+        }
+        total = histograms[METRICS[0]].sum(axis=1)
+        present = np.flatnonzero(total)
+        columns = {'total': total[present]}
+        for metric, (favorable, unfavorable) in THRESHOLDS.items():
+            histogram = histograms[metric][present]
+            if metric in self.in_scale:
+                columns[f'{metric}__sum'] = histogram @ np.arange(width)
+            else:
+                columns[f'{metric}__sum'] = (
+                    np.bincount(
+                        key,
+                        weights=self.scores[metric][rows],
+                        minlength=groups,
+                    )[present]
+                    .round()
+                    .astype(np.int64)
+                )
+            columns[f'{metric}__fav'] = histogram[:, favorable:].sum(axis=1)
+            columns[f'{metric}__unf'] = histogram[:, : unfavorable + 1].sum(
+                axis=1
+            )
+        rows = [{} for _ in present]
+        for alias, values in columns.items():
+            for row, value in zip(rows, values.tolist()):
+                row[alias] = value
+        for name, group in zip(group_by, decode(present)):
+            _, uniques = self.group_codes(name)
+            labels = self.labels.get(name)
+            for row, code in zip(rows, group.tolist()):
+                value = self.group_value(name, uniques, code)
+                row[f'g_{name}'] = value
+                if labels is not None:
+                    row[f'g_{name}_nome'] = labels.get(value)
+        return rows
+
+    def analytics(self, params):
+        """Mesma saída de survey_analytics para a query string"""
+        group_by = parse_group_by(params.get('group_by'))
+        filters, period = parse_filters(params)
+        return self.indicators(group_by, filters, period)
+
+    def indicators(self, group_by, filters, period):
+        """Indicadores de parâmetros já validados (parse_group_by/filters)"""
+        return [
+            summarize(row, group_by)
+            for row in self.counts(group_by, filters, period)
+        ]
+
+
+# Cópia atual de cada banco, neste processo
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(database='default', version=None):
+    """
+    Cópia em memória das respostas do banco, refeita quando a versão dos
+    dados (DatasetVersion) muda. Só um thread monta a cópia nova; os
+    demais esperam por ela.
+    """
+    if version is None:
+        version = DatasetVersion.current(database)
+    snapshot = _snapshots.get(database)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _snapshots_lock:
+        snapshot = _snapshots.get(database)
+        if snapshot is None or snapshot.version != version:
+            # Libera a cópia anterior antes de montar a nova
+            _snapshots.pop(database, None)
+            snapshot = _snapshots[database] = ScoreSnapshot(database, version)
+        return snapshot
+
+
+def clear_snapshots():
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+def snapshot_analytics(params, database='default', version=None):
+    """survey_analytics calculado na cópia em memória do banco"""
+    # Parâmetros inválidos falham antes de montar a cópia
+    group_by = parse_group_by(params.get('group_by'))
+    filters, period = parse_filters(params)
+    return get_snapshot(database, version).indicators(
+        group_by, filters, period
+    )
@@ -1,20 +1,67 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections
+from django.db.models import F, Max, Q
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
+from .analytics import survey_analytics
+from .counting import approximate_count
+from .importer.engines import BulkEngine, OrmEngine
+from .importer.parallel import ParallelReader, split_chunks
+from .importer.parsing import parse_row, row_hashes
+from .importer.readers import CsvReader
+from .importer.shadow import OLD_SCHEMA, SHADOW_SCHEMA
+from .importer.synthetic import HEADER, SurveyGenerator
+from .importer.validation import Validator
 from .models import (
+    SCORE_FIELDS,
     Area,
     Coordenadoria,
+    DatasetVersion,
     Diretoria,
     Employee,
     EmployeeLevel,
     EmployeeType,
     Empresa,
     Gerencia,
+    ImportCheckpoint,
+    ImportedRowHash,
     Person,
     SurveyResponse,
+    SurveyRollup,
+)
+from .query_plan import plan_queryset
+from .renderers import FastJSONRenderer
+from .rollups import (
+    CELL,
+    COUNTER_FIELDS,
+    cell_counts,
+    refresh_rollups,
+    rollups_current,
 )
 from .serializers import (
     SerializadorArea,
@@ -28,11 +75,25 @@ from .serializers import (
     SerializadorRespostaPesquisa,
     SerializadorTipoFuncionario,
 )
+from . import bitmaps, snapshot
+from .snapshot import clear_snapshots, get_snapshot, snapshot_analytics
+from .values_serialization import display_expression, values_plan
+from .views import (
+    FuncionarioViewSet,
+    PessoaViewSet,
+    RespostaPesquisaViewSet,
+)
 
 
 class BaseTestCase(TestCase):
     """Base test case with test data fixtures"""
 
+    def setUp(self):
+        super().setUp()
+        # API counts are cached per dataset version, which only imports bump
+        cache.clear()
+        clear_snapshots()
+
     @classmethod
     def setUpTestData(cls):
         # Create hierarchical company structure
@@ -340,6 +401,1096 @@ class PaginationAndOrderingTestCase(APITestCase, BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+# Measures the queries themselves, so responses are not cached
+@override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+class QueryPlanTestCase(APITestCase, BaseTestCase):
+    """Query counts of the API do not depend on the number of objects"""
+
+    # Dataset version, count and the page
+    LIST_QUERIES = 3
+    LIST_URLS = (
+        '/api/empresas/',
+        '/api/diretorias/',
+        '/api/gerencias/',
+        '/api/coordenadorias/',
+        '/api/areas/',
+        '/api/pessoas/',
+        '/api/niveis-funcionario/',
+        '/api/tipos-funcionario/',
+        '/api/funcionarios/',
+        '/api/respostas-pesquisa/',
+    )
+
+    def add_employees(self, count):
+        for i in range(count):
+            person = Person.objects.create(
+                nome=f'Pessoa {i}',
+                email=f'pessoa{i}@email.com',
+                genero='F',
+                geracao='Geração X',
+            )
+            diretoria = Diretoria.objects.create(
+                empresa=self.empresa2, nome=f'Diretoria {i}'
+            )
+            gerencia = Gerencia.objects.create(
+                nome=f'Gerência {i}',
+                empresa=self.empresa2,
+                diretoria=diretoria,
+            )
+            coordenadoria = Coordenadoria.objects.create(
+                nome=f'Coordenadoria {i}',
+                empresa=self.empresa2,
+                gerencia=gerencia,
+            )
+            area = Area.objects.create(
+                nome=f'Área {i}',
+                empresa=self.empresa2,
+                cordenadoria=coordenadoria,
+            )
+            employee = Employee.objects.create(
+                pessoa=person,
+                empresa=self.empresa2,
+                email_corporativo=f'pessoa{i}@empresa.com',
+                funcao=EmployeeLevel.objects.create(funcao=f'Função {i}'),
+                cargo=EmployeeType.objects.create(cargo=f'Cargo {i}'),
+                area=area,
+                estado='MG',
+                tempo_de_empresa='1 ano',
+            )
+            SurveyResponse.objects.create(
+                employee=employee,
+                data_da_resposta='2023-02-01',
+                interesse_no_cargo=5,
+                contribuicao=5,
+                aprendizado_e_desenvolvimento=5,
+                feedback=5,
+                interacao_com_gestor=5,
+                clareza_sobre_possibilidades_de_carreira=5,
+                expectativa_de_permanencia=5,
+                enps=7,
+            )
+
+    def test_list_queries_are_constant(self):
+        # A full page (10 items) costs the same as two items
+        for add in (0, 12):
+            self.add_employees(add)
+            DatasetVersion.bump()
+            for url in self.LIST_URLS:
+                with self.subTest(url=url, added=add):
+                    with self.assertNumQueries(self.LIST_QUERIES):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_ordered_by_related_field(self):
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(
+                '/api/funcionarios/', {'ordering': '-pessoa__nome'}
+            )
+        self.assertEqual(
+            response.data['results'][0]['pessoa']['nome'], 'Maria Santos'
+        )
+
+    def test_retrieve_runs_one_object_query(self):
+        for url in (
+            f'/api/areas/{self.area1.pk}/',
+            f'/api/funcionarios/{self.employee1.pk}/',
+            f'/api/respostas-pesquisa/{self.survey1.pk}/',
+        ):
+            with self.subTest(url=url):
+                # Dataset version (validators) and the object
+                with self.assertNumQueries(2):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_output_unchanged(self):
+        response = self.client.get(f'/api/funcionarios/{self.employee1.pk}/')
+        self.assertEqual(
+            response.data,
+            SerializadorFuncionario(
+                Employee.objects.get(pk=self.employee1.pk)
+            ).data,
+        )
+        response = self.client.get(f'/api/areas/{self.area1.pk}/')
+        self.assertEqual(
+            response.data['cordenadoria'],
+            'Coordenadoria Fiscal - Empresa A',
+        )
+
+    def test_many_relations_are_prefetched(self):
+        class SerializadorEmpresaDiretorias(SerializadorEmpresa):
+            diretorias = SerializadorDiretoria(
+                many=True, source='diretoria_set'
+            )
+
+            class Meta(SerializadorEmpresa.Meta):
+                fields = ['nome', 'diretorias']
+
+        queryset = plan_queryset(
+            Empresa.objects.all(), SerializadorEmpresaDiretorias
+        )
+        with self.assertNumQueries(2):
+            data = SerializadorEmpresaDiretorias(queryset, many=True).data
+        self.assertEqual(
+            [diretoria['nome'] for diretoria in data[0]['diretorias']],
+            ['Diretoria Financeira', 'Diretoria Operacional'],
+        )
+
+
+class ValuesSerializationTestCase(APITestCase, BaseTestCase):
+    """The values() fast path renders exactly what the serializers do"""
+
+    URLS = {
+        PessoaViewSet: 'pessoas',
+        FuncionarioViewSet: 'funcionarios',
+        RespostaPesquisaViewSet: 'respostas-pesquisa',
+    }
+
+    def test_responses_are_byte_identical(self):
+        for viewset, prefix in self.URLS.items():
+            self.assertTrue(viewset.values_serialization)
+            pk = viewset.queryset.first().pk
+            for url in (
+                f'/api/{prefix}/',
+                f'/api/{prefix}/?ordering=-pk',
+                f'/api/{prefix}/?cursor=',
+                f'/api/{prefix}/{pk}/',
+            ):
+                with self.subTest(url=url):
+                    fast = self.client.get(url)
+                    cache.clear()
+                    with mock.patch.object(
+                        viewset, 'values_serialization', False
+                    ):
+                        classic = self.client.get(url)
+                    self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                    self.assertEqual(fast.content, classic.content)
+
+    def test_display_expression_matches_str(self):
+        for model in (
+            Empresa,
+            Diretoria,
+            Gerencia,
+            Coordenadoria,
+            Area,
+            Person,
+            EmployeeLevel,
+            EmployeeType,
+            Employee,
+            SurveyResponse,
+        ):
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.annotate(
+                    display=display_expression(model)
+                )
+                for instance in queryset:
+                    self.assertEqual(instance.display, str(instance))
+
+    def test_unsupported_serializer_falls_back(self):
+        class SerializadorComMetodo(SerializadorEmpresa):
+            total = serializers.SerializerMethodField()
+
+            class Meta(SerializadorEmpresa.Meta):
+                fields = ['nome', 'total']
+
+            def get_total(self, obj):
+                return 1
+
+        self.assertIsNone(values_plan(SerializadorComMetodo, Empresa))
+        self.assertIsNotNone(values_plan(SerializadorEmpresa, Empresa))
+
+
+class ExportTestCase(APITestCase, BaseTestCase):
+    """Test cases for the streaming export action"""
+
+    def export(self, url, **extra):
+        response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_matches_serializer(self):
+        response, body = self.export('/api/funcionarios/export/')
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        self.assertEqual(
+            [json.loads(line) for line in body.splitlines()],
+            SerializadorFuncionario(Employee.objects.all(), many=True).data,
+        )
+
+    def test_csv_with_ordering(self):
+        response, body = self.export(
+            '/api/respostas-pesquisa/export/?format=csv&ordering=data_da_resposta'
+        )
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(body), delimiter=';'))
+        self.assertEqual(
+            [row['data_da_resposta'] for row in rows],
+            ['2023-01-15', '2023-01-20'],
+        )
+        self.assertEqual(rows[0]['enps'], '8')
+        # The skipped 'funcionario' field is not a column
+        self.assertNotIn('funcionario', rows[0])
+
+    def test_csv_flattens_nested_objects(self):
+        _, body = self.export(
+            '/api/funcionarios/export/', HTTP_ACCEPT='text/csv'
+        )
+        header = body.splitlines()[0].split(';')
+        self.assertEqual(
+            header[:4],
+            ['pessoa.nome', 'pessoa.email', 'pessoa.genero', 'pessoa.geracao'],
+        )
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_serializer_fallback_matches(self):
+        _, fast = self.export('/api/areas/export/?format=csv')
+        with mock.patch('app.export.values_plan', return_value=None):
+            _, classic = self.export('/api/areas/export/?format=csv')
+        self.assertEqual(fast, classic)
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/areas/export/?format=xml')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ColumnarExportTestCase(APITestCase, BaseTestCase):
+    """Test cases for the Parquet/Arrow export endpoint and command"""
+
+    def read_table(self, data, format):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise unittest.SkipTest('pyarrow is not installed')
+        source = pyarrow.BufferReader(data)
+        if format == 'parquet':
+            return pyarrow.parquet.read_table(source)
+        return pyarrow.ipc.open_stream(source).read_all()
+
+    def export(self, url):
+        response = self.client.get(url)
+        if response.status_code == status.HTTP_501_NOT_IMPLEMENTED:
+            raise unittest.SkipTest('pyarrow is not installed')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_parquet_joins_hierarchy(self):
+        response, data = self.export('/api/respostas-pesquisa/columnar/')
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.apache.parquet'
+        )
+        self.assertIn(
+            'respostas_pesquisa.parquet', response['Content-Disposition']
+        )
+        table = self.read_table(data, 'parquet')
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(str(table.schema.field('enps').type), 'int8')
+        self.assertEqual(
+            str(table.schema.field('data_da_resposta').type), 'date32[day]'
+        )
+        # Default ordering (-data_da_resposta): survey2 first
+        first = table.slice(0, 1).to_pylist()[0]
+        self.assertEqual(first['id'], self.survey2.pk)
+        self.assertEqual(first['funcionario_id'], self.employee2.pk)
+        self.assertEqual(first['empresa'], self.empresa1.nome)
+        self.assertEqual(
+            [first[level] for level in ('diretoria', 'gerencia', 'area')],
+            [self.diretoria2.nome, self.gerencia2.nome, self.area2.nome],
+        )
+        self.assertEqual(first['coordenadoria'], self.coordenadoria2.nome)
+        self.assertEqual(first['interesse_no_cargo'], 9)
+
+    def test_arrow_stream_with_ordering(self):
+        response, data = self.export(
+            '/api/respostas-pesquisa/columnar/?format=arrow&ordering=data_da_resposta'
+        )
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.apache.arrow.stream'
+        )
+        table = self.read_table(data, 'arrow')
+        self.assertEqual(
+            table.column('id').to_pylist(),
+            [self.survey1.pk, self.survey2.pk],
+        )
+        self.assertEqual(
+            table.column('nome').to_pylist(),
+            [self.person1.nome, self.person2.nome],
+        )
+
+    def test_command_writes_row_groups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'respostas.parquet')
+            try:
+                call_command(
+                    'export_columnar',
+                    output=output,
+                    row_group_size=1,
+                    stdout=StringIO(),
+                )
+            except CommandError:
+                raise unittest.SkipTest('pyarrow is not installed')
+            import pyarrow.parquet
+
+            parquet = pyarrow.parquet.ParquetFile(output)
+            self.assertEqual(parquet.metadata.num_rows, 2)
+            self.assertEqual(parquet.num_row_groups, 2)
+
+    def test_without_pyarrow(self):
+        error = ValueError('pyarrow')
+        with mock.patch('app.columnar.load_pyarrow', side_effect=error):
+            response = self.client.get('/api/respostas-pesquisa/columnar/')
+            self.assertEqual(
+                response.status_code, status.HTTP_501_NOT_IMPLEMENTED
+            )
+            with self.assertRaises(CommandError):
+                call_command('export_columnar', output=os.devnull)
+
+
+class FastJSONRendererTestCase(APITestCase, BaseTestCase):
+    """Test cases for the orjson-backed JSON renderer"""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        expected = JSONRenderer().render(data, accepted_media_type)
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type), expected
+        )
+        with mock.patch('app.renderers.orjson', None):
+            self.assertEqual(
+                FastJSONRenderer().render(data, accepted_media_type), expected
+            )
+
+    def test_matches_drf_renderer(self):
+        self.assertSameOutput(
+            SerializadorFuncionario(Employee.objects.all(), many=True).data
+        )
+        self.assertSameOutput(
+            SerializadorRespostaPesquisa(
+                SurveyResponse.objects.all(), many=True
+            ).data
+        )
+        self.assertSameOutput(
+            {'texto': 'ação\u2028fim\u2029 – ok', 'nada': None, 1: [1.5]}
+        )
+        self.assertSameOutput({'results': []}, 'application/json; indent=4')
+
+    def test_native_and_encoder_types(self):
+        data = {
+            'data_da_resposta': date(2023, 1, 15),
+            'pessoa': {'nome': 'João', 'nota': Decimal('7.5')},
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            '{"data_da_resposta":"2023-01-15",'
+            '"pessoa":{"nome":"João","nota":7.5}}'.encode(),
+        )
+        self.assertSameOutput(data)
+
+    def test_api_uses_renderer(self):
+        response = self.client.get('/api/funcionarios/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.json()['count'], 2)
+
+
+class SparseFieldsTestCase(APITestCase, BaseTestCase):
+    """Test cases for the fields/omit query parameters"""
+
+    def get_with_queries(self, url):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, queries[-1]['sql']
+
+    def test_fields_narrow_output_and_sql(self):
+        response, sql = self.get_with_queries(
+            '/api/respostas-pesquisa/?fields=data_da_resposta,enps'
+        )
+        self.assertEqual(
+            response.data['results'][0],
+            {'data_da_resposta': '2023-01-20', 'enps': 9},
+        )
+        self.assertNotIn('comentarios', sql)
+        self.assertNotIn('aberta_enps', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_omit_drops_joins(self):
+        response, sql = self.get_with_queries(
+            '/api/funcionarios/?omit=pessoa,empresa,area,funcao,cargo'
+            '&ordering=estado'
+        )
+        self.assertEqual(
+            list(response.data['results'][0]),
+            ['email_corporativo', 'estado', 'tempo_de_empresa'],
+        )
+        self.assertNotIn('JOIN', sql)
+        # Ordering by a related model still joins it, without its columns
+        response = self.client.get(
+            '/api/funcionarios/?fields=estado&ordering=pessoa__nome'
+        )
+        self.assertEqual(
+            response.data['results'], [{'estado': 'SP'}, {'estado': 'RJ'}]
+        )
+
+    def test_fields_and_omit_match_full_output(self):
+        full = self.client.get('/api/funcionarios/').data['results']
+        sparse = self.client.get(
+            '/api/funcionarios/?fields=pessoa,estado,cargo&omit=cargo'
+        ).data['results']
+        self.assertEqual(
+            sparse,
+            [
+                {'pessoa': item['pessoa'], 'estado': item['estado']}
+                for item in full
+            ],
+        )
+        # The serializer path (no values plan) applies the same selection
+        response = self.client.get('/api/areas/?fields=cordenadoria,nome')
+        self.assertEqual(
+            list(response.data['results'][0]), ['nome', 'cordenadoria']
+        )
+
+    def test_retrieve_and_export(self):
+        response = self.client.get(
+            f'/api/funcionarios/{self.employee1.pk}/?fields=estado'
+        )
+        self.assertEqual(response.data, {'estado': 'SP'})
+        response = self.client.get('/api/areas/export/?format=csv&fields=nome')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines()[0], 'nome')
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/areas/?omit=nome,bogus')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bogus', str(response.data['omit']))
+
+    def test_empty_selection(self):
+        for query, param in (
+            ('fields=', 'fields'),
+            ('fields=,', 'fields'),
+            ('omit=nome,empresa,cordenadoria', 'omit'),
+            ('fields=nome&omit=nome', 'omit'),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/areas/?{query}')
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn(param, response.data)
+        # An empty omit drops nothing
+        response = self.client.get('/api/areas/?omit=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.data['results'][0]),
+            ['nome', 'empresa', 'cordenadoria'],
+        )
+
+
+@override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+class CountCacheTestCase(APITestCase, BaseTestCase):
+    """Test cases for cached and approximate list counts"""
+
+    def test_count_is_cached_until_version_changes(self):
+        url = '/api/empresas/'
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 2)
+        self.assertTrue(response.data['count_exact'])
+        Empresa.objects.create(nome='Empresa C')
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 2)
+        DatasetVersion.bump()
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 3)
+        # Orderings share the count
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'ordering': '-nome'})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_import_bumps_version(self):
+        version = DatasetVersion.current()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'data.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(';'.join(HEADER) + '\n')
+            call_command('import_data', csv_file=path, stdout=StringIO())
+        self.assertEqual(DatasetVersion.current(), version + 1)
+
+    def test_bump_creates_the_version_row(self):
+        DatasetVersion.objects.all().delete()
+        self.assertEqual(DatasetVersion.state(), (0, None))
+        DatasetVersion.bump()
+        self.assertEqual(DatasetVersion.current(), 1)
+        DatasetVersion.bump()
+        self.assertEqual(DatasetVersion.current(), 2)
+        self.assertEqual(DatasetVersion.objects.count(), 1)
+
+    def test_failed_import_raises_its_own_error(self):
+        csv_file = write_survey_csv([make_csv_row(i) for i in range(4)])
+        self.addCleanup(os.remove, csv_file)
+
+        def write(engine, batch):
+            raise RuntimeError('falha')
+
+        def bump(using='default'):
+            raise OperationalError('banco indisponível')
+
+        with mock.patch.object(BulkEngine, 'write', write):
+            with mock.patch.object(DatasetVersion, 'bump', bump):
+                with self.assertRaisesMessage(RuntimeError, 'falha'):
+                    call_command(
+                        'import_data',
+                        f'--csv_file={csv_file}',
+                        stdout=StringIO(),
+                    )
+
+    def test_approximate_count(self):
+        url = '/api/respostas-pesquisa/'
+        # Without statistics the exact count is used
+        response = self.client.get(url, {'count': 'approximate'})
+        self.assertTrue(response.data['count_exact'])
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE')
+        # Dataset version (validators), statistics and the page
+        with self.assertNumQueries(4) as queries:
+            response = self.client.get(url, {'count': 'approximate'})
+        self.assertFalse(response.data['count_exact'])
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(
+            any('COUNT' in query['sql'] for query in queries.captured_queries)
+        )
+        self.assertIsNone(
+            approximate_count(SurveyResponse.objects.filter(enps__gte=9))
+        )
+
+
+class ResponseCacheTestCase(APITestCase, BaseTestCase):
+    """Test cases for the list/retrieve response cache"""
+
+    def test_hit_after_miss(self):
+        url = '/api/funcionarios/?ordering=estado&page=1'
+        with self.assertNumQueries(3):
+            miss = self.client.get(url)
+        self.assertEqual(miss['X-Cache'], 'MISS')
+        self.assertIn('Server-Timing', miss)
+        # Only the dataset version is read; parameter order is irrelevant
+        with self.assertNumQueries(1):
+            hit = self.client.get('/api/funcionarios/?page=1&ordering=estado')
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['Content-Type'], 'application/json')
+        url = f'/api/funcionarios/{self.employee1.pk}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_version_bump_invalidates(self):
+        url = '/api/empresas/'
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+        Empresa.objects.create(nome='Empresa C')
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+        DatasetVersion.bump()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 3)
+
+    def test_only_json_successes_are_cached(self):
+        for _ in range(2):
+            response = self.client.get('/api/empresas/?page=0')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertNotIn('X-Cache', response)
+            response = self.client.get(
+                '/api/empresas/', HTTP_ACCEPT='text/html'
+            )
+            self.assertNotIn('X-Cache', response)
+
+    @override_settings(API_RESPONSE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        for _ in range(2):
+            self.assertNotIn('X-Cache', self.client.get('/api/empresas/'))
+
+    def test_stats(self):
+        self.assertIsNone(
+            self.client.get('/api/cache-stats/').json()['hit_ratio']
+        )
+        for _ in range(3):
+            self.client.get('/api/empresas/')
+        stats = self.client.get('/api/cache-stats/').json()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 0.6667)
+        self.assertGreater(stats['miss_ms'], 0)
+        self.assertEqual(stats['dataset_version'], DatasetVersion.current())
+
+
+class ConditionalRequestTestCase(APITestCase, BaseTestCase):
+    """Test cases for ETag / Last-Modified conditional GETs"""
+
+    def test_validators_and_cache_control(self):
+        response = self.client.get('/api/empresas/')
+        self.assertEqual(response['ETag'], 'W/"0-json"')
+        # No import yet: no modification date to report
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=30')
+        DatasetVersion.bump()
+        response = self.client.get('/api/empresas/')
+        self.assertEqual(response['ETag'], 'W/"1-json"')
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_skips_the_view(self):
+        DatasetVersion.bump()
+        for url in (
+            '/api/funcionarios/?page=1',
+            f'/api/areas/{self.area1.pk}/',
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                # Only the dataset version is read
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                self.assertIn('max-age=30', response['Cache-Control'])
+
+    def test_version_change_returns_new_content(self):
+        etag = self.client.get('/api/empresas/')['ETag']
+        Empresa.objects.create(nome='Empresa C')
+        DatasetVersion.bump()
+        response = self.client.get('/api/empresas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 3)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        DatasetVersion.bump()
+        last_modified = self.client.get('/api/empresas/')['Last-Modified']
+        response = self.client.get(
+            '/api/empresas/', HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_browsable_api_and_errors_have_no_validators(self):
+        response = self.client.get('/api/empresas/', HTTP_ACCEPT='text/html')
+        self.assertNotIn('ETag', response)
+        response = self.client.get('/api/empresas/?page=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('ETag', response)
+
+
+class AnalyticsTestCase(APITestCase, BaseTestCase):
+    """Test cases for the grouped eNPS / favorability endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Unfavorable / neutral scores and an eNPS detractor
+        cls.survey3 = SurveyResponse.objects.create(
+            employee=cls.employee1,
+            data_da_resposta='2023-02-10',
+            interesse_no_cargo=2,
+            contribuicao=4,
+            aprendizado_e_desenvolvimento=3,
+            feedback=4,
+            interacao_com_gestor=5,
+            clareza_sobre_possibilidades_de_carreira=1,
+            expectativa_de_permanencia=4,
+            enps=3,
+        )
+
+    def get(self, query=''):
+        response = self.client.get(f'/api/analytics/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_totals(self):
+        (summary,) = self.get()
+        self.assertEqual(summary['respostas'], 3)
+        # One promoter (9), one passive (8), one detractor (3)
+        self.assertEqual(summary['enps'], 0.0)
+        self.assertEqual(
+            summary['metricas']['interesse_no_cargo'],
+            {
+                'media': 6.33,
+                'favoravel': 66.67,
+                'neutro': 0.0,
+                'desfavoravel': 33.33,
+            },
+        )
+        self.assertEqual(
+            summary['metricas']['contribuicao'],
+            {
+                'media': 6.33,
+                'favoravel': 66.67,
+                'neutro': 33.33,
+                'desfavoravel': 0.0,
+            },
+        )
+
+    def test_group_by_hierarchy_and_month(self):
+        DatasetVersion.bump()
+        # Dataset version, rollup freshness and a single GROUP BY query
+        with self.assertNumQueries(3):
+            groups = self.get('?group_by=diretoria,mes')
+        self.assertEqual(
+            [
+                (g['diretoria']['nome'], g['mes'], g['respostas'], g['enps'])
+                for g in groups
+            ],
+            [
+                ('Diretoria Financeira', '2023-01-01', 1, 0.0),
+                ('Diretoria Financeira', '2023-02-01', 1, -100.0),
+                ('Diretoria Operacional', '2023-01-01', 1, 100.0),
+            ],
+        )
+        self.assertEqual(groups[0]['diretoria']['id'], self.diretoria1.pk)
+
+    def test_group_by_value_dimension(self):
+        groups = self.get('?group_by=estado')
+        self.assertEqual(
+            {g['estado']: g['respostas'] for g in groups}, {'RJ': 1, 'SP': 2}
+        )
+
+    def test_filters(self):
+        (summary,) = self.get(f'?area={self.area1.pk}&data_de=2023-02-01')
+        self.assertEqual(summary['respostas'], 1)
+        self.assertEqual(summary['enps'], -100.0)
+        self.assertEqual(self.get('?estado=MG'), [])
+        groups = self.get('?group_by=area&estado=SP,RJ')
+        self.assertEqual(len(groups), 2)
+
+    def test_invalid_parameters(self):
+        for query in (
+            '?group_by=salario',
+            '?group_by=mes,mes',
+            '?area=x',
+            '?data_de=15/01/2023',
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/analytics/{query}')
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertNotIn('ETag', response)
+
+    def test_cached_until_next_import(self):
+        DatasetVersion.bump()
+        response = self.client.get('/api/analytics/?group_by=genero')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analytics/?group_by=genero')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        etag = response['ETag']
+        response = self.client.get(
+            '/api/analytics/?group_by=genero', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@unittest.skipIf(snapshot.np is None, 'numpy is not installed')
+class SnapshotAnalyticsTestCase(APITestCase, BaseTestCase):
+    """Test cases for the in-memory columnar analytics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        SurveyResponse.objects.create(
+            employee=cls.employee1,
+            data_da_resposta='2023-04-03',
+            interesse_no_cargo=2,
+            contribuicao=4,
+            aprendizado_e_desenvolvimento=3,
+            feedback=4,
+            interacao_com_gestor=5,
+            clareza_sobre_possibilidades_de_carreira=1,
+            expectativa_de_permanencia=4,
+            enps=3,
+        )
+        # Out-of-scale scores (the ORM skips validation) fall into the
+        # histogram end buckets but keep their value in the sums
+        SurveyResponse.objects.create(
+            employee=cls.employee2,
+            data_da_resposta='2024-01-01',
+            interesse_no_cargo=-2,
+            contribuicao=12,
+            aprendizado_e_desenvolvimento=7,
+            feedback=7,
+            interacao_com_gestor=7,
+            clareza_sobre_possibilidades_de_carreira=7,
+            expectativa_de_permanencia=7,
+            enps=10,
+        )
+
+    def setUp(self):
+        super().setUp()
+        DatasetVersion.bump()
+
+    def assertSameAnalytics(self, query):
+        params = QueryDict(query)
+        self.assertEqual(
+            snapshot_analytics(params),
+            survey_analytics(
+                SurveyResponse.objects.all(), params, use_rollups=False
+            ),
+        )
+
+    def test_matches_sql(self):
+        for query in (
+            '',
+            'group_by=diretoria,mes',
+            'group_by=dia',
+            'group_by=semana,genero',
+            'group_by=trimestre,ano,estado',
+            'group_by=empresa,gerencia,coordenadoria,area,cargo,funcao,geracao',
+            f'area={self.area1.pk}&data_de=2023-02-01',
+            'group_by=area&estado=SP,RJ&data_ate=2023-12-31',
+            'estado=MG',
+            'group_by=mes&data_de=2025-01-01',
+        ):
+            with self.subTest(query=query):
+                self.assertSameAnalytics(query)
+                # Mixed-radix key compacted at every step
+                with mock.patch('app.snapshot.DENSE_GROUPS', 0):
+                    self.assertSameAnalytics(query)
+
+    def test_rebuilt_when_version_changes(self):
+        copy = get_snapshot()
+        self.assertIs(get_snapshot(), copy)
+        self.assertEqual(copy.size, 4)
+        SurveyResponse.objects.create(
+            employee=self.employee1,
+            data_da_resposta='2023-01-16',
+            **dict.fromkeys(SCORE_FIELDS, 0),
+        )
+        self.assertIs(get_snapshot(), copy)
+        DatasetVersion.bump()
+        self.assertEqual(get_snapshot().size, 5)
+        self.assertSameAnalytics('group_by=semana')
+
+    def test_endpoint(self):
+        query = '?group_by=diretoria,mes&estado=SP'
+        response = self.client.get(f'/api/analytics/in-memory/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(), self.client.get(f'/api/analytics/{query}').json()
+        )
+        # Only the dataset version is read once the copy is built
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/analytics/in-memory/?group_by=area'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/analytics/in-memory/?group_by=x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bitmaps_built_only_for_requested_values(self):
+        copy = get_snapshot()
+        self.assertEqual(copy.value_bitmaps, {})
+        copy.analytics(QueryDict('estado=SP,XX'))
+        sp = copy.value_code('estado', 'SP')
+        self.assertIsNone(copy.value_code('estado', 'XX'))
+        self.assertEqual(list(copy.value_bitmaps), [('estado', sp)])
+        cached = copy.value_bitmap('estado', sp)
+        copy.analytics(QueryDict(f'estado=SP&area={self.area1.pk}'))
+        self.assertIs(copy.value_bitmap('estado', sp), cached)
+        self.assertEqual(len(copy.value_bitmaps), 2)
+
+    def test_invalid_params_do_not_build_the_copy(self):
+        clear_snapshots()
+        with mock.patch.object(snapshot, 'ScoreSnapshot') as build:
+            for query in ('group_by=x', 'area=x', 'data_de=2023-13-01'):
+                with self.subTest(query=query):
+                    response = self.client.get(
+                        f'/api/analytics/in-memory/?{query}'
+                    )
+                    self.assertEqual(
+                        response.status_code, status.HTTP_400_BAD_REQUEST
+                    )
+        build.assert_not_called()
+
+    def test_bitmap_primitives(self):
+        size = 21
+        for start, stop in ((0, 0), (0, 21), (3, 5), (3, 16), (8, 16), (7, 9)):
+            with self.subTest(start=start, stop=stop):
+                bitmap = bitmaps.span(size, start, stop)
+                self.assertEqual(
+                    bitmaps.positions(bitmap, size).tolist(),
+                    list(range(start, stop)),
+                )
+                self.assertEqual(bitmaps.count(bitmap), stop - start)
+                # Lookup-table popcount used before NumPy 2.0
+                self.assertEqual(
+                    int(bitmaps.POPCOUNT[bitmap].sum()), stop - start
+                )
+                self.assertEqual(
+                    bitmaps.positions(
+                        bitmaps.invert(bitmap, size), size
+                    ).tolist(),
+                    [i for i in range(size) if not start <= i < stop],
+                )
+        values = [-3, 0, 7, 12, 5, -1, 2]
+        low, slices = bitmaps.bit_slices(values)
+        everything = bitmaps.span(len(values), 0, len(values))
+        self.assertEqual(
+            bitmaps.sliced_sum(everything, len(values), low, slices),
+            sum(values),
+        )
+        odd = bitmaps.pack([i % 2 == 1 for i in range(len(values))])
+        self.assertEqual(
+            bitmaps.sliced_sum(odd, 3, low, slices), sum(values[1::2])
+        )
+
+    def test_combined_bitmaps(self):
+        copy = get_snapshot()
+        everything = (None, None)
+        area1 = copy.bitmap({'area': [self.area1.pk]}, everything)
+        rio = copy.bitmap({'estado': ['RJ']}, everything)
+        january = copy.bitmap({}, (date(2023, 1, 1), date(2023, 1, 31)))
+        combined = (area1 | rio) & bitmaps.invert(january, copy.size)
+        responses = SurveyResponse.objects.filter(
+            Q(employee__area=self.area1) | Q(employee__estado='RJ')
+        ).exclude(data_da_resposta__range=('2023-01-01', '2023-01-31'))
+        self.assertEqual(
+            [copy.summary(combined)],
+            survey_analytics(responses, {}, use_rollups=False),
+        )
+        self.assertIsNone(copy.summary(area1 & rio))
+
+    def test_without_numpy(self):
+        with mock.patch('app.snapshot.np', None):
+            response = self.client.get('/api/analytics/in-memory/')
+            self.assertEqual(
+                response.status_code, status.HTTP_501_NOT_IMPLEMENTED
+            )
+            # Parameters are validated first
+            response = self.client.get('/api/analytics/in-memory/?group_by=x')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HierarchyAncestorsTestCase(BaseTestCase):
+    """Test cases for the denormalized ancestors of Area"""
+
+    def test_ancestors_follow_the_coordenadoria(self):
+        self.assertEqual(
+            (self.area1.gerencia, self.area1.diretoria),
+            (self.gerencia1, self.diretoria1),
+        )
+
+    def test_moving_a_branch_updates_its_areas(self):
+        self.coordenadoria1.gerencia = self.gerencia2
+        self.coordenadoria1.save()
+        self.area1.refresh_from_db()
+        self.assertEqual(
+            (self.area1.gerencia, self.area1.diretoria),
+            (self.gerencia2, self.diretoria2),
+        )
+        self.gerencia2.diretoria = self.diretoria1
+        self.gerencia2.save()
+        self.assertEqual(
+            set(Area.objects.values_list('diretoria', flat=True)),
+            {self.diretoria1.pk},
+        )
+
+    def test_subtree_filter_joins_only_the_area(self):
+        with CaptureQueriesContext(connections['default']) as ctx:
+            (summary,) = survey_analytics(
+                SurveyResponse.objects.all(),
+                {'diretoria': str(self.diretoria1.pk)},
+                use_rollups=False,
+            )
+        self.assertEqual(summary['respostas'], 1)
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertIn('"app_area"."diretoria_id" IN', sql)
+        self.assertNotIn('app_coordenadoria', sql)
+        self.assertNotIn('app_gerencia', sql)
+
+
+class KeysetPaginationTestCase(APITestCase, BaseTestCase):
+    """Test cases for cursor (keyset) pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Repeated names exercise the pk tie-breaker
+        for i in range(23):
+            Empresa.objects.create(nome=f'Empresa {i % 5}')
+
+    def walk(self, url, params=None):
+        params = {'cursor': '', **(params or {})}
+        response = self.client.get(url, params)
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            if response.data['next'] is None:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_matches_page_number_order(self):
+        for ordering in ('nome', '-nome'):
+            with self.subTest(ordering=ordering):
+                pages = self.walk('/api/empresas/', {'ordering': ordering})
+                names = [
+                    item['nome'] for page in pages for item in page['results']
+                ]
+                self.assertEqual(
+                    names,
+                    list(
+                        Empresa.objects.order_by(ordering, 'pk').values_list(
+                            'nome', flat=True
+                        )
+                    ),
+                )
+                self.assertEqual(len(pages), 3)
+                self.assertNotIn('count', pages[0])
+                self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link(self):
+        pages = self.walk('/api/empresas/')
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(response.data['next'], pages[0]['next'])
+
+    def test_related_ordering(self):
+        # Ordering by a foreign key follows the related model's ordering
+        for i in range(12):
+            Diretoria.objects.create(
+                empresa=self.empresa2 if i % 2 else self.empresa1,
+                nome=f'Diretoria {i:02d}',
+            )
+        pages = self.walk('/api/diretorias/', {'ordering': '-empresa'})
+        results = [item for page in pages for item in page['results']]
+        self.assertEqual(len(results), Diretoria.objects.count())
+        self.assertEqual(
+            results,
+            SerializadorDiretoria(
+                Diretoria.objects.order_by('-empresa__nome', 'pk'), many=True
+            ).data,
+        )
+
+    def test_no_count_query(self):
+        pages = self.walk('/api/respostas-pesquisa/')
+        self.assertEqual(len(pages[0]['results']), 2)
+        with self.assertNumQueries(1) as queries:
+            self.client.get('/api/respostas-pesquisa/', {'cursor': ''})
+        self.assertNotIn('COUNT', queries.captured_queries[0]['sql'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/empresas/', {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # A cursor is tied to the ordering it was created with
+        next_url = self.walk('/api/empresas/')[0]['next']
+        response = self.client.get(f'{next_url}&ordering=-nome')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ErrorHandlingTestCase(APITestCase, BaseTestCase):
     """Test cases for error handling"""
 
@@ -455,3 +1606,1135 @@ class ModelValidationTestCase(TestCase):
             'Este email corporativo já está em uso por outro funcionário.',
             str(cm.exception),
         )
+
+
+CSV_HEADER = [
+    'nome',
+    'email',
+    'email_corporativo',
+    'area',
+    'cargo',
+    'funcao',
+    'localidade',
+    'tempo_de_empresa',
+    'genero',
+    'geracao',
+    'n0_empresa',
+    'n1_diretoria',
+    'n2_gerencia',
+    'n3_coordenacao',
+    'n4_area',
+    'Data da Resposta',
+    'Interesse no Cargo',
+    'Comentários - Interesse no Cargo',
+    'Contribuição',
+    'Comentários - Contribuição',
+    'Aprendizado e Desenvolvimento',
+    'Comentários - Aprendizado e Desenvolvimento',
+    'Feedback',
+    'Comentários - Feedback',
+    'Interação com Gestor',
+    'Comentários - Interação com Gestor',
+    'Clareza sobre Possibilidades de Carreira',
+    'Comentários - Clareza sobre Possibilidades de Carreira',
+    'Expectativa de Permanência',
+    'Comentários - Expectativa de Permanência',
+    'eNPS',
+    '[Aberta] eNPS',
+]
+
+
+def make_csv_row(index, **overrides):
+    """Build one survey CSV row (as a dict) for employee number `index`"""
+    row = {
+        'nome': f'Demo {index:03d}',
+        'email': f'demo{index:03d}@example.com',
+        'email_corporativo': f'demo{index:03d}@empresa.com',
+        'area': 'administrativo',
+        'cargo': 'analista',
+        'funcao': 'profissional',
+        'localidade': 'são paulo',
+        'tempo_de_empresa': 'entre 1 e 2 anos',
+        'genero': 'feminino',
+        'geracao': 'geração z',
+        'n0_empresa': 'empresa',
+        'n1_diretoria': 'diretoria a',
+        'n2_gerencia': 'gerência a1',
+        'n3_coordenacao': 'coordenação a11',
+        'n4_area': f'área a11{index % 3}',
+        'Data da Resposta': '20/01/2022',
+        'eNPS': str(index % 11),
+        '[Aberta] eNPS': 'Comentário',
+    }
+    for column in CSV_HEADER:
+        if column.startswith('Comentários'):
+            row.setdefault(column, '-')
+        row.setdefault(column, str(1 + index % 5))
+    row.update(overrides)
+    return row
+
+
+def write_survey_csv(rows):
+    """Write rows to a temporary `;`-separated survey CSV and return its path"""
+    handle = tempfile.NamedTemporaryFile(
+        'w', suffix='.csv', delete=False, encoding='utf-8', newline=''
+    )
+    with handle:
+        writer = csv.DictWriter(handle, fieldnames=CSV_HEADER, delimiter=';')
+        writer.writeheader()
+        writer.writerows(rows)
+    return handle.name
+
+
+class ImportTestMixin:
+    """
+    Runs import_data on temporary survey CSVs. The rows returned by
+    import_rows() (none by default) are written to `self.csv_file` in
+    setUp, and `import_args` are passed to every run_import call.
+    """
+
+    import_args = ()
+
+    def import_rows(self):
+        return None
+
+    def setUp(self):
+        super().setUp()
+        self.rows = self.import_rows()
+        if self.rows is not None:
+            self.csv_file = self.write_csv(self.rows)
+
+    def write_csv(self, rows):
+        csv_file = write_survey_csv(rows)
+        self.addCleanup(os.remove, csv_file)
+        return csv_file
+
+    def run_import(self, *args, rows=None, csv_file=None):
+        """Output of import_data on `rows`, `csv_file` or self.csv_file"""
+        if rows is not None:
+            csv_file = self.write_csv(rows)
+        stdout = StringIO()
+        call_command(
+            'import_data',
+            f'--csv_file={csv_file or self.csv_file}',
+            *self.import_args,
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+
+def snapshot_database(using='default'):
+    """Natural-key snapshot of every imported table, for comparisons"""
+    return {
+        'hierarquia': sorted(
+            Area.objects.using(using).values_list(
+                'nome',
+                'cordenadoria__nome',
+                'cordenadoria__gerencia__nome',
+                'cordenadoria__gerencia__diretoria__nome',
+                'empresa__nome',
+            )
+        ),
+        'funcionarios': sorted(
+            Employee.objects.using(using).values_list(
+                'pessoa__email',
+                'pessoa__nome',
+                'pessoa__genero',
+                'email_corporativo',
+                'funcao__funcao',
+                'cargo__cargo',
+                'area__nome',
+                'estado',
+            )
+        ),
+        'respostas': sorted(
+            SurveyResponse.objects.using(using).values_list(
+                'employee__pessoa__email',
+                'data_da_resposta',
+                'interesse_no_cargo',
+                'enps',
+                'aberta_enps',
+            )
+        ),
+    }
+
+
+def mixed_import_rows():
+    """Rows covering inserts, a second wave, duplicates and invalid lines"""
+    rows = [make_csv_row(i) for i in range(12)]
+    # Second survey wave for the same employees
+    rows += [
+        make_csv_row(i, **{'Data da Resposta': '20/07/2022'}) for i in range(4)
+    ]
+    # Same email with a different name must be rejected
+    rows.append(make_csv_row(1, nome='Outro Nome'))
+    # Invalid date and score
+    rows.append(make_csv_row(20, **{'Data da Resposta': '31/02/2022'}))
+    rows.append(make_csv_row(21, eNPS='dez'))
+    # Duplicate response is kept as is
+    rows.append(make_csv_row(2, eNPS='0'))
+    return rows
+
+
+def postgres_available():
+    """Whether the `postgres` alias points at a reachable PostgreSQL"""
+    connection = connections['postgres']
+    if connection.vendor != 'postgresql':
+        return False
+    try:
+        connection.ensure_connection()
+    except OperationalError:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+POSTGRES_AVAILABLE = postgres_available()
+# Skipped classes still get their test databases created, so the alias is
+# only requested when it can be reached
+POSTGRES_DATABASES = {'default', 'postgres'} if POSTGRES_AVAILABLE else set()
+
+
+class ImportDataTestCase(ImportTestMixin, TestCase):
+    """Test cases for the import_data management command"""
+
+    def import_rows(self):
+        return mixed_import_rows()
+
+    def test_bulk_engine_matches_orm_engine(self):
+        self.run_import('--engine=orm')
+        expected = snapshot_database()
+        SurveyResponse.objects.all().delete()
+        Employee.objects.all().delete()
+        Person.objects.all().delete()
+        Empresa.objects.all().delete()
+        EmployeeLevel.objects.all().delete()
+        EmployeeType.objects.all().delete()
+
+        output = self.run_import('--engine=bulk', '--batch_size=5')
+        self.assertEqual(snapshot_database(), expected)
+        self.assertEqual(SurveyResponse.objects.count(), 16)
+        self.assertIn('erros: 3', output)
+        self.assertIn('Este email já está em uso por outra pessoa.', output)
+
+    def test_bulk_engine_is_idempotent(self):
+        self.run_import()
+        expected = snapshot_database()
+        output = self.run_import()
+        self.assertEqual(snapshot_database(), expected)
+        self.assertIn('inseridas: 0', output)
+        self.assertIn('já existentes: 17', output)
+
+    def test_area_ancestors_are_filled(self):
+        for engine in ('orm', 'bulk'):
+            with self.subTest(engine=engine):
+                Empresa.objects.all().delete()
+                self.run_import(f'--engine={engine}')
+                self.assertTrue(Area.objects.exists())
+                self.assertFalse(
+                    Area.objects.exclude(
+                        gerencia=F('cordenadoria__gerencia'),
+                        diretoria=F('cordenadoria__gerencia__diretoria'),
+                    ).exists()
+                )
+
+    def test_copy_engine_falls_back_to_bulk_outside_postgres(self):
+        output = self.run_import('--engine=copy')
+        self.assertIn('usando o motor bulk', output)
+        self.assertEqual(SurveyResponse.objects.count(), 16)
+
+
+@unittest.skipUnless(POSTGRES_AVAILABLE, 'PostgreSQL is not reachable')
+class PostgresCopyEngineTestCase(TransactionTestCase):
+    """Test cases for the COPY engine against the `postgres` alias"""
+
+    databases = POSTGRES_DATABASES
+
+    def setUp(self):
+        rows = mixed_import_rows()
+        # New person reusing another employee's corporate email
+        rows.append(make_csv_row(30, email_corporativo='demo003@empresa.com'))
+        self.csv_file = write_survey_csv(rows)
+        self.addCleanup(os.remove, self.csv_file)
+
+    def run_import(self, engine):
+        stdout = StringIO()
+        call_command(
+            'import_data',
+            f'--csv_file={self.csv_file}',
+            '--database=postgres',
+            f'--engine={engine}',
+            '--batch_size=5',
+            stdout=stdout,
+        )
+        output = stdout.getvalue()
+        self.assertNotIn('usando o motor bulk', output)
+        # Row counts and the rejected lines with their messages
+        return [
+            line
+            for line in output.splitlines()
+            if line.startswith(('Linhas:', 'Erro ao processar'))
+        ]
+
+    def test_matches_bulk_engine(self):
+        expected = [self.run_import('bulk'), self.run_import('bulk')]
+        expected_data = snapshot_database('postgres')
+        call_command('flush', database='postgres', interactive=False)
+
+        first = self.run_import('copy')
+        self.assertEqual(first, expected[0])
+        self.assertIn(
+            'Linhas: 21 | inseridas: 16 | atualizadas: 0 | '
+            'já existentes: 1 | erros: 4',
+            first,
+        )
+        self.assertEqual(snapshot_database('postgres'), expected_data)
+        # Second run: every valid row already exists
+        self.assertEqual(self.run_import('copy'), expected[1])
+        self.assertEqual(snapshot_database('postgres'), expected_data)
+
+
+class ParallelImportTestCase(ImportTestMixin, TestCase):
+    """Test cases for the multi-process CSV parsing of import_data"""
+
+    def import_rows(self):
+        rows = [make_csv_row(i) for i in range(30)]
+        rows[7]['eNPS'] = 'dez'
+        rows[22]['Data da Resposta'] = '2022-01-20'
+        return rows
+
+    def test_chunks_cover_the_file_on_line_boundaries(self):
+        fieldnames, chunks = split_chunks(self.csv_file, chunk_size=500)
+        self.assertEqual(fieldnames, CSV_HEADER)
+        self.assertGreater(len(chunks), 5)
+        with open(self.csv_file, 'rb') as f:
+            data = f.read()
+        self.assertEqual(chunks[-1][1], len(data))
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1 : end], b'\n')
+
+    def test_parallel_reader_matches_sequential_parse(self):
+        with open(self.csv_file, encoding='utf-8') as f:
+            reader = csv.DictReader(f, delimiter=';')
+            expected = [
+                (line, values)
+                for line, values in BulkEngine('default').parse(
+                    (reader.line_num, row) for row in reader
+                )
+            ]
+        records = list(ParallelReader(self.csv_file, 2, chunk_size=500))
+        self.assertEqual(
+            [line for line, _ in records], [line for line, _ in expected]
+        )
+        for (_, values), (_, expected_values) in zip(records, expected):
+            if isinstance(expected_values, Exception):
+                self.assertIsInstance(values, type(expected_values))
+            else:
+                self.assertEqual(values, expected_values)
+
+    def test_carriage_return_in_quoted_field(self):
+        rows = [make_csv_row(i) for i in range(6)]
+        rows[2]['Comentários - Feedback'] = 'primeira\rsegunda'
+        rows[4]['eNPS'] = 'dez'
+        csv_file = self.write_csv(rows)
+        sequential = [line for line, _ in CsvReader(csv_file)]
+        self.assertEqual(
+            [line for line, _ in ParallelReader(csv_file, 2, chunk_size=200)],
+            sequential,
+        )
+
+    def test_import_with_workers(self):
+        output = self.run_import('--workers=2')
+        self.assertEqual(SurveyResponse.objects.count(), 28)
+        self.assertIn('Erro ao processar linha 9:', output)
+        self.assertIn('Erro ao processar linha 24:', output)
+        self.assertIn('linhas/s por worker', output)
+
+
+class ResumableImportTestCase(ImportTestMixin, TestCase):
+    """Test cases for checkpointed imports and --resume"""
+
+    import_args = ('--batch_size=5',)
+
+    def import_rows(self):
+        rows = [make_csv_row(i) for i in range(23)]
+        rows[12]['eNPS'] = 'dez'
+        return rows
+
+    def crash_after_batches(self, count, *args):
+        """Run an import that dies before writing batch `count` + 1"""
+        original = BulkEngine.write
+        calls = []
+
+        def write(engine, batch):
+            if len(calls) == count:
+                raise KeyboardInterrupt
+            calls.append(batch)
+            original(engine, batch)
+
+        with mock.patch.object(BulkEngine, 'write', write):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import(*args)
+
+    def test_resume_continues_after_last_committed_batch(self):
+        self.crash_after_batches(2)
+        self.assertEqual(SurveyResponse.objects.count(), 10)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertFalse(checkpoint.completed)
+        self.assertEqual(checkpoint.line, 11)
+
+        output = self.run_import('--resume')
+        self.assertIn('Retomando a partir da linha 11', output)
+        # Only the remaining rows are read again
+        self.assertIn('Linhas: 13 |', output)
+        self.assertIn('Erro ao processar linha 14:', output)
+        self.assertEqual(SurveyResponse.objects.count(), 22)
+        self.assertTrue(ImportCheckpoint.objects.get().completed)
+
+    def test_orm_checkpoint_after_rejected_row(self):
+        rows = [make_csv_row(i) for i in range(14)]
+        # The row that closes the second batch is rejected
+        rows[9]['eNPS'] = 'dez'
+        self.csv_file = self.write_csv(rows)
+        original = OrmEngine.import_row
+        calls = []
+
+        def import_row(engine, values):
+            if len(calls) == 10:
+                raise KeyboardInterrupt
+            calls.append(values)
+            return original(engine, values)
+
+        with mock.patch.object(OrmEngine, 'import_row', import_row):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import('--engine=orm')
+        self.assertEqual(ImportCheckpoint.objects.get().line, 11)
+        output = self.run_import('--engine=orm', '--resume')
+        self.assertIn('Linhas: 4 |', output)
+        self.assertEqual(SurveyResponse.objects.count(), 13)
+
+    def test_resume_with_workers(self):
+        self.crash_after_batches(3, '--workers=2')
+        self.assertEqual(SurveyResponse.objects.count(), 15)
+        output = self.run_import('--resume', '--workers=2')
+        self.assertIn('Linhas: 7 |', output)
+        self.assertEqual(SurveyResponse.objects.count(), 22)
+
+    def test_resume_completed_import_is_a_no_op(self):
+        self.run_import()
+        output = self.run_import('--resume')
+        self.assertIn('já concluída', output)
+
+    def test_resume_without_checkpoint_starts_over(self):
+        output = self.run_import('--resume')
+        self.assertIn('importando desde o início', output)
+        self.assertEqual(SurveyResponse.objects.count(), 22)
+
+
+class IncrementalImportTestCase(ImportTestMixin, TestCase):
+    """Test cases for import_data --incremental"""
+
+    import_args = ('--incremental',)
+
+    def import_rows(self):
+        return [make_csv_row(i) for i in range(10)]
+
+    def test_only_new_and_changed_rows_are_written(self):
+        output = self.run_import()
+        self.assertIn('inseridas: 10 | atualizadas: 0', output)
+        self.assertEqual(ImportedRowHash.objects.count(), 10)
+
+        changed = [dict(row) for row in self.rows]
+        changed[3]['Feedback'] = '5'
+        changed[4]['n4_area'] = 'área nova'
+        changed.append(make_csv_row(10))
+        output = self.run_import(rows=changed)
+        self.assertIn(
+            'inseridas: 1 | atualizadas: 2 | já existentes: 8', output
+        )
+        response = SurveyResponse.objects.get(
+            employee__pessoa__email='demo003@example.com'
+        )
+        self.assertEqual(response.feedback, 5)
+        employee = Employee.objects.get(pessoa__email='demo004@example.com')
+        self.assertEqual(employee.area.nome, 'área nova')
+
+        output = self.run_import(rows=changed)
+        self.assertIn(
+            'inseridas: 0 | atualizadas: 0 | já existentes: 11', output
+        )
+
+    def test_existing_data_without_hashes_is_updated_once(self):
+        call_command(
+            'import_data', f'--csv_file={self.csv_file}', stdout=StringIO()
+        )
+        self.assertEqual(ImportedRowHash.objects.count(), 0)
+        output = self.run_import()
+        self.assertIn('inseridas: 0 | atualizadas: 10', output)
+        output = self.run_import()
+        self.assertIn('já existentes: 10', output)
+
+    def test_incremental_import_with_workers(self):
+        output = self.run_import('--workers=2')
+        self.assertIn('inseridas: 10 | atualizadas: 0', output)
+        self.assertEqual(ImportedRowHash.objects.count(), 10)
+        output = self.run_import('--workers=2')
+        self.assertIn('já existentes: 10', output)
+
+    def test_duplicate_keys_keep_the_first_row(self):
+        duplicate = dict(self.rows[0], Feedback='1')
+        self.run_import(rows=self.rows + [duplicate])
+        output = self.run_import(rows=self.rows + [duplicate])
+        self.assertIn('atualizadas: 0 | já existentes: 11', output)
+
+    def test_row_hashes_ignore_unused_columns(self):
+        row = make_csv_row(1)
+        self.assertEqual(row_hashes(row), row_hashes(dict(row, area='outra')))
+        key, content = row_hashes(dict(row, Feedback='0'))
+        self.assertEqual(key, row_hashes(row)[0])
+        self.assertNotEqual(content, row_hashes(row)[1])
+        # The date is hashed once parsed, whatever its padding
+        padded = make_csv_row(1, **{'Data da Resposta': '01/02/2022'})
+        self.assertEqual(
+            row_hashes(padded),
+            row_hashes(dict(padded, **{'Data da Resposta': '1/2/2022'})),
+        )
+        self.assertNotIn('hashes', parse_row(row))
+        self.assertEqual(
+            parse_row(row, hashes=True)['hashes'], row_hashes(row)
+        )
+
+
+class RollupTestCase(ImportTestMixin, APITestCase):
+    """Test cases for the incrementally maintained survey rollups"""
+
+    def import_rows(self):
+        return [make_csv_row(i) for i in range(9)]
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assertRollupsMatchResponses(self):
+        self.assertTrue(rollups_current())
+        stored = {
+            tuple(row[field] for field in CELL): {
+                field: row[field] for field in COUNTER_FIELDS
+            }
+            for row in SurveyRollup.objects.values(*CELL, *COUNTER_FIELDS)
+        }
+        expected = {
+            cell: dict(counters)
+            for cell, counters in cell_counts(
+                SurveyResponse.objects.all()
+            ).items()
+        }
+        self.assertEqual(stored, expected)
+
+    def test_import_folds_only_inserted_rows(self):
+        output = self.run_import()
+        self.assertIn('Respostas somadas às agregações: 9', output)
+        self.assertRollupsMatchResponses()
+        # A new wave (new month) and late answers for an existing month
+        rows = self.rows + [
+            make_csv_row(i, **{'Data da Resposta': '15/02/2022'})
+            for i in range(5)
+        ]
+        rows.append(make_csv_row(9))
+        output = self.run_import(rows=rows)
+        self.assertIn('Respostas somadas às agregações: 6', output)
+        self.assertRollupsMatchResponses()
+
+    def test_late_rows_do_not_reread_aggregated_months(self):
+        self.run_import()
+        start = SurveyResponse.objects.aggregate(last=Max('pk'))['last']
+        # Same month as the aggregated rows, for new and known cells
+        rows = self.rows + [
+            make_csv_row(i, **{'Data da Resposta': '25/01/2022'})
+            for i in range(0, 12, 3)
+        ]
+        with CaptureQueriesContext(connections['default']) as ctx:
+            output = self.run_import(rows=rows)
+        self.assertIn('Respostas somadas às agregações: 4', output)
+        aggregations = [
+            query['sql']
+            for query in ctx.captured_queries
+            if 'SUM(' in query['sql']
+        ]
+        self.assertTrue(aggregations)
+        for sql in aggregations:
+            self.assertIn(f'"app_surveyresponse"."id" > {start}', sql)
+            self.assertNotRegex(sql, rf'"id" <= {start}\b')
+        self.assertRollupsMatchResponses()
+
+    def test_incremental_updates_move_responses_between_cells(self):
+        rows = self.rows + [
+            make_csv_row(4, **{'Data da Resposta': '15/02/2022'})
+        ]
+        self.run_import('--incremental', rows=rows)
+        changed = [dict(row) for row in rows]
+        changed[2]['Feedback'] = '7'
+        changed[2]['eNPS'] = '10'
+        # Moves both answers of employee 4 to another area and state
+        changed[4].update(n4_area='área nova', localidade='rio de janeiro')
+        output = self.run_import('--incremental', rows=changed)
+        self.assertIn('atualizadas: 2', output)
+        self.assertIn('Respostas somadas às agregações: 0', output)
+        self.assertRollupsMatchResponses()
+
+    def test_refresh_after_writes_outside_the_importer(self):
+        self.run_import()
+        employee = Employee.objects.first()
+        SurveyResponse.objects.create(
+            employee=employee,
+            data_da_resposta=date(2022, 1, 31),
+            interesse_no_cargo=12,
+            contribuicao=-1,
+            aprendizado_e_desenvolvimento=0,
+            feedback=10,
+            interacao_com_gestor=4,
+            clareza_sobre_possibilidades_de_carreira=3,
+            expectativa_de_permanencia=5,
+            enps=11,
+        )
+        self.assertFalse(rollups_current())
+        # Still correct meanwhile: analytics falls back to the responses
+        self.assertEqual(
+            survey_analytics(SurveyResponse.objects.all(), {})[0]['respostas'],
+            10,
+        )
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertRollupsMatchResponses()
+        self.assertEqual(refresh_rollups(), 0)
+
+    def test_analytics_from_rollups_match_responses(self):
+        self.run_import(
+            rows=self.rows
+            + [
+                make_csv_row(i, **{'Data da Resposta': '15/04/2022'})
+                for i in range(0, 9, 2)
+            ]
+        )
+        responses = SurveyResponse.objects.all()
+        for params in (
+            {},
+            {'group_by': 'diretoria,mes'},
+            {'group_by': 'area,cargo,funcao,estado'},
+            {'group_by': 'trimestre', 'data_de': '2022-04-01'},
+            {'group_by': 'empresa,ano', 'data_ate': '2022-01-31'},
+            {'group_by': 'area', 'estado': 'SP'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    survey_analytics(responses, params),
+                    survey_analytics(responses, params, use_rollups=False),
+                )
+
+    def test_analytics_endpoint_reads_rollups_when_covered(self):
+        self.run_import()
+        for query, table in (
+            ('?group_by=area,mes', SurveyRollup._meta.db_table),
+            # Not in the rollups: gender, days, partial months
+            ('?group_by=genero', SurveyResponse._meta.db_table),
+            ('?group_by=dia', SurveyResponse._meta.db_table),
+            ('?data_de=2022-01-10', SurveyResponse._meta.db_table),
+        ):
+            with self.subTest(query=query):
+                with CaptureQueriesContext(connections['default']) as ctx:
+                    response = self.client.get(f'/api/analytics/{query}')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn(
+                    f'FROM "{table}"', ctx.captured_queries[-1]['sql']
+                )
+
+    def test_rebuild_command(self):
+        self.run_import()
+        SurveyRollup.objects.update(respostas=1)
+        stdout = StringIO()
+        call_command('rebuild_rollups', stdout=stdout)
+        self.assertIn('9 respostas agregadas em', stdout.getvalue())
+        self.assertRollupsMatchResponses()
+
+
+class CompressedImportTestCase(ImportTestMixin, TestCase):
+    """Test cases for compressed and stdin sources in import_data"""
+
+    def import_rows(self):
+        return [make_csv_row(i) for i in range(12)]
+
+    def setUp(self):
+        super().setUp()
+        with open(self.csv_file, 'rb') as f:
+            self.data = f.read()
+
+    def compress(self, compress, suffix):
+        path = self.csv_file + suffix
+        with open(path, 'wb') as f:
+            f.write(compress(self.data))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_compressed_files_match_plain_file(self):
+        self.run_import()
+        expected = snapshot_database()
+        gzip_file = self.compress(gzip.compress, '.gz')
+        for csv_file in (
+            gzip_file,
+            self.compress(bz2.compress, '.bz2'),
+            self.compress(lzma.compress, '.xz'),
+        ):
+            with self.subTest(csv_file=csv_file):
+                rows = list(CsvReader(csv_file))
+                self.assertEqual(rows, list(CsvReader(self.csv_file)))
+        SurveyResponse.objects.all().delete()
+        output = self.run_import(csv_file=gzip_file)
+        self.assertIn('inseridas: 12', output)
+        self.assertEqual(snapshot_database(), expected)
+
+    def test_zstd_file(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise unittest.SkipTest('zstandard is not installed')
+        csv_file = self.compress(zstandard.ZstdCompressor().compress, '.zst')
+        output = self.run_import(csv_file=csv_file)
+        self.assertIn('inseridas: 12', output)
+
+    def test_stdin(self):
+        stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(self.data)))
+        with mock.patch('sys.stdin', stdin):
+            output = self.run_import('--resume', csv_file='-')
+        self.assertIn('não é suportado na entrada padrão', output)
+        self.assertIn('inseridas: 12', output)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_resume_compressed_file(self):
+        csv_file = self.compress(gzip.compress, '.gz')
+        original = BulkEngine.write
+
+        def write(engine, batch):
+            if SurveyResponse.objects.count() == 5:
+                raise KeyboardInterrupt
+            original(engine, batch)
+
+        with mock.patch.object(BulkEngine, 'write', write):
+            with self.assertRaises(KeyboardInterrupt):
+                self.run_import('--batch_size=5', csv_file=csv_file)
+        output = self.run_import(
+            '--batch_size=5', '--resume', csv_file=csv_file
+        )
+        self.assertIn('Retomando a partir da linha 6', output)
+        self.assertIn('Linhas: 7 |', output)
+        self.assertEqual(SurveyResponse.objects.count(), 12)
+
+    def test_workers_fall_back_for_compressed_file(self):
+        output = self.run_import(
+            '--workers=2', csv_file=self.compress(gzip.compress, '.gz')
+        )
+        self.assertIn('usando 1 worker', output)
+        self.assertIn('inseridas: 12', output)
+
+
+class SwapImportTestCase(TestCase):
+    """Test cases for import_data --swap on a file-based SQLite database"""
+
+    @classmethod
+    def ensure_connection_patch_method(cls):
+        # The 'swap' alias and its shadow are only created inside each test
+        real_ensure_connection = BaseDatabaseWrapper.ensure_connection
+        patched_ensure_connection = super().ensure_connection_patch_method()
+
+        def ensure_connection(self, *args, **kwargs):
+            if self.alias.startswith('swap'):
+                return real_ensure_connection(self, *args, **kwargs)
+            return patched_ensure_connection(self, *args, **kwargs)
+
+        return ensure_connection
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        connections.settings['swap'] = {
+            **connections.settings['default'],
+            'NAME': self.path,
+        }
+        self.addCleanup(self.remove_alias)
+
+    def remove_alias(self):
+        connections['swap'].close()
+        del connections['swap']
+        del connections.settings['swap']
+
+    def run_import(self, count, *args):
+        csv_file = write_survey_csv([make_csv_row(i) for i in range(count)])
+        self.addCleanup(os.remove, csv_file)
+        stdout = StringIO()
+        call_command(
+            'import_data',
+            f'--csv_file={csv_file}',
+            '--database=swap',
+            '--swap',
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def test_swap_publishes_the_import_at_once(self):
+        self.run_import(8)
+        self.assertEqual(SurveyResponse.objects.using('swap').count(), 8)
+        reader = sqlite3.connect(self.path)
+        self.addCleanup(reader.close)
+        reader.execute('BEGIN')
+        count = 'SELECT COUNT(*) FROM app_surveyresponse'
+        self.assertEqual(reader.execute(count).fetchone(), (8,))
+
+        output = self.run_import(10, '--batch_size=3')
+        self.assertIn('Tabelas de sombra publicadas.', output)
+        # A connection opened before the swap keeps its consistent view
+        self.assertEqual(reader.execute(count).fetchone(), (8,))
+        self.assertEqual(SurveyResponse.objects.using('swap').count(), 10)
+        self.assertFalse(os.path.exists(f'{self.path}.shadow'))
+
+    def test_failed_import_leaves_live_tables_untouched(self):
+        self.run_import(4)
+
+        def write(engine, batch):
+            raise RuntimeError('falha')
+
+        with mock.patch.object(BulkEngine, 'write', write):
+            with self.assertRaises(RuntimeError):
+                self.run_import(8)
+        self.assertEqual(SurveyResponse.objects.using('swap').count(), 4)
+        self.assertFalse(os.path.exists(f'{self.path}.shadow'))
+
+    def test_swap_requires_a_database_file(self):
+        csv_file = write_survey_csv([make_csv_row(1)])
+        self.addCleanup(os.remove, csv_file)
+        stdout = StringIO()
+        call_command(
+            'import_data', f'--csv_file={csv_file}', '--swap', stdout=stdout
+        )
+        self.assertIn(
+            '--swap exige um banco SQLite em arquivo', stdout.getvalue()
+        )
+        self.assertFalse(SurveyResponse.objects.exists())
+
+
+@unittest.skipUnless(POSTGRES_AVAILABLE, 'PostgreSQL is not reachable')
+class PostgresSwapImportTestCase(TransactionTestCase):
+    """Test cases for import_data --swap against the `postgres` alias"""
+
+    databases = POSTGRES_DATABASES
+
+    @classmethod
+    def ensure_connection_patch_method(cls):
+        # The shadow alias is only registered during the import
+        real_ensure_connection = BaseDatabaseWrapper.ensure_connection
+        patched_ensure_connection = super().ensure_connection_patch_method()
+
+        def ensure_connection(self, *args, **kwargs):
+            if self.alias == 'postgres__shadow':
+                return real_ensure_connection(self, *args, **kwargs)
+            return patched_ensure_connection(self, *args, **kwargs)
+
+        return ensure_connection
+
+    def run_import(self, count, *args):
+        csv_file = write_survey_csv([make_csv_row(i) for i in range(count)])
+        self.addCleanup(os.remove, csv_file)
+        stdout = StringIO()
+        call_command(
+            'import_data',
+            f'--csv_file={csv_file}',
+            '--database=postgres',
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def schemas(self):
+        with connections['postgres'].cursor() as cursor:
+            cursor.execute(
+                'SELECT schema_name FROM information_schema.schemata '
+                'WHERE schema_name IN (%s, %s)',
+                [SHADOW_SCHEMA, OLD_SCHEMA],
+            )
+            return cursor.fetchall()
+
+    def test_swap_publishes_the_shadow_tables(self):
+        self.run_import(4, '--swap')
+        output = self.run_import(10, '--swap', '--batch_size=3')
+        self.assertIn('Tabelas de sombra publicadas.', output)
+        responses = SurveyResponse.objects.using('postgres')
+        self.assertEqual(responses.count(), 10)
+        self.assertEqual(Person.objects.using('postgres').count(), 10)
+        self.assertEqual(self.schemas(), [])
+        self.assertNotIn('postgres__shadow', connections.settings)
+
+        # The published sequences continue after the copied rows
+        output = self.run_import(12)
+        self.assertIn('inseridas: 2 | atualizadas: 0', output)
+        self.assertEqual(responses.count(), 12)
+
+    def test_shadow_copies_columns_by_name(self):
+        self.run_import(4)
+        # A live table changed outside migrations: an extra column, and
+        # genero moved to the end of the physical column order
+        with connections['postgres'].cursor() as cursor:
+            cursor.execute('ALTER TABLE app_person ADD COLUMN extra text')
+            cursor.execute(
+                'ALTER TABLE app_person RENAME COLUMN genero TO genero_old'
+            )
+            cursor.execute(
+                'ALTER TABLE app_person ADD COLUMN genero varchar(1)'
+            )
+            cursor.execute('UPDATE app_person SET genero = genero_old')
+            cursor.execute('ALTER TABLE app_person DROP COLUMN genero_old')
+        expected = sorted(
+            Person.objects.using('postgres').values_list('email', 'genero')
+        )
+        self.run_import(4, '--swap')
+        self.assertEqual(
+            sorted(
+                Person.objects.using('postgres').values_list('email', 'genero')
+            ),
+            expected,
+        )
+
+    def test_failed_import_discards_the_shadow(self):
+        self.run_import(4, '--swap')
+
+        def write(engine, batch):
+            raise RuntimeError('falha')
+
+        with mock.patch.object(BulkEngine, 'write', write):
+            with self.assertRaises(RuntimeError):
+                self.run_import(8, '--swap')
+        self.assertEqual(SurveyResponse.objects.using('postgres').count(), 4)
+        self.assertEqual(self.schemas(), [])
+        self.assertNotIn('postgres__shadow', connections.settings)
+
+
+class ImportProfileTestCase(ImportTestMixin, TestCase):
+    """Test cases for import_data --profile and --cprofile"""
+
+    def import_rows(self):
+        return [make_csv_row(i) for i in range(12)]
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.profile = os.path.join(directory, 'profile.json')
+        self.cprofile = os.path.join(directory, 'profile.pstats')
+
+    def test_profile_summary(self):
+        output = self.run_import(
+            '--batch_size=5',
+            f'--profile={self.profile}',
+            f'--cprofile={self.cprofile}',
+        )
+        self.assertIn('Perfil gravado em', output)
+        with open(self.profile, encoding='utf-8') as f:
+            summary = json.load(f)
+        self.assertEqual(summary['engine'], 'bulk')
+        self.assertEqual(summary['rows'], 12)
+        self.assertEqual(summary['stats']['inserted'], 12)
+        self.assertLessEqual(
+            {'read', 'parse', 'dimensions', 'write'}, set(summary['stages'])
+        )
+        by_statement = summary['queries']['by_statement']
+        self.assertIn('INSERT SurveyResponse', by_statement)
+        # One bulk insert of responses per batch
+        self.assertEqual(by_statement['INSERT SurveyResponse']['count'], 3)
+        self.assertEqual(summary['throughput'][-1]['rows'], 12)
+        self.assertGreater(summary['peak_rss_kb']['main'], 0)
+        self.assertGreater(os.path.getsize(self.cprofile), 0)
+
+
+class ImportCheckTestCase(TestCase):
+    """Test cases for import_data --check"""
+
+    def run_check(self, rows):
+        csv_file = write_survey_csv(rows)
+        self.addCleanup(os.remove, csv_file)
+        stdout = StringIO()
+        failed = False
+        with self.assertNumQueries(0):
+            try:
+                call_command(
+                    'import_data',
+                    f'--csv_file={csv_file}',
+                    '--check',
+                    stdout=stdout,
+                )
+            except CommandError as e:
+                self.assertIn('erro(s) de validação', str(e))
+                failed = True
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(failed, not report['valid'])
+        return report
+
+    def test_valid_file(self):
+        report = self.run_check([make_csv_row(i) for i in range(5)])
+        self.assertTrue(report['valid'])
+        self.assertEqual(report['rows'], 5)
+        self.assertEqual(report['errors'], [])
+        self.assertFalse(SurveyResponse.objects.exists())
+
+    def test_invalid_rows_are_reported_with_line_numbers(self):
+        rows = [make_csv_row(i) for i in range(6)]
+        rows[0]['eNPS'] = '11'
+        rows[1]['Feedback'] = '8'
+        rows[1]['Data da Resposta'] = '2022-01-31'
+        rows[2]['localidade'] = 'atlântida'
+        rows[3]['genero'] = 'x'
+        rows.append(make_csv_row(1, nome='Outro Nome'))
+        rows.append(
+            make_csv_row(6, email_corporativo=rows[4]['email_corporativo'])
+        )
+        rows.append(make_csv_row(7, nome='n' * 256))
+        report = self.run_check(rows)
+        self.assertFalse(report['valid'])
+        self.assertEqual(
+            [(e['line'], e['column']) for e in report['errors']],
+            [
+                (2, 'eNPS'),
+                (3, 'Data da Resposta'),
+                (3, 'Feedback'),
+                (4, 'localidade'),
+                (5, 'genero'),
+                (8, 'email'),
+                (9, 'email_corporativo'),
+                (10, 'nome'),
+            ],
+        )
+        self.assertEqual(report['errors_by_column']['email'], 1)
+
+    def test_missing_column(self):
+        row = make_csv_row(1)
+        del row['eNPS']
+        handle = StringIO()
+        writer = csv.DictWriter(handle, fieldnames=list(row), delimiter=';')
+        writer.writeheader()
+        writer.writerow(row)
+        with tempfile.NamedTemporaryFile(suffix='.csv') as f:
+            f.write(handle.getvalue().encode())
+            f.flush()
+            report = Validator(f.name).run()
+        self.assertEqual(
+            report['errors'],
+            [
+                {
+                    'line': 1,
+                    'column': 'eNPS',
+                    'value': None,
+                    'message': 'Coluna ausente no cabeçalho',
+                }
+            ],
+        )
+
+    def test_chunks_share_uniqueness_state(self):
+        rows = [make_csv_row(i) for i in range(5)]
+        rows.append(make_csv_row(0, nome='Outro Nome'))
+        csv_file = write_survey_csv(rows)
+        self.addCleanup(os.remove, csv_file)
+        report = Validator(csv_file, chunk_size=2).run()
+        self.assertEqual(
+            [(e['line'], e['column']) for e in report['errors']],
+            [(7, 'email')],
+        )
+
+
+class SyntheticDataTestCase(TestCase):
+    """Test cases for the generate_survey_data command"""
+
+    def generate(self, *args):
+        """Run the command into a temporary file and return its path"""
+        handle = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        call_command(
+            'generate_survey_data',
+            f'--output={handle.name}',
+            *args,
+            stdout=StringIO(),
+        )
+        return handle.name
+
+    def read(self, path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_output_is_deterministic_by_seed(self):
+        generate = lambda seed: self.read(
+            self.generate('--employees=30', f'--seed={seed}')
+        )
+        first = generate(7)
+        self.assertEqual(first, generate(7))
+        self.assertNotEqual(first, generate(8))
+        self.assertEqual(first.splitlines()[0], ';'.join(HEADER))
+        self.assertEqual(list(HEADER), CSV_HEADER)
+
+    def test_generated_file_imports_cleanly(self):
+        csv_file = self.generate(
+            '--employees=40',
+            '--waves=2',
+            '--companies=2',
+            '--directorates=2',
+            '--managements=1',
+            '--coordinations=1',
+            '--areas=3',
+        )
+        self.assertEqual(len(self.read(csv_file).splitlines()), 81)
+        self.assertTrue(Validator(csv_file).run()['valid'])
+        stdout = StringIO()
+        call_command('import_data', f'--csv_file={csv_file}', stdout=stdout)
+        self.assertIn('inseridas: 80 |', stdout.getvalue())
+        self.assertEqual(Employee.objects.count(), 40)
+        self.assertLessEqual(Area.objects.count(), 2 * 2 * 3)
+        self.assertEqual(
+            SurveyResponse.objects.dates('data_da_resposta', 'day').count(), 2
+        )
+
+    def test_comment_rate(self):
+        generator = SurveyGenerator(employees=200, comment_rate=0)
+        comments = {row[17] for row in generator}
+        self.assertEqual(comments, {'-'})
+        generator = SurveyGenerator(employees=2000, comment_rate=0.3)
+        filled = sum(row[17] != '-' for row in generator)
+        self.assertAlmostEqual(filled / 2000, 0.3, delta=0.05)
+
+
+class ImportParsingTestCase(TestCase):
+    """Test cases for the CSV row parsing used by every import engine"""
+
+    def test_localidade_is_mapped_to_state_code(self):
+        for localidade, estado in [
+            ('são paulo', 'SP'),
+            ('Recife', 'PE'),
+            ('brasília', 'DF'),
+            ('minas gerais', 'MG'),
+        ]:
+            values = parse_row(make_csv_row(1, localidade=localidade))
+            self.assertEqual(values['estado'], estado)
+
+    def test_choices_are_normalized(self):
+        values = parse_row(make_csv_row(1, genero='masculino'))
+        self.assertEqual(values['genero'], 'M')
+        self.assertEqual(values['geracao'], 'Geração Z')
+        values = parse_row(make_csv_row(1, geracao='geração y'))
+        self.assertEqual(values['geracao'], 'Millennials')
+
+    def test_values_longer_than_the_field_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_row(make_csv_row(1, localidade='atlântida'))
+
+    def test_invalid_date_is_rejected(self):
+        for value in ['31/02/2022', '2022-01-20', '1/1/22']:
+            with self.assertRaises(ValueError):
+                parse_row(make_csv_row(1, **{'Data da Resposta': value}))
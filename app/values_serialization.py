@@ -0,0 +1,179 @@
+# Serialização rápida das listagens a partir de values()
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import CharField, F, TextField, Value
+from django.db.models.functions import Cast, Concat
+from rest_framework import serializers
+
+from .query_plan import get_model_field, join
+
+# Pares (campo do serializador, campo do modelo) em que o to_representation
+# devolve o próprio valor lido do banco (str de texto, int de inteiro), que
+# então é usado sem conversão
+IDENTITY_FIELDS = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.IntegerField, (models.IntegerField,)),
+    (serializers.StringRelatedField, (models.CharField, models.TextField)),
+)
+
+
+class Unsupported(Exception):
+    """O serializador tem campos que o caminho rápido não reproduz"""
+
+
+def display_expression(model, prefix=''):
+    """
+    Expressão SQL com o mesmo texto de model.__str__, montada a partir de
+    `str_parts` (campos, __str__ de modelos relacionados e textos fixos)
+    """
+    str_parts = getattr(model, 'str_parts', None)
+    if str_parts is None:
+        raise Unsupported(f'{model.__name__} não declara str_parts')
+    parts = []
+    for part in str_parts:
+        if isinstance(part, Value):
+            parts.append(part)
+            continue
+        current = model
+        for name in part.split('__'):
+            field = current._meta.get_field(name)
+            if field.is_relation:
+                current = field.related_model
+        path = join(prefix, part)
+        if field.is_relation:
+            parts.append(display_expression(current, path))
+        elif isinstance(field, (CharField, TextField)):
+            parts.append(F(path))
+        else:
+            # str() de datas e números coincide com o texto do cast
+            parts.append(Cast(F(path), CharField()))
+    if len(parts) == 1:
+        return parts[0]
+    return Concat(*parts, output_field=CharField())
+
+
+class ValuesPlan:
+    """
+    Colunas (`expressions`, por apelido) e passos que transformam cada
+    linha de values() na mesma estrutura que o serializador produziria a
+    partir da instância. Cada passo é (chave, apelido, conversão, filhos):
+    a conversão é o to_representation do campo (None quando ele devolve o
+    próprio valor) e `filhos` são os passos de um serializador aninhado.
+    """
+
+    def __init__(self):
+        self.expressions = {}
+        self.steps = []
+
+    def add_column(self, expression):
+        alias = f'col_{len(self.expressions)}'
+        self.expressions[alias] = expression
+        return alias
+
+    def to_representation(self, row, steps=None):
+        data = {}
+        if steps is None:
+            steps = self.steps
+        for key, alias, convert, children in steps:
+            value = row[alias]
+            if value is None:
+                data[key] = None
+            elif children is not None:
+                data[key] = self.to_representation(row, children)
+            elif convert is None:
+                data[key] = value
+            else:
+                data[key] = convert(value)
+        return data
+
+
+def is_identity(field, model_field):
+    return any(
+        isinstance(field, field_class)
+        and isinstance(model_field, model_classes)
+        for field_class, model_classes in IDENTITY_FIELDS
+    )
+
+
+def compile_serializer(plan, model, prefix, serializer):
+    steps = []
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or isinstance(
+            field, (serializers.ListSerializer, serializers.ManyRelatedField)
+        ):
+            raise Unsupported(field.field_name)
+        current, path = model, prefix
+        model_field = None
+        for attr in field.source_attrs:
+            if model_field is not None and not model_field.is_relation:
+                raise Unsupported(field.field_name)
+            try:
+                model_field = get_model_field(current, attr)
+            except FieldDoesNotExist:
+                if hasattr(current, attr):
+                    raise Unsupported(field.field_name)
+                # Atributo inexistente: o DRF omite o campo (SkipField)
+                model_field = None
+                break
+            if model_field.many_to_many or model_field.one_to_many:
+                raise Unsupported(field.field_name)
+            path = join(path, attr)
+            if model_field.is_relation:
+                current = model_field.related_model
+        if model_field is None:
+            continue
+        if isinstance(field, serializers.BaseSerializer):
+            if not model_field.is_relation:
+                raise Unsupported(field.field_name)
+            # A chave estrangeira indica se o objeto aninhado existe
+            alias = plan.add_column(F(path))
+            children = compile_serializer(plan, current, path, field)
+            steps.append((field.field_name, alias, None, children))
+            continue
+        if model_field.is_relation:
+            if not isinstance(field, serializers.StringRelatedField):
+                raise Unsupported(field.field_name)
+            # O texto do __str__ já vem pronto do SQL
+            expression, convert = display_expression(current, path), None
+        elif is_identity(field, model_field):
+            expression, convert = F(path), None
+        else:
+            expression, convert = F(path), field.to_representation
+        steps.append(
+            (field.field_name, plan.add_column(expression), convert, None)
+        )
+    return steps
+
+
+@lru_cache(maxsize=None)
+def values_plan(serializer_class, model):
+    """
+    Plano de values() para o serializador, ou None se algum campo não
+    puder ser reproduzido (nesse caso a visão usa o serializador)
+    """
+    plan = ValuesPlan()
+    try:
+        plan.steps = compile_serializer(plan, model, '', serializer_class())
+    except Unsupported:
+        return None
+    return plan
+
+
+class ValuesListSerializer:
+    """Substitui o serializador da visão quando os objetos são linhas"""
+
+    def __init__(self, plan, instance, many=False):
+        self.plan = plan
+        self.instance = instance
+        self.many = many
+
+    @property
+    def data(self):
+        if self.many:
+            to_representation = self.plan.to_representation
+            return [to_representation(row) for row in self.instance]
+        return self.plan.to_representation(self.instance)
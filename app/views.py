@@ -1,18 +1,34 @@
 # Conjuntos de visões para a API REST (somente leitura)
-from django.http import Http404
+from django.http import Http404, JsonResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiResponse,
     extend_schema,
     extend_schema_view,
+    inline_serializer,
 )
-from rest_framework import viewsets
+from rest_framework import serializers, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-
+from rest_framework.views import APIView
+
+from . import snapshot
+from .analytics import (
+    DATE_BUCKETS,
+    DIMENSIONS,
+    parse_filters,
+    parse_group_by,
+    survey_analytics,
+)
+from .columnar import ArrowRenderer, ParquetRenderer, columnar_response
+from .conditional import not_modified, response_validators, set_validators
+from .export import CSVRenderer, NDJSONRenderer, export_response
 from .models import (
     Area,
     Coordenadoria,
+    DatasetVersion,
     Diretoria,
     Employee,
     EmployeeLevel,
@@ -22,6 +38,8 @@ from .models import (
     Person,
     SurveyResponse,
 )
+from .query_plan import plan_queryset
+from .response_cache import cache_stats, cached_response
 from .serializers import (
     SerializadorArea,
     SerializadorCoordenadoria,
@@ -33,12 +51,101 @@ from .serializers import (
     SerializadorPessoa,
     SerializadorRespostaPesquisa,
     SerializadorTipoFuncionario,
+    select_fields,
+    sparse_serializer,
 )
+from .values_serialization import ValuesListSerializer, values_plan
+
+# Campos esparsos, aceitos por todas as ações que serializam registros
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        type=str,
+        description='Campos a devolver, separados por vírgula (ex.: data_da_resposta,enps); os demais nem são lidos do banco',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='omit',
+        type=str,
+        description='Campos a omitir, separados por vírgula (ex.: pessoa)',
+        required=False,
+    ),
+]
+
+
+class DatasetVersionMixin:
+    """
+    Respostas validadas (ETag, Last-Modified) e guardadas no cache pela
+    versão dos dados do banco de `queryset`
+    """
+
+    # Respostas guardadas no cache até o próximo import
+    cache_responses = True
+
+    def cached(self, handler, request, *args, **kwargs):
+        """
+        304 sem consultar nem serializar quando a cópia do cliente vale
+        para a versão atual dos dados, senão a resposta do cache (ou de
+        `handler`) com ETag, Last-Modified e Cache-Control
+        """
+        database = self.queryset.db
+        version, updated_at = DatasetVersion.state(database)
+        # Reaproveitada pela contagem da paginação
+        request.dataset_version = version
+        validators = response_validators(request, version, updated_at)
+        response = not_modified(request, validators)
+        if response is None and self.cache_responses:
+            response = cached_response(
+                handler, request, database, version, *args, **kwargs
+            )
+        elif response is None:
+            response = handler(request, *args, **kwargs)
+        return set_validators(response, validators)
 
 
-class BaseReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
+class BaseReadOnlyModelViewSet(
+    DatasetVersionMixin, viewsets.ReadOnlyModelViewSet
+):
     """Base ViewSet com tratamento de erros aprimorado"""
 
+    # Serializa a partir de values(), sem instanciar modelos nem passar
+    # pelos campos do DRF; a saída é idêntica à do serializador
+    values_serialization = False
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        if getattr(self, 'swagger_fake_view', False):
+            return serializer_class
+        params = self.request.query_params
+        names = select_fields(
+            serializer_class, params.get('fields'), params.get('omit')
+        )
+        if names is None:
+            return serializer_class
+        return sparse_serializer(serializer_class, names)
+
+    def get_values_plan(self):
+        if not self.values_serialization or getattr(
+            self, 'swagger_fake_view', False
+        ):
+            return None
+        return values_plan(self.get_serializer_class(), self.queryset.model)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        plan = self.get_values_plan()
+        if plan is not None:
+            return queryset.values(**plan.expressions)
+        # Junções e colunas derivadas do serializador: o número de
+        # consultas não depende do tamanho da página
+        return plan_queryset(queryset, self.get_serializer_class())
+
+    def get_serializer(self, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is not None and args:
+            return ValuesListSerializer(plan, *args, many=kwargs.get('many'))
+        return super().get_serializer(*args, **kwargs)
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -47,12 +154,19 @@ class BaseReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
                 description='Número da página (deve ser > 0)',
                 required=False,
             ),
+            OpenApiParameter(
+                name='cursor',
+                type=str,
+                description='Paginação por cursor, sem contagem: vazio na primeira página, depois o valor dos links next/previous',
+                required=False,
+            ),
             OpenApiParameter(
                 name='ordering',
                 type=str,
                 description='Campo de ordenação (ex.: nome, -nome)',
                 required=False,
             ),
+            *SPARSE_FIELDS_PARAMETERS,
         ],
         responses={
             200: None,  # Will be auto-generated
@@ -69,7 +183,7 @@ class BaseReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         try:
-            return super().list(request, *args, **kwargs)
+            return self.cached(super().list, request, *args, **kwargs)
         except ValidationError as e:
             return Response(e.detail, status=400)
         except Http404:
@@ -80,6 +194,46 @@ class BaseReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
     @extend_schema(
+        summary='Exportar',
+        description='Exporta todos os registros (com a ordenação pedida) em fluxo, como NDJSON ou CSV separado por ";", sem paginação.',
+        parameters=[
+            OpenApiParameter(
+                name='format',
+                type=str,
+                enum=['ndjson', 'csv'],
+                description='Formato da exportação (padrão: ndjson)',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='ordering',
+                type=str,
+                description='Campo de ordenação (ex.: nome, -nome)',
+                required=False,
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
+        ],
+        responses={
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        detail=False,
+        pagination_class=None,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request, *args, **kwargs):
+        # O queryset sem o plano da listagem: a exportação monta o seu
+        queryset = self.filter_queryset(super().get_queryset())
+        return export_response(
+            queryset,
+            self.get_serializer_class(),
+            request.accepted_renderer,
+            queryset.model._meta.model_name,
+        )
+
+    @extend_schema(
+        parameters=SPARSE_FIELDS_PARAMETERS,
         responses={
             200: None,  # Will be auto-generated
             400: OpenApiResponse(
@@ -91,11 +245,11 @@ class BaseReadOnlyModelViewSet(viewsets.ReadOnlyModelViewSet):
             500: OpenApiResponse(
                 description='Erro Interno do Servidor - Erro inesperado do servidor'
             ),
-        }
+        },
     )
     def retrieve(self, request, *args, **kwargs):
         try:
-            return super().retrieve(request, *args, **kwargs)
+            return self.cached(super().retrieve, request, *args, **kwargs)
         except ValidationError as e:
             return Response(e.detail, status=400)
         except Http404:
@@ -223,6 +377,7 @@ class PessoaViewSet(BaseReadOnlyModelViewSet):
 
     queryset = Person.objects.all()
     serializer_class = SerializadorPessoa
+    values_serialization = True
     ordering_fields = ['nome', 'email', 'genero', 'geracao']
 
 
@@ -283,6 +438,7 @@ class FuncionarioViewSet(BaseReadOnlyModelViewSet):
 
     queryset = Employee.objects.all()
     serializer_class = SerializadorFuncionario
+    values_serialization = True
     ordering_fields = [
         'pessoa__nome',
         'empresa',
@@ -310,4 +466,170 @@ class RespostaPesquisaViewSet(BaseReadOnlyModelViewSet):
 
     queryset = SurveyResponse.objects.all()
     serializer_class = SerializadorRespostaPesquisa
+    values_serialization = True
     ordering_fields = ['employee__pessoa__nome', 'data_da_resposta']
+
+    @extend_schema(
+        summary='Exportar em formato colunar',
+        description='Exporta todas as respostas, unidas à hierarquia (empresa, diretoria, gerência, coordenadoria, área) e aos atributos do funcionário, como Parquet ou fluxo Arrow IPC, em row groups lidos do banco sob demanda. Exige o pacote pyarrow no servidor.',
+        parameters=[
+            OpenApiParameter(
+                name='format',
+                type=str,
+                enum=['parquet', 'arrow'],
+                description='Formato da exportação (padrão: parquet)',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='ordering',
+                type=str,
+                description='Campo de ordenação (ex.: data_da_resposta)',
+                required=False,
+            ),
+        ],
+        responses={
+            (200, ParquetRenderer.media_type): OpenApiTypes.BINARY,
+            (200, ArrowRenderer.media_type): OpenApiTypes.BINARY,
+            501: OpenApiResponse(
+                description='Não Implementado - pyarrow não instalado'
+            ),
+        },
+    )
+    @action(
+        detail=False,
+        pagination_class=None,
+        renderer_classes=[ParquetRenderer, ArrowRenderer],
+    )
+    def columnar(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.queryset.all())
+        try:
+            return columnar_response(
+                queryset, request.accepted_renderer, 'respostas_pesquisa'
+            )
+        except ValueError as e:
+            return JsonResponse({'detail': str(e)}, status=501)
+
+
+class ResponseCacheStatsView(APIView):
+    """Estatísticas do cache de respostas da API"""
+
+    @extend_schema(
+        operation_id='response_cache_stats',
+        summary='Estatísticas do cache de respostas',
+        description='Acertos e falhas do cache de respostas (list e retrieve), taxa de acerto e latência média em ms de cada caso, além da versão atual dos dados. Com o cache em memória local os números são do processo que atende a requisição.',
+        responses={
+            200: inline_serializer(
+                name='ResponseCacheStats',
+                fields={
+                    'hits': serializers.IntegerField(),
+                    'misses': serializers.IntegerField(),
+                    'hit_ratio': serializers.FloatField(allow_null=True),
+                    'hit_ms': serializers.FloatField(allow_null=True),
+                    'miss_ms': serializers.FloatField(allow_null=True),
+                    'dataset_version': serializers.IntegerField(),
+                },
+            )
+        },
+    )
+    def get(self, request):
+        return Response(
+            {**cache_stats(), 'dataset_version': DatasetVersion.current()}
+        )
+
+
+# Agrupamentos, filtros por dimensão e período dos indicadores
+ANALYTICS_PARAMETERS = [
+    OpenApiParameter(
+        name='group_by',
+        type=str,
+        description=(
+            'Agrupamentos separados por vírgula (ex.: diretoria,mes). '
+            f'Dimensões: {", ".join(DIMENSIONS)}; períodos: '
+            f'{", ".join(DATE_BUCKETS)}'
+        ),
+        required=False,
+    ),
+    *(
+        OpenApiParameter(
+            name=name,
+            type=str,
+            description=(
+                f'Ids de {name} separados por vírgula'
+                if label is not None
+                else f'Valores de {name} separados por vírgula'
+            ),
+            required=False,
+        )
+        for name, (_, label) in DIMENSIONS.items()
+    ),
+    OpenApiParameter(
+        name='data_de',
+        type=OpenApiTypes.DATE,
+        description='Respostas a partir desta data',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='data_ate',
+        type=OpenApiTypes.DATE,
+        description='Respostas até esta data',
+        required=False,
+    ),
+]
+ANALYTICS_RESPONSES = {
+    200: OpenApiResponse(
+        response=OpenApiTypes.OBJECT,
+        description='Lista de grupos com respostas, enps e metricas',
+    ),
+    304: OpenApiResponse(description='Não modificado'),
+    400: OpenApiResponse(description='Agrupamento, filtro ou data inválidos'),
+}
+
+
+class AnalyticsView(DatasetVersionMixin, APIView):
+    """Indicadores agregados das respostas de pesquisa"""
+
+    queryset = SurveyResponse.objects.all()
+
+    @extend_schema(
+        operation_id='survey_analytics',
+        summary='Indicadores das respostas',
+        description='eNPS (promotores menos detratores, em %), média e percentuais de favoráveis, neutros e desfavoráveis de cada métrica, por grupo, calculados no banco em uma consulta agregada. Nas métricas de 1 a 7, 5 a 7 são favoráveis, 4 neutro e 1 a 3 desfavoráveis; no eNPS, 9 e 10 são promotores e 0 a 6 detratores. Filtros por dimensão e período restringem as respostas antes da agregação.',
+        parameters=ANALYTICS_PARAMETERS,
+        responses=ANALYTICS_RESPONSES,
+    )
+    def get(self, request):
+        return self.cached(self.analytics, request)
+
+    def analytics(self, request):
+        return Response(
+            survey_analytics(self.queryset.all(), request.query_params)
+        )
+
+
+class InMemoryAnalyticsView(AnalyticsView):
+    """Indicadores calculados na cópia em memória das respostas"""
+
+    @extend_schema(
+        operation_id='survey_analytics_in_memory',
+        summary='Indicadores das respostas (em memória)',
+        description='Os mesmos indicadores de /api/analytics/, calculados sobre uma cópia colunar das respostas (arrays NumPy) mantida em memória por processo e refeita quando os dados mudam: filtros viram máscaras e os grupos, contagens com bincount, sem consultas ao banco além da versão dos dados.',
+        parameters=ANALYTICS_PARAMETERS,
+        responses={
+            **ANALYTICS_RESPONSES,
+            501: OpenApiResponse(
+                description='Não Implementado - numpy não instalado'
+            ),
+        },
+    )
+    def get(self, request):
+        return self.cached(self.analytics, request)
+
+    def analytics(self, request):
+        # Parâmetros inválidos dão 400 sem montar a cópia em memória
+        params = request.query_params
+        group_by = parse_group_by(params.get('group_by'))
+        filters, period = parse_filters(params)
+        if snapshot.np is None:
+            return Response({'detail': snapshot.NUMPY_MISSING}, status=501)
+        copy = snapshot.get_snapshot(self.queryset.db, request.dataset_version)
+        return Response(copy.indicators(group_by, filters, period))
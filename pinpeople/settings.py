@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -10,6 +11,11 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'app.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson quando instalado, senão o json da biblioteca padrão
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_FILTER_BACKENDS': ['rest_framework.filters.OrderingFilter'],
     'DEFAULT_VERSION': None,
     'ALLOWED_VERSIONS': None,
@@ -100,6 +106,42 @@ DATABASES = {
 }
 
 
+# Cache (respostas da API e contagens). CACHE_BACKEND escolhe entre memória
+# local (padrão, por processo), arquivos ou Redis (exige o pacote redis);
+# CACHE_LOCATION é o nome, o diretório ou a URL correspondente
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            {
+                'locmem': 'pinpeople',
+                'file': os.path.join(tempfile.gettempdir(), 'pinpeople-cache'),
+                'redis': 'redis://127.0.0.1:6379/1',
+            }[CACHE_BACKEND],
+        ),
+    },
+}
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
+# Validade (segundos) das respostas em cache; 0 desliga o cache de respostas.
+# A troca de versão dos dados pelo import_data as invalida antes disso
+API_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('API_RESPONSE_CACHE_TIMEOUT', 300)
+)
+
+# Segundos em que navegadores e proxies reutilizam uma resposta da API antes
+# de revalidá-la (ETag / Last-Modified)
+API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', 30))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -5,14 +5,17 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework.routers import DefaultRouter
 
 from app.views import (
+    AnalyticsView,
     AreaViewSet,
     CoordenadoriaViewSet,
     DiretoriaViewSet,
     EmpresaViewSet,
     FuncionarioViewSet,
     GerenciaViewSet,
+    InMemoryAnalyticsView,
     NivelFuncionarioViewSet,
     PessoaViewSet,
+    ResponseCacheStatsView,
     RespostaPesquisaViewSet,
     TipoFuncionarioViewSet,
 )
@@ -32,6 +35,17 @@ router.register(r'respostas-pesquisa', RespostaPesquisaViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/analytics/', AnalyticsView.as_view(), name='analytics'),
+    path(
+        'api/analytics/in-memory/',
+        InMemoryAnalyticsView.as_view(),
+        name='analytics-in-memory',
+    ),
+    path(
+        'api/cache-stats/',
+        ResponseCacheStatsView.as_view(),
+        name='response-cache-stats',
+    ),
     path('api/', include(router.urls)),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path(